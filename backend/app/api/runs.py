@@ -77,6 +77,9 @@ async def get_results(run_id: str, registry: RunRegistry = Depends(get_registry)
             _artifact(run_id, "summary.json"),
             _artifact(run_id, "logs.txt"),
             _artifact(run_id, "stats_table_allrounds.txt"),
+            _artifact(run_id, "bandit_stats.json"),
+            _artifact(run_id, "llm_calls.ndjson"),
+            _artifact(run_id, "value_pool.json"),
         ],
     )
 
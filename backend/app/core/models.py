@@ -46,6 +46,11 @@ class RunConfig(BaseModel):
     graphql_headers_json: Optional[str] = Field(None, alias="graphqlHeadersJson")
     rounds: int = 2
     requests_per_node: int = Field(2, alias="requestsPerNode")
+    target_coverage: Optional[float] = Field(None, alias="targetCoverage", ge=0.0, le=100.0)
+    request_budget: Optional[int] = Field(None, alias="requestBudget", ge=1)
+    token_budget: Optional[int] = Field(None, alias="tokenBudget", ge=1)
+    llm_cache: bool = Field(True, alias="llmCache")
+    retriever: str = "dense"
     notes: Optional[str] = None
 
     @field_validator("llm_provider")
@@ -54,6 +59,12 @@ class RunConfig(BaseModel):
             raise ValueError("Unsupported llmProvider")
         return v
 
+    @field_validator("retriever")
+    def validate_retriever(cls, v: str) -> str:
+        if v not in {"dense", "bm25", "hybrid"}:
+            raise ValueError("Unsupported retriever")
+        return v
+
 
 class RunRecord(BaseModel):
     run_id: str = Field(..., alias="runId")
@@ -66,6 +77,7 @@ class RunRecord(BaseModel):
     results_path: Optional[Path] = None
     summary_path: Optional[Path] = None
     config: Dict[str, Any] = Field(default_factory=dict)
+    coverage: Optional[Dict[str, Any]] = None
     cancel_requested: bool = False
 
 
@@ -81,6 +93,7 @@ class RunStatusResponse(BaseModel):
     started_at: Optional[dt.datetime] = Field(default=None, alias="startedAt")
     finished_at: Optional[dt.datetime] = Field(default=None, alias="finishedAt")
     error: Optional[str] = None
+    coverage: Optional[Dict[str, Any]] = None
 
 
 class LogsResponse(BaseModel):
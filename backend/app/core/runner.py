@@ -42,6 +42,8 @@ async def run_job(run_id: str, config: RunConfig, registry: RunRegistry) -> None
                 "PREDIQL_LLM_MODEL": config.model,
                 "PREDIQL_OPENAI_BASE_URL": settings.OPENAI_BASE_URL,
                 "PREDIQL_GEMINI_BASE_URL": settings.GEMINI_BASE_URL,
+                "PREDIQL_LLM_CACHE": "1" if config.llm_cache else "0",
+                "PREDIQL_RETRIEVER": config.retriever,
             }
         )
 
@@ -55,6 +57,12 @@ async def run_job(run_id: str, config: RunConfig, registry: RunRegistry) -> None
             "--rounds",
             str(config.rounds),
         ]
+        if config.target_coverage is not None:
+            cmd += ["--target-coverage", str(config.target_coverage)]
+        if config.request_budget is not None:
+            cmd += ["--budget-requests", str(config.request_budget)]
+        if config.token_budget is not None:
+            cmd += ["--budget-tokens", str(config.token_budget)]
         await log(f"Starting legacy pipeline: {' '.join(cmd)}")
 
         process = await asyncio.create_subprocess_exec(
@@ -76,6 +84,9 @@ async def run_job(run_id: str, config: RunConfig, registry: RunRegistry) -> None
                 line_count += 1
                 if line_count % 5 == 0:
                     await update_progress(min(0.8, 0.05 + line_count * 0.01), "running")
+                    coverage = _read_live_coverage(run_dir)
+                    if coverage is not None:
+                        await registry.update_status(run_id, coverage=coverage)
 
         returncode = await process.wait()
         if returncode != 0:
@@ -84,6 +95,9 @@ async def run_job(run_id: str, config: RunConfig, registry: RunRegistry) -> None
             return
 
         await update_progress(0.9, "saving")
+        coverage = _read_live_coverage(run_dir)
+        if coverage is not None:
+            await registry.update_status(run_id, coverage=coverage)
         summary, raw = await _collect_outputs(run_dir)
         await registry.save_results(run_id, summary=summary, raw_json=raw)
         await registry.update_status(run_id, status=RunStatus.done, progress=Progress(pct=1.0, stage="done"))
@@ -108,6 +122,82 @@ async def _collect_outputs(run_dir: Path) -> tuple[Dict[str, Any], Dict[str, Any
         target = run_dir / "stats_table_allrounds.txt"
         target.write_text(stats_file.read_text(encoding="utf-8"), encoding="utf-8")
         summary["statsTable"] = str(target)
+    bandit_file = output_dir / "bandit_stats.json"
+    if bandit_file.exists():
+        target = run_dir / "bandit_stats.json"
+        target.write_text(bandit_file.read_text(encoding="utf-8"), encoding="utf-8")
+        try:
+            arm_stats = json.loads(target.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            arm_stats = {}
+        summary["armStats"] = _summarize_arms(arm_stats)
+        raw["armStats"] = arm_stats
+    calls_file = output_dir / "llm_calls.ndjson"
+    if calls_file.exists():
+        target = run_dir / "llm_calls.ndjson"
+        target.write_text(calls_file.read_text(encoding="utf-8"), encoding="utf-8")
+        summary["llmUsage"] = _summarize_llm_calls(target)
+    pool_file = output_dir / "value_pool.json"
+    if pool_file.exists():
+        target = run_dir / "value_pool.json"
+        target.write_text(pool_file.read_text(encoding="utf-8"), encoding="utf-8")
+    coverage = _read_live_coverage(run_dir)
+    if coverage is not None:
+        summary["coverage"] = coverage.get("overall", {})
+        raw["coverage"] = coverage
     if output_dir.exists():
         raw["outputDir"] = str(output_dir)
     return summary, raw
+
+
+def _summarize_arms(arm_stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Aggregate per-node arm statistics into per-arm pulls/rewards for the run summary."""
+    arms: Dict[str, Dict[str, float]] = {}
+    for node_stats in (arm_stats.get("nodes") or {}).values():
+        for arm_name, stats in (node_stats.get("arms") or {}).items():
+            agg = arms.setdefault(arm_name, {"pulls": 0, "rewards": 0.0})
+            agg["pulls"] += stats.get("pulls", 0)
+            agg["rewards"] += stats.get("rewards", 0.0)
+    return {"warmStarted": bool(arm_stats.get("warm_started")), "arms": arms}
+
+
+def _summarize_llm_calls(calls_file: Path) -> Dict[str, Any]:
+    """Totals over the per-call token/latency records written by the legacy pipeline."""
+    totals: Dict[str, Any] = {
+        "calls": 0,
+        "cachedCalls": 0,
+        "promptTokens": 0,
+        "completionTokens": 0,
+        "cachedPromptTokens": 0,
+        "billedTokens": 0,
+        "latencyMs": 0.0,
+    }
+    for line in calls_file.read_text(encoding="utf-8").splitlines():
+        try:
+            call = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        tokens = call.get("prompt_tokens", 0) + call.get("completion_tokens", 0)
+        totals["calls"] += 1
+        totals["promptTokens"] += call.get("prompt_tokens", 0)
+        totals["completionTokens"] += call.get("completion_tokens", 0)
+        totals["cachedPromptTokens"] += call.get("cached_prompt_tokens", 0)
+        totals["latencyMs"] += call.get("latency_ms", 0.0)
+        if call.get("cached"):
+            totals["cachedCalls"] += 1
+        else:
+            totals["billedTokens"] += tokens
+    totals["avgLatencyMs"] = round(totals["latencyMs"] / totals["calls"], 1) if totals["calls"] else 0.0
+    return totals
+
+
+def _read_live_coverage(run_dir: Path) -> Dict[str, Any] | None:
+    """Read the coverage snapshot the legacy pipeline rewrites after every attempt."""
+    coverage_file = run_dir / "prediql-output" / "coverage_live.json"
+    if not coverage_file.exists():
+        return None
+    try:
+        return json.loads(coverage_file.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        # File may be mid-rewrite; the next poll picks it up.
+        return None
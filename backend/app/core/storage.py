@@ -57,6 +57,7 @@ class RunRegistry:
         status: Optional[RunStatus] = None,
         progress: Optional[Progress] = None,
         error: Optional[str] = None,
+        coverage: Optional[Dict] = None,
     ) -> Optional[RunRecord]:
         async with self._lock:
             record = self._runs.get(run_id)
@@ -72,6 +73,8 @@ class RunRegistry:
                 record.progress = progress
             if error:
                 record.error = error
+            if coverage is not None:
+                record.coverage = coverage
             self._runs[run_id] = record
             return record
 
@@ -87,6 +90,7 @@ class RunRegistry:
                 started_at=record.started_at,
                 finished_at=record.finished_at,
                 error=record.error,
+                coverage=record.coverage,
             )
 
     async def get_record(self, run_id: str) -> Optional[RunRecord]:
@@ -1,15 +1,18 @@
 import yaml
 import os
+from load_introspection.schema_artifact import load_schema
 
 class GraphQLPromptBuilder:
     def __init__(self,
-                 parameter_file_path="load_introspection/query_parameter_list.yml",
-                 object_file_path="load_introspection/object_list.yml"):
+                 parameter_file_path=None,
+                 object_file_path=None):
         """
-        Load parameter and object definition files once.
+        Load parameter and object definitions once: from the compiled schema
+        artifact, or from YAML files when their paths are given.
         """
-        self.parameter_data = self._load_yaml(parameter_file_path)
-        self.all_objects_data = self._load_yaml(object_file_path)
+        schema = load_schema() if not (parameter_file_path and object_file_path) else None
+        self.parameter_data = self._load_yaml(parameter_file_path) if parameter_file_path else schema["query"]
+        self.all_objects_data = self._load_yaml(object_file_path) if object_file_path else schema["objects"]
         print(f"✅ Loaded {len(self.parameter_data)} endpoints from parameters file.")
         print(f"✅ Loaded {len(self.all_objects_data)} object types from objects file.")
 
@@ -1,8 +1,8 @@
 import os
 import json
-import yaml
-import re
 from config import Config
+from coverage_engine import CoverageEngine
+from load_introspection.schema_artifact import load_json, load_schema
 # CONFIG
 # DATA_DIR = "prediql-output/"  # current folder with all node folders
 DATA_DIR = Config.OUTPUT_DIR
@@ -10,63 +10,12 @@ OUTPUT_REPORT = os.path.join(DATA_DIR,"coverage_report.txt")
 
 # QUERY_YAML = "load_introspection/query_parameter_list_graphqler.yml"
 QUERY_YAML = "generated_query_info.json"
-OBJECT_YAML = "load_introspection/object_list.yml"
 
 # Load schema files
-with open(QUERY_YAML, encoding="utf-8") as f:
-    query_params = yaml.safe_load(f)
-with open(OBJECT_YAML, encoding="utf-8") as f:
-    object_list = yaml.safe_load(f)
-
-# Helper to flatten GraphQL Type
-def flatten_type(t):
-    if not t:
-        return ""
-    if isinstance(t, str):
-        # Remove GraphQL list and non-null syntax
-        t = t.replace("[", "").replace("]", "").replace("!", "").strip()
-        return t
-    if t.get("kind") == "NON_NULL":
-        return flatten_type(t.get("ofType"))
-    if t.get("kind") == "LIST":
-        return flatten_type(t.get("ofType"))
-    return t.get("name") or ""
-
-
-# Compute all fields/edges from schema
-def get_total_fields_edges_for_node(node_name, query_param_list, object_dict):
-    if node_name not in query_param_list:
-        return set(), set()
-    output_type = query_param_list[node_name].get("output") or query_param_list[node_name].get("output_type")
-    if not output_type:
-        # Try to guess from relevant_schema if present
-        if "relevant_schema" in query_param_list[node_name]:
-            relevant_schema = query_param_list[node_name]["relevant_schema"]
-            if relevant_schema:
-                output_type = next(iter(relevant_schema.keys()), None)
-                if output_type:
-                    print(f"⚠️ No output_type for {node_name}, guessing: {output_type}")
-        if not output_type:
-            print(f"❌ Cannot determine output_type for {node_name}")
-            return set(), set()     
-    base_type = flatten_type(output_type)
-    fields, edges, visited = set(), set(), set()
-    def traverse(curr, path):
-        if curr in visited:
-            return
-        visited.add(curr)
-        if curr not in object_dict:
-            return
-        for field in object_dict[curr].get("fields", []):
-            fname = field["name"]
-            fields.add(fname)
-            edge_path = ".".join(path + [fname])
-            edges.add(edge_path)
-            next_type = flatten_type(field["type"])
-            if next_type in object_dict:
-                traverse(next_type, path + [fname])
-    traverse(base_type, [node_name])
-    return fields, edges
+query_params = load_json(QUERY_YAML)
+object_list = load_schema()["objects"]
+
+ENGINE = CoverageEngine(query_params, object_list)
 
 def analyze_node(node_folder, out_lines, covered_nodes):
     node_name = os.path.basename(node_folder)
@@ -89,54 +38,16 @@ def analyze_node(node_folder, out_lines, covered_nodes):
     if node_success:
         covered_nodes.add(node_name)
 
-    # Choose schema source
-    if node_name in query_params and "relevant_schema" in query_params[node_name]:
-        schema_used = "relevant_schema"
-        schema_object_list = query_params[node_name]["relevant_schema"]
-    else:
-        schema_used = "GLOBAL object_list"
-        schema_object_list = object_list
-
-    # Schema analysis
-    total_fields, total_edges = get_total_fields_edges_for_node(
-        node_name,
-        query_params,
-        schema_object_list
-    )
-
-    # Sets
-    all_fields_attempted, all_edges_attempted, all_ops_attempted = set(), set(), set()
-    all_fields_success, all_edges_success, all_ops_success = set(), set(), set()
-
+    # Bitset coverage: schema universe ids are assigned once per node
     for record in data:
-        fields = record.get("fields", [])
-        edges = record.get("edges", [])
-        op = record.get("operation_name")
-
-        filtered_fields = [f for f in fields if f in total_fields]
-        filtered_edges = [e for e in edges if e in total_edges]
-
-        all_fields_attempted.update(filtered_fields)
-        all_edges_attempted.update(filtered_edges)
-        if op:
-            all_ops_attempted.add(op)
-
-        if record.get("success"):
-            filtered_fields_succ = [f for f in fields if f in total_fields]
-            filtered_edges_succ = [e for e in edges if e in total_edges]
-            all_fields_success.update(filtered_fields_succ)
-            all_edges_success.update(filtered_edges_succ)
-            if op:
-                all_ops_success.add(op)
-
-    # Metrics
-    def calc_ratio(numerator, denominator):
-        return (len(numerator & denominator) / len(denominator) * 100) if denominator else 0
-
-    attempt_field_cov = calc_ratio(all_fields_attempted, total_fields)
-    success_field_cov = calc_ratio(all_fields_success, total_fields)
-    attempt_edge_cov = calc_ratio(all_edges_attempted, total_edges)
-    success_edge_cov = calc_ratio(all_edges_success, total_edges)
+        ENGINE.record_payload(node_name, record)
+    report = ENGINE.node_report(node_name)
+    schema_used = report["schema_source"]
+
+    attempt_field_cov = report["attempted_field_cov"]
+    success_field_cov = report["success_field_cov"]
+    attempt_edge_cov = report["attempted_edge_cov"]
+    success_edge_cov = report["success_edge_cov"]
 
     success_rate = (num_successes / total_requests * 100) if total_requests else 0
 
@@ -152,18 +63,18 @@ def analyze_node(node_folder, out_lines, covered_nodes):
     out_lines.append(f"✅ Schema source used: {schema_used}")
 
     out_lines.append("\n✅ Attempted Coverage")
-    out_lines.append(f"- Fields: {len(all_fields_attempted)}")
-    out_lines.append(f"- Edges:  {len(all_edges_attempted)}")
-    out_lines.append(f"- Operations: {len(all_ops_attempted)}")
+    out_lines.append(f"- Fields: {report['attempted_fields']}")
+    out_lines.append(f"- Edges:  {report['attempted_edges']}")
+    out_lines.append(f"- Operations: {report['attempted_ops']}")
 
     out_lines.append("\n✅ Successful Coverage")
-    out_lines.append(f"- Fields: {len(all_fields_success)}")
-    out_lines.append(f"- Edges:  {len(all_edges_success)}")
-    out_lines.append(f"- Operations: {len(all_ops_success)}")
+    out_lines.append(f"- Fields: {report['success_fields']}")
+    out_lines.append(f"- Edges:  {report['success_edges']}")
+    out_lines.append(f"- Operations: {report['success_ops']}")
 
     out_lines.append("\n================ SCHEMA ANALYSIS ================")
-    out_lines.append(f"Total possible fields in schema for '{node_name}': {len(total_fields)}")
-    out_lines.append(f"Total possible edges in schema for '{node_name}': {len(total_edges)}")
+    out_lines.append(f"Total possible fields in schema for '{node_name}': {report['total_fields']}")
+    out_lines.append(f"Total possible edges in schema for '{node_name}': {report['total_edges']}")
 
     out_lines.append("\n✅ True Coverage against Schema")
     out_lines.append(f"- Attempted Field Coverage: {attempt_field_cov:.1f}%")
@@ -178,7 +89,7 @@ def analyze_node(node_folder, out_lines, covered_nodes):
     out_lines.append("=" * 55 + "\n")
 
     # ✅ RETURN the counts for aggregation
-    return len(total_fields), len(total_edges), len(all_fields_success), len(all_edges_success)
+    return report["total_fields"], report["total_edges"], report["success_fields"], report["success_edges"]
 
 if __name__ == "__main__":
     all_summaries = []
@@ -0,0 +1,63 @@
+import datetime
+import json
+import os
+
+from endpoint_state import state_path
+
+# Shrink persisted posteriors toward Beta(1,1) on load: 1.0 keeps them as-is, 0.0 ignores them
+DECAY = float(os.getenv("PREDIQL_BANDIT_DECAY", "0.5"))
+
+
+def _bandit_file(schema_hash):
+    return state_path("bandit", f"{schema_hash}.json")
+
+
+def load_priors(schema_hash, decay=DECAY):
+    """
+    Load persisted Thompson-sampling posteriors for this schema as priors.
+    Returns { (node, arm_name): {"alpha": a, "beta": b} } with decay applied.
+    """
+    if not schema_hash:
+        return {}
+    path = _bandit_file(schema_hash)
+    if not os.path.exists(path):
+        print(f"ℹ️ No bandit state for schema {schema_hash[:12]}; starting from Beta(1,1)")
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ bandit state load error: {e}")
+        return {}
+
+    priors = {}
+    for node, arms in data.get("arms", {}).items():
+        for arm_name, ab in arms.items():
+            priors[(node, arm_name)] = {
+                "alpha": 1.0 + decay * (float(ab["alpha"]) - 1.0),
+                "beta": 1.0 + decay * (float(ab["beta"]) - 1.0),
+            }
+    print(f"✅ Warm-started {len(priors)} bandit arms from schema {schema_hash[:12]} (decay={decay})")
+    return priors
+
+
+def save_posteriors(schema_hash, beta):
+    """Persist { (node, arm_name): {"alpha", "beta"} } for the next run against this schema."""
+    if not schema_hash:
+        return
+    arms = {}
+    for (node, arm_name), ab in beta.items():
+        arms.setdefault(node, {})[arm_name] = {"alpha": ab["alpha"], "beta": ab["beta"]}
+    payload = {
+        "schema_hash": schema_hash,
+        "updated_at": datetime.datetime.utcnow().isoformat() + "Z",
+        "arms": arms,
+    }
+    path = _bandit_file(schema_hash)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ bandit state save error: {e}")
@@ -0,0 +1,202 @@
+import threading
+from collections import defaultdict
+
+
+class BudgetScheduler:
+    """
+    Global request/token budget shared by every node of a run.
+
+    Each round, `allocate()` splits the round's requests across nodes in
+    proportion to their observed marginal coverage gain (new schema bits per
+    attempt, with an optimistic prior so untried nodes still get a share), and
+    with `max_tokens` gives each node the same fraction of the remaining tokens.
+    `should_stop` ends a node's round once its token share would be exceeded by
+    another call of average cost, and `reserve()` holds each LLM call's estimated
+    cost before it is made, so concurrently running nodes cannot overrun the run
+    budget together (not even on their first calls, before any average exists).
+    Nodes already at 100% field coverage get nothing. Nodes that have gone
+    `stuck_after` attempts without any gain are capped at `stuck_cap` and only
+    probed again after 1, 2, 4, ... rounds (up to `max_backoff`), so a node
+    that never pays off stops costing an attempt every round.
+    `max_requests` / `max_tokens` are hard limits for the whole run (None = unlimited).
+    `target_coverage` (overall successful field coverage %) stops every node once reached,
+    which matters when several nodes run concurrently.
+    """
+
+    def __init__(self, coverage, max_requests=None, max_tokens=None, stuck_after=3, stuck_cap=1,
+                 target_coverage=None, max_backoff=16):
+        self.coverage = coverage
+        self.target_coverage = target_coverage
+        self.max_requests = max_requests
+        self.max_tokens = max_tokens
+        self.stuck_after = stuck_after
+        self.stuck_cap = stuck_cap
+        self.max_backoff = max_backoff
+        self.requests_used = 0
+        self.tokens_used = 0.0
+        self.tokens_reserved = 0.0  # estimates held by LLM calls in flight
+        self.attempts = defaultdict(int)
+        self.gain = defaultdict(int)
+        self.zero_streak = defaultdict(int)
+        self.round = 0
+        self.token_share = {}  # node -> tokens allowed this round (only with max_tokens)
+        self.round_tokens = defaultdict(float)  # node -> tokens spent this round
+        self.round_reserved = defaultdict(float)  # node -> tokens held by its call in flight
+        self.probes = defaultdict(int)  # node -> consecutive rounds it was probed while stuck
+        self.next_probe = defaultdict(int)  # node -> first round a stuck node may be probed again
+        self._lock = threading.Lock()
+
+    # ---- budget ----
+
+    def remaining_requests(self):
+        if self.max_requests is None:
+            return None
+        return max(0, self.max_requests - self.requests_used)
+
+    def remaining_tokens(self):
+        if self.max_tokens is None:
+            return None
+        return max(0.0, self.max_tokens - self.tokens_used)
+
+    def avg_call_tokens(self):
+        """Mean tokens charged per attempt so far (0 before the first attempt)."""
+        total = sum(self.attempts.values())
+        return self.tokens_used / total if total else 0.0
+
+    def exhausted(self):
+        with self._lock:
+            if self.max_requests is not None and self.requests_used >= self.max_requests:
+                return True
+            if self.max_tokens is not None and self.tokens_used >= self.max_tokens:
+                return True
+            return False
+
+    def target_reached(self):
+        if self.target_coverage is None:
+            return False
+        return self.coverage.overall()["success_field_cov"] >= self.target_coverage
+
+    def reserve(self, node, estimate):
+        """
+        Hold `estimate` tokens (at least the average call cost) for an LLM call on `node`
+        before it is made. Returns the amount held, 0 without a token budget, or None when
+        the run budget or the node's share cannot cover it; charge() releases the hold.
+        """
+        if self.max_tokens is None:
+            return 0.0
+        with self._lock:
+            estimate = max(float(estimate), self.avg_call_tokens())
+            if self.tokens_used + self.tokens_reserved + estimate > self.max_tokens:
+                return None
+            share = self.token_share.get(node)
+            if share is not None and self.round_tokens[node] + self.round_reserved[node] + estimate > share:
+                return None
+            self.tokens_reserved += estimate
+            self.round_reserved[node] += estimate
+            return estimate
+
+    def charge(self, node, requests=0, tokens=0.0, gain=0, reserved=0.0):
+        """
+        Record one attempt on `node`: requests sent, LLM tokens spent and coverage bits gained.
+        `reserved` is what reserve() held for the attempt's call; it is released and the
+        actual `tokens` charged instead.
+        """
+        with self._lock:
+            self.tokens_reserved -= reserved
+            self.round_reserved[node] -= reserved
+            self.requests_used += requests
+            self.tokens_used += tokens
+            self.round_tokens[node] += tokens
+            self.attempts[node] += 1
+            self.gain[node] += gain
+            if gain > 0:
+                self.zero_streak[node] = 0
+                self.probes[node] = 0
+            else:
+                self.zero_streak[node] += 1
+
+    # ---- per-node state ----
+
+    def is_stuck(self, node):
+        return self.zero_streak[node] >= self.stuck_after
+
+    def token_share_spent(self, node):
+        """True when another call of average cost would take the node past its token share for the round."""
+        share = self.token_share.get(node)
+        if share is None:
+            return False
+        with self._lock:
+            return self.round_tokens[node] + self.avg_call_tokens() > share
+
+    def should_stop(self, node, attempts_this_round=0):
+        """Stop a node when the run budget or its token share is spent, it is fully covered, or it stalls again."""
+        if self.exhausted() or self.target_reached() or self.coverage.is_complete(node):
+            return True
+        if self.token_share_spent(node):
+            return True
+        return attempts_this_round > 0 and self.is_stuck(node)
+
+    def marginal_gain(self, node):
+        """Expected new coverage bits per attempt; untried nodes score as if they gained one bit."""
+        return (self.gain[node] + 1) / (self.attempts[node] + 1)
+
+    # ---- allocation ----
+
+    def _probe_stuck(self, node):
+        """Whether a stuck node gets its probe this round; the gap doubles with every fruitless probe."""
+        if self.round < self.next_probe[node]:
+            return False
+        self.probes[node] += 1
+        self.next_probe[node] = self.round + min(2 ** (self.probes[node] - 1), self.max_backoff)
+        return True
+
+    def allocate(self, nodes, per_node):
+        """Return {node: requests allowed this round}; nodes omitted get nothing."""
+        self.round += 1
+        self.token_share = {}
+        self.round_tokens = defaultdict(float)
+        active = [node for node in nodes if not self.coverage.is_complete(node)]
+        active = [node for node in active if not self.is_stuck(node) or self._probe_stuck(node)]
+        if not active or self.exhausted():
+            return {}
+
+        round_budget = per_node * len(active)
+        remaining = self.remaining_requests()
+        if remaining is not None:
+            round_budget = min(round_budget, remaining)
+
+        scores = {node: self.marginal_gain(node) for node in active}
+        total_score = sum(scores.values())
+        # Highest marginal gain first so integer rounding favours productive nodes
+        ranked = sorted(active, key=lambda n: scores[n], reverse=True)
+
+        allocation = {}
+        left = round_budget
+        for node in ranked:
+            if left <= 0:
+                break
+            share = int(round(round_budget * scores[node] / total_score))
+            share = max(1, min(share, per_node * 2, left))
+            if self.is_stuck(node):
+                share = min(share, self.stuck_cap)
+            allocation[node] = share
+            left -= share
+
+        remaining_tokens = self.remaining_tokens()
+        if remaining_tokens is not None and allocation:
+            allocated = sum(allocation.values())
+            self.token_share = {node: remaining_tokens * share / allocated for node, share in allocation.items()}
+        return allocation
+
+    def summary(self):
+        return {
+            "requests_used": self.requests_used,
+            "tokens_used": self.tokens_used,
+            "max_requests": self.max_requests,
+            "max_tokens": self.max_tokens,
+            "nodes": {
+                node: {"attempts": self.attempts[node], "gain": self.gain[node], "zero_streak": self.zero_streak[node],
+                       "token_share": self.token_share.get(node)}
+                for node in self.attempts
+            },
+        }
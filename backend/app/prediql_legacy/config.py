@@ -20,3 +20,12 @@ class Config:
     INDEX_FILE = OUTPUT_DIR / "parsed_endpoint_embedded_index.faiss"
     MODEL_NAME_FILE = OUTPUT_DIR / "model_name.txt"
     MODEL_NAME = "all-MiniLM-L6-v2"
+    COVERAGE_LIVE_FILE = OUTPUT_DIR / "coverage_live.json"
+    BANDIT_STATS_FILE = OUTPUT_DIR / "bandit_stats.json"
+    LLM_CALLS_FILE = OUTPUT_DIR / "llm_calls.ndjson"
+    VALUE_POOL_FILE = OUTPUT_DIR / "value_pool.json"
+    REAL_DATA_FILE = OUTPUT_DIR / "real_data.ndjson"
+    REAL_DATA_CHECKPOINT_FILE = OUTPUT_DIR / "real_data_checkpoint.json"
+
+    # Cross-run state (bandit posteriors, caches, knowledge base) keyed by endpoint/schema
+    STATE_DIR = Path(os.getenv("PREDIQL_STATE_DIR", str(RUN_ROOT / "_state")))
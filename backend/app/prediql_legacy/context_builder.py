@@ -0,0 +1,136 @@
+import json
+import os
+import re
+
+from token_counter import count_tokens
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("PREDIQL_CONTEXT_TOKENS", "1500"))
+MAX_LIST_ITEMS = 2
+MAX_STRING_CHARS = 160
+MAX_DEPTH = 4
+
+_VOLATILE = re.compile(r'"[^"]*"|\'[^\']*\'|\b\d+\b')
+
+
+def load_entries(json_file_path):
+    """Sent payloads (with responses) from a node's llama_queries.json, oldest first."""
+    if not os.path.exists(json_file_path) or os.path.getsize(json_file_path) == 0:
+        return []
+    try:
+        with open(json_file_path, "r") as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        print(f"Invalid JSON format: {e}")
+        return []
+    if not isinstance(data, list):
+        return []
+    return [item for item in data if isinstance(item, dict) and item.get("query") and "response_status" in item]
+
+
+def compact_body(body, depth=0):
+    """
+    Structural truncation of a response body: keep the shape (keys, first list
+    items, scalar types) and drop bulk, so the model still sees which fields
+    resolved without paying for every row.
+    """
+    if depth >= MAX_DEPTH:
+        if isinstance(body, dict):
+            return "{…}" if body else {}
+        if isinstance(body, list):
+            return "[…]" if body else []
+    if isinstance(body, dict):
+        return {k: compact_body(v, depth + 1) for k, v in body.items()}
+    if isinstance(body, list):
+        items = [compact_body(v, depth + 1) for v in body[:MAX_LIST_ITEMS]]
+        if len(body) > MAX_LIST_ITEMS:
+            items.append(f"… +{len(body) - MAX_LIST_ITEMS} more")
+        return items
+    if isinstance(body, str) and len(body) > MAX_STRING_CHARS:
+        return body[:MAX_STRING_CHARS] + f"… (+{len(body) - MAX_STRING_CHARS} chars)"
+    return body
+
+
+def error_signature(body):
+    """Normalised error messages (literals and numbers masked) so repeats of one error collapse."""
+    if not isinstance(body, dict):
+        return None
+    errors = body.get("errors")
+    if not errors:
+        return "error: " + body["error"] if isinstance(body.get("error"), str) else None
+    messages = []
+    for err in errors if isinstance(errors, list) else [errors]:
+        message = err.get("message", "") if isinstance(err, dict) else str(err)
+        messages.append(_VOLATILE.sub("_", message).strip().lower())
+    return " | ".join(sorted(set(messages)))
+
+
+def _is_success(entry):
+    if "success" in entry:
+        return bool(entry["success"])
+    body = entry.get("response_body")
+    return entry.get("response_status") == 200 and isinstance(body, dict) and not body.get("errors")
+
+
+def _render(idx, entry, repeats=1):
+    status = entry.get("response_status")
+    label = "ok" if _is_success(entry) else "failed"
+    body = json.dumps(compact_body(entry.get("response_body")), ensure_ascii=False, separators=(",", ":"))
+    text = f"[#{idx + 1} status={status} {label}]\nquery: {entry['query'].strip()}\nresponse: {body}"
+    if repeats > 1:
+        text += f"\n(same error seen {repeats}x)"
+    return text
+
+
+def select_pairs(entries, budget_tokens=CONTEXT_TOKEN_BUDGET):
+    """
+    Choose which prior (query, response) pairs to show, within `budget_tokens`.
+
+    Priority: the latest success, then one example per distinct error
+    (latest first), then older successes, then anything else, newest first.
+    Repeated errors are shown once with a count. The chosen pairs are
+    returned in chronological order as rendered text blocks.
+    """
+    successes, others = [], []
+    errors = {}  # signature -> (latest idx, repeats)
+    for idx, entry in enumerate(entries):
+        if _is_success(entry):
+            successes.append(idx)
+            continue
+        sig = error_signature(entry.get("response_body"))
+        if sig is None:
+            others.append(idx)
+        else:
+            _, repeats = errors.get(sig, (idx, 0))
+            errors[sig] = (idx, repeats + 1)
+
+    successes.reverse()
+    others.reverse()
+    error_picks = sorted(errors.values(), key=lambda item: item[0], reverse=True)
+    order = [(i, 1) for i in successes[:1]] + error_picks + [(i, 1) for i in successes[1:]] + [(i, 1) for i in others]
+
+    chosen, used = [], 0
+    for idx, repeats in order:
+        text = _render(idx, entries[idx], repeats)
+        cost = count_tokens(text)
+        if used + cost > budget_tokens:
+            continue
+        chosen.append((idx, text))
+        used += cost
+    chosen.sort()
+    return [text for _, text in chosen]
+
+
+def build_previous_pairs(json_file_path, budget_tokens=CONTEXT_TOKEN_BUDGET, seed_entries=None):
+    """
+    Prompt-ready block of prior attempts for a node, bounded by `budget_tokens`.
+    `seed_entries` (successes from earlier runs) are treated as older than this run's attempts.
+    """
+    entries = list(seed_entries or []) + load_entries(json_file_path)
+    if not entries:
+        return "none yet"
+    picked = select_pairs(entries, budget_tokens)
+    omitted = len(entries) - len(picked)
+    text = "\n".join(picked)
+    if omitted > 0:
+        text += f"\n({omitted} older or repeated attempts omitted)"
+    return text
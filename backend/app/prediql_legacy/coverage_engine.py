@@ -0,0 +1,266 @@
+import json
+import os
+import threading
+from collections import defaultdict
+
+from load_introspection.schema_artifact import SCHEMA_ARTIFACT, load_json, load_schema
+
+QUERY_INFO_PATH = "generated_query_info.json"
+
+
+# Helper to flatten GraphQL Type
+def flatten_type(t):
+    if not t:
+        return ""
+    if isinstance(t, str):
+        # Remove GraphQL list and non-null syntax
+        t = t.replace("[", "").replace("]", "").replace("!", "").strip()
+        return t
+    if t.get("kind") == "NON_NULL":
+        return flatten_type(t.get("ofType"))
+    if t.get("kind") == "LIST":
+        return flatten_type(t.get("ofType"))
+    return t.get("name") or ""
+
+
+# Compute all fields/edges from schema
+def get_total_fields_edges_for_node(node_name, query_param_list, object_dict):
+    if node_name not in query_param_list:
+        return set(), set()
+    output_type = query_param_list[node_name].get("output") or query_param_list[node_name].get("output_type")
+    if not output_type:
+        # Try to guess from relevant_schema if present
+        if "relevant_schema" in query_param_list[node_name]:
+            relevant_schema = query_param_list[node_name]["relevant_schema"]
+            if relevant_schema:
+                output_type = next(iter(relevant_schema.keys()), None)
+                if output_type:
+                    print(f"⚠️ No output_type for {node_name}, guessing: {output_type}")
+        if not output_type:
+            print(f"❌ Cannot determine output_type for {node_name}")
+            return set(), set()
+    base_type = flatten_type(output_type)
+    fields, edges, visited = set(), set(), set()
+    def traverse(curr, path):
+        if curr in visited:
+            return
+        visited.add(curr)
+        if curr not in object_dict:
+            return
+        for field in object_dict[curr].get("fields", []):
+            fname = field["name"]
+            fields.add(fname)
+            edge_path = ".".join(path + [fname])
+            edges.add(edge_path)
+            next_type = flatten_type(field["type"])
+            if next_type in object_dict:
+                traverse(next_type, path + [fname])
+    traverse(base_type, [node_name])
+    return fields, edges
+
+
+def _pct(covered, total):
+    return covered / total * 100 if total else 0.0
+
+
+class CoverageEngine:
+    """
+    Schema-aware field/edge coverage tracked as integer bitsets.
+
+    Every (node, field) and (node, edge path) reachable from a node's output
+    type is assigned a bit position once, the first time the node is seen.
+    Attempted and successful coverage are plain Python ints per node, so
+    union is `|`, intersection is `&` and counting is `int.bit_count()`.
+    The global bitset is the OR of all node bitsets (ids are node-qualified).
+    """
+
+    KINDS = ("fields", "edges")
+
+    def __init__(self, query_params, object_list):
+        self.query_params = query_params or {}
+        self.object_list = object_list or {}
+        self._ids = {}  # (kind, node, name) -> bit position
+        self._universe = {}  # node -> {"fields": mask, "edges": mask, "schema_source": str}
+        self._attempted = defaultdict(lambda: {"fields": 0, "edges": 0})
+        self._success = defaultdict(lambda: {"fields": 0, "edges": 0})
+        self._ops_attempted = defaultdict(set)
+        self._ops_success = defaultdict(set)
+        self._requests = defaultdict(int)
+        self._successes = defaultdict(int)
+        self._first_success = {}  # node -> request number of the first successful response
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_files(cls, query_info_path=QUERY_INFO_PATH, schema_path=SCHEMA_ARTIFACT):
+        query_params = load_json(query_info_path) or {}
+        object_list = load_schema(schema_path)["objects"]
+        return cls(query_params, object_list)
+
+    # ---- id assignment ----
+
+    def _bit(self, kind, node, name):
+        key = (kind, node, name)
+        bit = self._ids.get(key)
+        if bit is None:
+            bit = len(self._ids)
+            self._ids[key] = bit
+        return bit
+
+    def universe(self, node):
+        """Return (and build once) the schema universe bitsets for `node`."""
+        uni = self._universe.get(node)
+        if uni is not None:
+            return uni
+
+        node_info = self.query_params.get(node)
+        if node_info and "relevant_schema" in node_info:
+            schema_source = "relevant_schema"
+            schema_object_list = node_info["relevant_schema"]
+        else:
+            schema_source = "GLOBAL object_list"
+            schema_object_list = self.object_list
+
+        fields, edges = get_total_fields_edges_for_node(node, self.query_params, schema_object_list)
+        uni = {"fields": 0, "edges": 0, "schema_source": schema_source}
+        for name in sorted(fields):
+            uni["fields"] |= 1 << self._bit("fields", node, name)
+        for path in sorted(edges):
+            uni["edges"] |= 1 << self._bit("edges", node, path)
+        self._universe[node] = uni
+        return uni
+
+    def mask(self, kind, node, names):
+        """Bitset of the `names` that belong to the node's schema universe."""
+        uni_mask = self.universe(node)[kind]
+        m = 0
+        for name in names or []:
+            bit = self._ids.get((kind, node, name))
+            if bit is not None:
+                m |= 1 << bit
+        return m & uni_mask
+
+    # ---- updates ----
+
+    def record(self, node, fields, edges, operation=None, success=False):
+        """
+        Fold one sent payload into the coverage state.
+        Returns the number of field/edge bits newly covered by a *successful* response.
+        """
+        with self._lock:
+            field_mask = self.mask("fields", node, fields)
+            edge_mask = self.mask("edges", node, edges)
+
+            attempted = self._attempted[node]
+            attempted["fields"] |= field_mask
+            attempted["edges"] |= edge_mask
+            self._requests[node] += 1
+            if operation:
+                self._ops_attempted[node].add(operation)
+
+            if not success:
+                return 0
+
+            succ = self._success[node]
+            gain = (field_mask & ~succ["fields"]).bit_count() + (edge_mask & ~succ["edges"]).bit_count()
+            uni = self._universe[node]
+            if not uni["fields"] and not uni["edges"] and self._successes[node] == 0:
+                # Scalar-output nodes (e.g. Boolean mutations) have no fields to cover;
+                # their first successful response is their whole coverage.
+                gain = 1
+            succ["fields"] |= field_mask
+            succ["edges"] |= edge_mask
+            self._first_success.setdefault(node, self._requests[node])
+            self._successes[node] += 1
+            if operation:
+                self._ops_success[node].add(operation)
+            return gain
+
+    def record_payload(self, node, payload):
+        """Convenience wrapper for a llama_queries.json entry annotated by send_payload."""
+        return self.record(
+            node,
+            payload.get("fields", []),
+            payload.get("edges", []),
+            payload.get("operation_name"),
+            bool(payload.get("success")),
+        )
+
+    # ---- metrics ----
+
+    def node_report(self, node):
+        with self._lock:
+            uni = self.universe(node)
+            att = self._attempted[node]
+            succ = self._success[node]
+            total_fields = uni["fields"].bit_count()
+            total_edges = uni["edges"].bit_count()
+            att_fields = att["fields"].bit_count()
+            att_edges = att["edges"].bit_count()
+            succ_fields = succ["fields"].bit_count()
+            succ_edges = succ["edges"].bit_count()
+            return {
+                "schema_source": uni["schema_source"],
+                "requests": self._requests[node],
+                "successes": self._successes[node],
+                "requests_to_first_success": self._first_success.get(node),
+                "total_fields": total_fields,
+                "total_edges": total_edges,
+                "attempted_fields": att_fields,
+                "attempted_edges": att_edges,
+                "success_fields": succ_fields,
+                "success_edges": succ_edges,
+                "attempted_ops": len(self._ops_attempted[node]),
+                "success_ops": len(self._ops_success[node]),
+                "attempted_field_cov": _pct(att_fields, total_fields),
+                "success_field_cov": _pct(succ_fields, total_fields),
+                "attempted_edge_cov": _pct(att_edges, total_edges),
+                "success_edge_cov": _pct(succ_edges, total_edges),
+            }
+
+    def is_complete(self, node):
+        """True once every schema field of the node has been hit by a successful response."""
+        with self._lock:
+            uni = self.universe(node)
+            if not uni["fields"]:
+                return self._successes[node] > 0
+            return uni["fields"] & ~self._success[node]["fields"] == 0
+
+    def overall(self):
+        """Global coverage: OR of every node bitset against the union of node universes."""
+        with self._lock:
+            nodes = list(self._universe.keys())
+            uni = {k: 0 for k in self.KINDS}
+            succ = {k: 0 for k in self.KINDS}
+            att = {k: 0 for k in self.KINDS}
+            for node in nodes:
+                for k in self.KINDS:
+                    uni[k] |= self._universe[node][k]
+                    succ[k] |= self._success[node][k]
+                    att[k] |= self._attempted[node][k]
+            covered_nodes = sum(1 for node in nodes if self._successes[node] > 0)
+            return {
+                "nodes_total": len(nodes),
+                "nodes_covered": covered_nodes,
+                "node_cov": _pct(covered_nodes, len(nodes)),
+                "total_fields": uni["fields"].bit_count(),
+                "total_edges": uni["edges"].bit_count(),
+                "attempted_field_cov": _pct(att["fields"].bit_count(), uni["fields"].bit_count()),
+                "attempted_edge_cov": _pct(att["edges"].bit_count(), uni["edges"].bit_count()),
+                "success_field_cov": _pct(succ["fields"].bit_count(), uni["fields"].bit_count()),
+                "success_edge_cov": _pct(succ["edges"].bit_count(), uni["edges"].bit_count()),
+            }
+
+    def snapshot(self):
+        """JSON-serializable view of overall and per-node coverage."""
+        return {
+            "overall": self.overall(),
+            "nodes": {node: self.node_report(node) for node in list(self._universe.keys())},
+        }
+
+    def save_snapshot(self, path):
+        # Write-then-rename so pollers never read a half-written file;
+        # the tmp name is per-thread because node workers publish concurrently
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
@@ -0,0 +1,89 @@
+import math
+import os
+
+import faiss
+import numpy as np
+
+# auto | flat | hnsw | ivf
+INDEX_TYPE = os.getenv("PREDIQL_ANN_INDEX", "auto").lower()
+# auto: exact flat search up to this many vectors, HNSW above it
+FLAT_MAX = int(os.getenv("PREDIQL_ANN_FLAT_MAX", "20000"))
+HNSW_M = int(os.getenv("PREDIQL_ANN_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("PREDIQL_ANN_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("PREDIQL_ANN_EF_SEARCH", "64"))
+IVF_NPROBE = int(os.getenv("PREDIQL_ANN_NPROBE", "8"))
+# faiss wants ~39 training points per IVF list; below that IVF falls back to flat
+IVF_MIN_POINTS_PER_LIST = 39
+
+
+def ivf_lists(n):
+    """Number of IVF lists for n vectors (~4 * sqrt(n))."""
+    return max(1, int(4 * math.sqrt(n)))
+
+
+def choose_index_type(n, requested=None):
+    """Index type for a corpus of n vectors: the requested one if it can be built, else by size."""
+    requested = (requested or INDEX_TYPE).lower()
+    if requested == "ivf" and n < IVF_MIN_POINTS_PER_LIST * ivf_lists(n):
+        print(f"ℹ️ {n} vectors are too few to train IVF; using flat search")
+        return "flat"
+    if requested in ("flat", "hnsw", "ivf"):
+        return requested
+    return "flat" if n <= FLAT_MAX else "hnsw"
+
+
+def build_index(embeddings, index_type=None, ids=None):
+    """
+    L2 index over `embeddings` (float32, N x dim). Flat is exact; HNSW and IVF
+    trade a little recall for sub-linear search on large corpora. With `ids`
+    (int64, N) the index returns those ids instead of row positions.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    n, dim = embeddings.shape
+    index_type = choose_index_type(n, index_type)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif index_type == "ivf":
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, ivf_lists(n))
+        index.train(embeddings)
+    else:
+        index = faiss.IndexFlatL2(dim)
+    if ids is not None:
+        index = faiss.IndexIDMap(index)
+        index.add_with_ids(embeddings, np.ascontiguousarray(ids, dtype="int64"))
+    else:
+        index.add(embeddings)
+    configure_search(index)
+    return index
+
+
+def _unwrap(index):
+    """The index inside an IndexIDMap wrapper (or the index itself)."""
+    inner = getattr(index, "index", None)
+    return faiss.downcast_index(inner) if inner is not None else index
+
+
+def configure_search(index):
+    """Apply the search-time accuracy knobs (efSearch / nprobe) to a built or loaded index."""
+    hnsw = getattr(_unwrap(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:  # not an IVF index
+        return index
+    ivf.nprobe = min(IVF_NPROBE, ivf.nlist)
+    return index
+
+
+def index_type_of(index):
+    if getattr(_unwrap(index), "hnsw", None) is not None:
+        return "hnsw"
+    try:
+        faiss.extract_index_ivf(index)
+        return "ivf"
+    except RuntimeError:
+        return "flat"
@@ -0,0 +1,75 @@
+"""
+Recall/latency benchmark of the ANN index types against exact flat search.
+
+Run from prediql_legacy/:
+    python -m embed_retrieve.benchmark_ann                      # embeddings of the last run
+    python -m embed_retrieve.benchmark_ann --synthetic 50000    # random corpus of that size
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from embed_retrieve.ann_index import build_index, choose_index_type
+from embed_retrieve.vector_store import EMBEDDINGS_FILE, INDEX_DIR
+
+
+def load_corpus(args):
+    if args.synthetic:
+        rng = np.random.default_rng(args.seed)
+        # Clustered points look more like sentence embeddings than uniform noise
+        centers = rng.normal(size=(max(1, args.synthetic // 100), args.dim)).astype("float32")
+        labels = rng.integers(0, len(centers), size=args.synthetic)
+        return centers[labels] + 0.3 * rng.normal(size=(args.synthetic, args.dim)).astype("float32")
+    path = os.path.join(args.index_dir, EMBEDDINGS_FILE)
+    return np.load(path, mmap_mode="r")
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark flat vs HNSW vs IVF retrieval")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--synthetic", type=int, default=0, help="Use a random corpus of this many vectors")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension of the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = np.ascontiguousarray(load_corpus(args), dtype="float32")
+    n = len(corpus)
+    rng = np.random.default_rng(args.seed)
+    queries = corpus[rng.choice(n, size=min(args.queries, n), replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype("float32")
+
+    print(f"corpus: {n} x {corpus.shape[1]}, queries: {len(queries)}, k={args.top_k}, auto -> {choose_index_type(n)}")
+    truth = None
+    print(f"{'index':<6} {'build s':>8} {'recall@k':>9} {'mean ms':>8} {'p95 ms':>8}")
+    for kind in ("flat", "hnsw", "ivf"):
+        if choose_index_type(n, kind) != kind:
+            print(f"{kind:<6} skipped (corpus too small)")
+            continue
+        start = time.perf_counter()
+        index = build_index(corpus, kind)
+        build_s = time.perf_counter() - start
+
+        latencies, found = [], []
+        for q in queries:
+            start = time.perf_counter()
+            _, ids = index.search(q[None, :], args.top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found.append(ids[0])
+        found = np.array(found)
+        if truth is None:
+            truth = found  # flat runs first and is exact
+        print(f"{kind:<6} {build_s:>8.2f} {recall_at_k(found, truth):>9.3f} "
+              f"{np.mean(latencies):>8.3f} {np.percentile(latencies, 95):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Throughput and retrieval-quality benchmark of the embedder backends.
+
+Run from prediql_legacy/ after a run has extracted real data:
+    python -m embed_retrieve.benchmark_embedders
+    python -m embed_retrieve.benchmark_embedders --backends sentence-transformers onnx-int8
+
+The first backend is the reference. For every other backend the report shows
+load time, texts/s, mean cosine to the reference vectors of the same texts and
+overlap@k of the nearest records retrieved for the operation queries
+("{node}, input: {input}", as in process_node).
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from embed_retrieve.embedders import BACKENDS, get_embedder
+from save_real_data import load_real_data
+
+QUERY_INFO_PATH = "generated_query_info.json"
+
+
+def operation_queries(limit):
+    try:
+        with open(QUERY_INFO_PATH, encoding="utf-8") as f:
+            query_info = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return []
+    return [f"{node}, input: {info.get('parameters')}" for node, info in list(query_info.items())[:limit]]
+
+
+def top_k(corpus, queries, k):
+    scores = queries @ corpus.T  # vectors are L2-normalised, so this is cosine similarity
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedder backends")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--texts", type=int, default=2000, help="Number of real-data texts to embed")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = [r["text"] for r in load_real_data()][:args.texts]
+    if not texts:
+        raise SystemExit("No real data found; run PrediQL first so the real-data store exists.")
+    queries = operation_queries(args.queries) or texts[:args.queries]
+    print(f"texts: {len(texts)}, queries: {len(queries)}, k={args.top_k}")
+    print(f"{'backend':<22} {'load s':>7} {'texts/s':>9} {'cosine':>7} {'overlap@k':>10}")
+
+    reference = None
+    for backend in args.backends:
+        start = time.perf_counter()
+        embedder = get_embedder(backend)
+        load_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        corpus = embedder.encode(texts)
+        throughput = len(texts) / (time.perf_counter() - start)
+        neighbours = top_k(corpus, embedder.encode(queries), args.top_k)
+
+        if reference is None:
+            reference = (corpus, neighbours)
+            cosine, overlap = 1.0, 1.0
+        else:
+            ref_corpus, ref_neighbours = reference
+            cosine = float(np.mean(np.sum(corpus * ref_corpus, axis=1))) if corpus.shape == ref_corpus.shape else float("nan")
+            overlap = np.mean([len(set(a) & set(b)) / args.top_k for a, b in zip(neighbours, ref_neighbours)])
+        print(f"{backend:<22} {load_s:>7.2f} {throughput:>9.1f} {cosine:>7.3f} {overlap:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+from config import Config
+
+K1 = 1.5
+B = 0.75
+
+_WORD = re.compile(r"[A-Za-z0-9_]+")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def tokenize(text):
+    """
+    Lower-cased terms for lexical matching. Identifiers are kept whole and also
+    split on camelCase/snake_case, so "charactersByIds" matches "characters",
+    "ids" and itself, and "user_name" matches "user", "name" and itself.
+    """
+    terms = []
+    for word in _WORD.findall(text or ""):
+        lower = word.lower()
+        terms.append(lower)
+        parts = _CAMEL.findall(word)
+        if parts != [word]:
+            terms.extend(p.lower() for p in parts)
+    return terms
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index (term -> [(doc, tf)]). Documents are only
+    ever appended, which matches the append-only real-data store; idf and the
+    average length are computed at query time, so adding is O(doc length).
+    Scoring touches only the postings of the query terms.
+    """
+
+    def __init__(self, k1=K1, b=B):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.doc_len = []
+        self.records = []
+        self.total_len = 0
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, record):
+        doc = len(self.records)
+        terms = Counter(tokenize(record.get("text", "")))
+        for term, tf in terms.items():
+            self.postings[term].append((doc, tf))
+        length = sum(terms.values())
+        self.doc_len.append(length)
+        self.total_len += length
+        self.records.append(record)
+
+    def scores(self, query_text, filter_node_type=None):
+        """{doc: score} for documents sharing at least one term with the query."""
+        n = len(self.records)
+        if not n:
+            return {}
+        avg_len = self.total_len / n or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query_text)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, tf in postings:
+                if filter_node_type and self.records[doc].get("node_type") != filter_node_type:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc] / avg_len)
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query_text, top_k=5, filter_node_type=None):
+        """[(score, record)] best first, like retrieve_from_index.search."""
+        scores = self.scores(query_text, filter_node_type)
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(score, self.records[doc]) for doc, score in best]
+
+
+class StoreBM25:
+    """BM25Index kept in step with the real-data NDJSON store by reading only the lines appended since last time."""
+
+    def __init__(self, path=Config.REAL_DATA_FILE):
+        self.path = path
+        self.index = BM25Index()
+        self._offset = 0
+        self._inode = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        if not os.path.exists(self.path):
+            return self.index
+        stat = os.stat(self.path)
+        with self._lock:
+            if stat.st_ino != self._inode or stat.st_size < self._offset:
+                # Store was recreated (new run directory): start over
+                self.index, self._offset, self._inode = BM25Index(), 0, stat.st_ino
+            if stat.st_size == self._offset:
+                return self.index
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # partially written line; pick it up next time
+                    self._offset += len(line)
+                    try:
+                        self.index.add(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+            return self.index
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def search(query_text, top_k=5, filter_node_type=None):
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = StoreBM25()
+    return _STORE.refresh().search(query_text, top_k, filter_node_type)
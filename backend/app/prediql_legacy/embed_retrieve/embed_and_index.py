@@ -1,39 +1,91 @@
-import json
 import os
+from collections import defaultdict
+
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
+from save_real_data import load_real_data
+from embed_retrieve.ann_index import build_index, index_type_of
+from embed_retrieve.embedders import get_embedder
+from embed_retrieve.vector_store import (
+    INDEX_DIR, INDEX_FILE, OFFSETS_FILE, VectorStore, load_embedder_name, load_manifest, write_store,
+    write_subindexes,
+)
+
+
+def reusable_embeddings(records, embedder_name):
+    """
+    Embeddings already stored for the leading records. The real-data store is
+    append-only (and a knowledge-base warm start restores store and index
+    together), so if the last stored record is still at its position, every
+    stored row can be reused and only the new records need encoding.
+    """
+    if not os.path.exists(os.path.join(INDEX_DIR, OFFSETS_FILE)) or load_embedder_name(INDEX_DIR) != embedder_name:
+        return None
+    store = VectorStore(INDEX_DIR)
+    try:
+        n = len(store)
+        if n == 0 or n > len(records) or store.record(n - 1).get("text") != records[n - 1].get("text"):
+            return None
+        return np.array(store.embeddings[:n], dtype="float32")
+    finally:
+        store.close()
 
-def embed_real_data():
-    REAL_DATA_PATH = "real_data.json"
-    INDEX_DIR = "embed_retrieve/faiss_index"
 
+def build_node_type_subindexes(records, embeddings):
+    """Per-node-type sub-indexes for filtered search (ids point into the global store); returns how many."""
+    rows_by_type = defaultdict(list)
+    for row, record in enumerate(records):
+        if record.get("node_type"):
+            rows_by_type[record["node_type"]].append(row)
+    write_subindexes({
+        node_type: build_index(embeddings[rows], ids=np.asarray(rows, dtype="int64"))
+        for node_type, rows in rows_by_type.items()
+    }, INDEX_DIR)
+    return len(rows_by_type)
+
+
+def embed_real_data():
     os.makedirs(INDEX_DIR, exist_ok=True)
 
     # 1️⃣ Load data
-    with open(REAL_DATA_PATH) as f:
-        records = json.load(f)
+    records = load_real_data()
 
     texts = [r["text"] for r in records]
 
     print(f"✅ Loaded {len(texts)} texts for embedding.")
 
     # 2️⃣ Embed
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    embeddings = model.encode(texts, show_progress_bar=True)
+    embedder = get_embedder()  # PREDIQL_EMBEDDER: sentence-transformers | onnx | onnx-int8
+    known = reusable_embeddings(records, embedder.name)
+    if known is not None and len(known) == len(texts):
+        if load_manifest(INDEX_DIR) is None:
+            # e.g. a store restored or written without sub-indexes: build only those
+            n_types = build_node_type_subindexes(records, known)
+            print(f"ℹ️ All records are already embedded; built {n_types} missing node-type sub-indexes.")
+        else:
+            print("ℹ️ All records are already embedded.")
+        return
+    if known is not None:
+        print(f"ℹ️ Reusing {len(known)} stored embeddings; encoding {len(texts) - len(known)} new records.")
+        embeddings = np.vstack([known, embedder.encode(texts[len(known):], show_progress_bar=True)])
+    else:
+        embeddings = embedder.encode(texts, show_progress_bar=True)
 
     print(f"✅ Embedding shape: {embeddings.shape}")
 
-    # 3️⃣ Build FAISS index
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(np.array(embeddings).astype('float32'))
+    # 3️⃣ Save embeddings and records (memory-mapped by the retriever)
+    write_store(embeddings, records, INDEX_DIR, embedder_name=embedder.name)
+
+    # 4️⃣ Build FAISS index (flat for small corpora, HNSW/IVF for large ones; see ann_index)
+    index = build_index(embeddings)
 
-    faiss.write_index(index, os.path.join(INDEX_DIR, "index.faiss"))
+    tmp_path = os.path.join(INDEX_DIR, INDEX_FILE + ".tmp")
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, os.path.join(INDEX_DIR, INDEX_FILE))
 
-    # 4️⃣ Save metadata
-    with open(os.path.join(INDEX_DIR, "metadata.json"), "w") as f:
-        json.dump(records, f, indent=2)
+    # 5️⃣ Per-node-type sub-indexes for filtered search
+    n_types = build_node_type_subindexes(records, embeddings)
 
-    print(f"✅ Saved FAISS index and metadata for {len(records)} records!")
+    print(f"✅ Saved {index_type_of(index)} FAISS index and metadata for {len(records)} records "
+          f"({n_types} node-type sub-indexes)!")
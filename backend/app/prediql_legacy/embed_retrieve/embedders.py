@@ -0,0 +1,134 @@
+import os
+import threading
+
+import numpy as np
+
+# sentence-transformers | onnx | onnx-int8
+BACKEND = os.getenv("PREDIQL_EMBEDDER", "sentence-transformers").lower()
+MODEL_NAME = os.getenv("PREDIQL_EMBED_MODEL", "all-MiniLM-L6-v2")
+# Directory with model.onnx and tokenizer.json; downloaded from the Hugging Face hub when unset
+ONNX_MODEL_DIR = os.getenv("PREDIQL_ONNX_MODEL_DIR")
+ONNX_CACHE_DIR = os.getenv("PREDIQL_ONNX_CACHE_DIR", os.path.join("embed_retrieve", "onnx_models"))
+MAX_SEQ_LENGTH = 256
+BATCH_SIZE = 32
+
+
+class Embedder:
+    """Text -> float32 vectors. `name` identifies backend and model, so an index is queried with what built it."""
+
+    name = ""
+
+    def encode(self, texts, batch_size=BATCH_SIZE, show_progress_bar=False):
+        raise NotImplementedError
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """The original PyTorch path."""
+
+    def __init__(self, model_name=MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = f"sentence-transformers:{model_name}"
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts, batch_size=BATCH_SIZE, show_progress_bar=False):
+        vectors = self.model.encode(list(texts), batch_size=batch_size, show_progress_bar=show_progress_bar)
+        return np.asarray(vectors, dtype="float32")
+
+
+class OnnxEmbedder(Embedder):
+    """
+    The same sentence-transformers model run with ONNX Runtime on CPU: HF
+    tokenizer, transformer forward pass, mean pooling over the attention mask
+    and L2 normalisation, i.e. what the all-MiniLM-L6-v2 pipeline does, without
+    importing torch. With quantized=True the weights are dynamically quantized
+    to int8 once and the quantized model is cached next to the original.
+    """
+
+    def __init__(self, model_name=MODEL_NAME, quantized=False, model_dir=ONNX_MODEL_DIR):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = model_dir or _download_onnx(model_name)
+        model_path = os.path.join(model_dir, "model.onnx")
+        if quantized:
+            model_path = _quantize(model_path)
+        self.name = f"onnx{'-int8' if quantized else ''}:{model_name}"
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts, batch_size=BATCH_SIZE, show_progress_bar=False):
+        texts = list(texts)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype="int64")
+            mask = np.array([e.attention_mask for e in encodings], dtype="int64")
+            feeds = {"input_ids": input_ids, "attention_mask": mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype="int64")
+            hidden = self.session.run(None, feeds)[0]
+            weights = mask[:, :, None].astype("float32")
+            pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype("float32"))
+        if not batches:
+            return np.zeros((0, 0), dtype="float32")
+        return np.vstack(batches)
+
+
+def _download_onnx(model_name):
+    """model.onnx + tokenizer.json of a sentence-transformers model from the hub, cached locally."""
+    from huggingface_hub import hf_hub_download
+
+    repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    target = os.path.join(ONNX_CACHE_DIR, repo.replace("/", "__"))
+    if not os.path.exists(os.path.join(target, "model.onnx")):
+        os.makedirs(target, exist_ok=True)
+        for remote, local in (("onnx/model.onnx", "model.onnx"), ("tokenizer.json", "tokenizer.json")):
+            path = hf_hub_download(repo, remote)
+            with open(path, "rb") as src, open(os.path.join(target, local), "wb") as dst:
+                dst.write(src.read())
+    return target
+
+
+def _quantize(model_path):
+    quantized_path = model_path.replace(".onnx", "_int8.onnx")
+    if not os.path.exists(quantized_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        print(f"🔧 Quantizing {model_path} to int8")
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    return quantized_path
+
+
+BACKENDS = {
+    "sentence-transformers": lambda model_name: SentenceTransformerEmbedder(model_name),
+    "onnx": lambda model_name: OnnxEmbedder(model_name),
+    "onnx-int8": lambda model_name: OnnxEmbedder(model_name, quantized=True),
+}
+
+_EMBEDDERS = {}
+_EMBEDDERS_LOCK = threading.Lock()
+
+
+def get_embedder(name=None):
+    """
+    Process-wide embedder. `name` is "backend" or "backend:model" (as in Embedder.name);
+    defaults to PREDIQL_EMBEDDER / PREDIQL_EMBED_MODEL.
+    """
+    backend, _, model_name = (name or BACKEND).partition(":")
+    model_name = model_name or MODEL_NAME
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedder '{backend}', expected one of {sorted(BACKENDS)}")
+    key = (backend, model_name)
+    with _EMBEDDERS_LOCK:
+        if key not in _EMBEDDERS:
+            _EMBEDDERS[key] = BACKENDS[backend](model_name)
+        return _EMBEDDERS[key]
@@ -1,31 +1,72 @@
-import json
 import os
-import faiss
-import numpy as np
-from sentence_transformers import SentenceTransformer
 
+from embed_retrieve import bm25
+from embed_retrieve.embedders import get_embedder
+from embed_retrieve.vector_store import INDEX_DIR, get_index, get_store, load_embedder_name, load_manifest
 
-def search(query_text, top_k=5, filter_node_type=None):
-    
-    INDEX_DIR = "embed_retrieve/faiss_index"
-    QUERY_INFO_PATH = "generated_query_info.json"
+# dense: embeddings + FAISS | bm25: lexical inverted index, no neural encoder | hybrid: both, rank-fused
+RETRIEVER = os.getenv("PREDIQL_RETRIEVER", "dense").lower()
+RRF_K = 60  # reciprocal rank fusion constant
 
-    # Load index and metadata
-    index = faiss.read_index(os.path.join(INDEX_DIR, "index.faiss"))
-    with open(os.path.join(INDEX_DIR, "metadata.json")) as f:
-        records = json.load(f)
 
-    with open(QUERY_INFO_PATH) as f:
-        QUERY_INFO = json.load(f)
+def search(query_text, top_k=5, filter_node_type=None, retriever=None):
+    """[(score, record)] for the real-data records most relevant to `query_text`, using the run's retriever."""
+    retriever = (retriever or RETRIEVER).lower()
+    if retriever == "bm25":
+        return bm25.search(query_text, top_k, filter_node_type)
+    if retriever == "hybrid":
+        return hybrid_search(query_text, top_k, filter_node_type)
+    return dense_search(query_text, top_k, filter_node_type)
 
-    # Load model
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    q_emb = model.encode([query_text])
-    D, I = index.search(np.array(q_emb).astype('float32'), top_k * 2)
+
+def hybrid_search(query_text, top_k=5, filter_node_type=None):
+    """
+    Reciprocal rank fusion of dense and BM25 results: each list contributes
+    1 / (RRF_K + rank), so the two incomparable score scales never mix.
+    Falls back to BM25 alone while no dense index exists.
+    """
+    ranked_lists = [bm25.search(query_text, top_k * 2, filter_node_type)]
+    try:
+        ranked_lists.append(dense_search(query_text, top_k * 2, filter_node_type))
+    except (OSError, RuntimeError) as e:
+        print(f"ℹ️ dense retrieval unavailable, using BM25 only: {e}")
+    fused, records = {}, {}
+    for results in ranked_lists:
+        for rank, (_, record) in enumerate(results, 1):
+            key = record.get("text")
+            fused[key] = fused.get(key, 0.0) + 1.0 / (RRF_K + rank)
+            records.setdefault(key, record)
+    best = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    return [(score, records[key]) for key, score in best]
+
+
+def dense_search(query_text, top_k=5, filter_node_type=None):
+    # Index, record store and model are opened once and reused until the index is rebuilt;
+    # only the hit records are decoded
+    store = get_store(INDEX_DIR)
+    # Queries must be encoded by the embedder that built the index
+    embedder = get_embedder(load_embedder_name(INDEX_DIR) or "sentence-transformers")
+    q_emb = embedder.encode([query_text])
+
+    manifest = load_manifest(INDEX_DIR) if filter_node_type else None
+    if manifest is not None:
+        # Filtered search runs on the node type's own index: exactly top_k hits
+        # (if that many exist) without scanning the other types
+        if filter_node_type not in manifest:
+            return []
+        index = get_index(INDEX_DIR, filter_node_type)
+        D, I = index.search(q_emb, min(top_k, manifest[filter_node_type]))
+        return [(score, store.record(int(idx))) for score, idx in zip(D[0], I[0]) if idx >= 0]
+
+    # Indexes built without sub-indexes: over-fetch globally and filter
+    index = get_index(INDEX_DIR)
+    D, I = index.search(q_emb, top_k * 2 if filter_node_type else top_k)
 
     results = []
     for score, idx in zip(D[0], I[0]):
-        record = records[idx]
+        if idx < 0:
+            continue
+        record = store.record(int(idx))
         if filter_node_type and record["node_type"] != filter_node_type:
             continue
         results.append((score, record))
@@ -0,0 +1,188 @@
+import json
+import mmap
+import os
+import threading
+
+import faiss
+import numpy as np
+
+from embed_retrieve.ann_index import configure_search
+
+INDEX_DIR = "embed_retrieve/faiss_index"
+INDEX_FILE = "index.faiss"
+EMBEDDINGS_FILE = "embeddings.npy"  # float32 (N, dim)
+RECORDS_FILE = "records.ndjson"  # one JSON record per line
+OFFSETS_FILE = "offsets.npy"  # int64 (N + 1,) byte offsets of the lines in RECORDS_FILE
+LEGACY_METADATA_FILE = "metadata.json"
+SUBINDEX_DIR = "by_node_type"  # one index per node type, returning global record ids
+SUBINDEX_MANIFEST = "manifest.json"  # node type -> vector count
+EMBEDDER_FILE = "embedder.txt"  # Embedder.name that produced the vectors
+
+
+def _replace_atomically(path, write):
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_store(embeddings, records, index_dir=INDEX_DIR, embedder_name=None):
+    """Persist embeddings and records in the memory-mappable layout read by VectorStore."""
+    os.makedirs(index_dir, exist_ok=True)
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    offsets = [0]
+    lines = []
+    for record in records:
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        lines.append(line)
+        offsets.append(offsets[-1] + len(line))
+
+    def write_records(path):
+        with open(path, "wb") as f:
+            f.writelines(lines)
+
+    def write_npy(array):
+        def write(path):
+            with open(path, "wb") as f:
+                np.save(f, array)
+        return write
+
+    def write_embedder(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(embedder_name or "")
+
+    _replace_atomically(os.path.join(index_dir, RECORDS_FILE), write_records)
+    _replace_atomically(os.path.join(index_dir, EMBEDDER_FILE), write_embedder)
+    _replace_atomically(os.path.join(index_dir, EMBEDDINGS_FILE), write_npy(embeddings))
+    # Offsets last: readers key their cache on this file, so they only reopen once the rest is in place
+    _replace_atomically(os.path.join(index_dir, OFFSETS_FILE), write_npy(np.asarray(offsets, dtype="int64")))
+
+
+class VectorStore:
+    """
+    Read-only, memory-mapped view of an embedded corpus.
+
+    Embeddings are a float32 .npy opened with mmap_mode="r"; records are an
+    NDJSON file addressed through an int64 offset table, so record(i) decodes
+    only line i. Opening is O(1) regardless of corpus size and processes
+    that open the same files share the page cache.
+    """
+
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = index_dir
+        self.offsets = np.load(os.path.join(index_dir, OFFSETS_FILE), mmap_mode="r")
+        self.embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        self._file = open(os.path.join(index_dir, RECORDS_FILE), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._records = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def record(self, i):
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return json.loads(self._records[start:end])
+
+    def records(self, ids):
+        return [self.record(int(i)) for i in ids if 0 <= i < len(self)]
+
+    def close(self):
+        if isinstance(self._records, mmap.mmap):
+            self._records.close()
+        self._file.close()
+
+
+class LegacyStore:
+    """Records from an index built before the mmap layout (metadata.json), loaded once."""
+
+    def __init__(self, index_dir=INDEX_DIR):
+        with open(os.path.join(index_dir, LEGACY_METADATA_FILE), encoding="utf-8") as f:
+            self._records = json.load(f)
+
+    def __len__(self):
+        return len(self._records)
+
+    def record(self, i):
+        return self._records[i]
+
+    def records(self, ids):
+        return [self._records[int(i)] for i in ids if 0 <= i < len(self)]
+
+    def close(self):
+        pass
+
+
+_CACHE = {}  # (kind, key) -> (mtime, value)
+_CACHE_LOCK = threading.Lock()
+
+
+def _cached(kind, path, load):
+    """Value built by load(), reused until `path` changes on disk."""
+    mtime = os.stat(path).st_mtime_ns
+    with _CACHE_LOCK:
+        entry = _CACHE.get((kind, path))
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+        if entry is not None and hasattr(entry[1], "close"):
+            entry[1].close()
+        value = load()
+        _CACHE[(kind, path)] = (mtime, value)
+        return value
+
+
+def get_store(index_dir=INDEX_DIR):
+    offsets_path = os.path.join(index_dir, OFFSETS_FILE)
+    if os.path.exists(offsets_path):
+        return _cached("store", offsets_path, lambda: VectorStore(index_dir))
+    return _cached("store", os.path.join(index_dir, LEGACY_METADATA_FILE), lambda: LegacyStore(index_dir))
+
+
+def subindex_path(index_dir, node_type):
+    return os.path.join(index_dir, SUBINDEX_DIR, f"{node_type}.faiss")
+
+
+def write_subindexes(indexes, index_dir=INDEX_DIR):
+    """Persist {node_type: index} and replace the manifest; indexes of types no longer present are removed."""
+    sub_dir = os.path.join(index_dir, SUBINDEX_DIR)
+    os.makedirs(sub_dir, exist_ok=True)
+    for node_type, index in indexes.items():
+        path = subindex_path(index_dir, node_type)
+        _replace_atomically(path, lambda tmp, index=index: faiss.write_index(index, tmp))
+    manifest = {node_type: int(index.ntotal) for node_type, index in indexes.items()}
+
+    def write_manifest(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+    _replace_atomically(os.path.join(sub_dir, SUBINDEX_MANIFEST), write_manifest)
+    for filename in os.listdir(sub_dir):
+        if filename.endswith(".faiss") and filename[:-len(".faiss")] not in manifest:
+            os.remove(os.path.join(sub_dir, filename))
+
+
+def load_manifest(index_dir=INDEX_DIR):
+    """{node_type: count} of the per-type indexes, or None if the index was built without them."""
+    path = os.path.join(index_dir, SUBINDEX_DIR, SUBINDEX_MANIFEST)
+    if not os.path.exists(path):
+        return None
+    return _cached("manifest", path, lambda: _read_json(path))
+
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_index(index_dir=INDEX_DIR, node_type=None):
+    """Global index, or the node type's sub-index when `node_type` is given."""
+    path = subindex_path(index_dir, node_type) if node_type else os.path.join(index_dir, INDEX_FILE)
+    # IO_FLAG_MMAP maps IVF lists instead of copying them onto the heap
+    return _cached("index", path, lambda: configure_search(faiss.read_index(path, getattr(faiss, "IO_FLAG_MMAP", 0))))
+
+
+def load_embedder_name(index_dir=INDEX_DIR):
+    """Embedder that built the store, or None (legacy indexes: the default SentenceTransformer)."""
+    path = os.path.join(index_dir, EMBEDDER_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip() or None
@@ -0,0 +1,30 @@
+import hashlib
+import json
+import os
+
+from config import Config
+
+INTROSPECTION_FILE = "introspection_result.json"
+
+
+def schema_hash(introspection_path=INTROSPECTION_FILE):
+    """
+    Stable fingerprint of the introspected schema (sha256 of the canonical __schema JSON).
+    Returns None when no introspection result is available.
+    """
+    try:
+        with open(introspection_path, encoding="utf-8") as f:
+            introspection = json.load(f)
+        schema = introspection["data"]["__schema"]
+    except (OSError, json.JSONDecodeError, KeyError, TypeError) as e:
+        print(f"⚠️ cannot fingerprint schema from {introspection_path}: {e}")
+        return None
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def state_path(*parts):
+    """Path under Config.STATE_DIR, creating the parent directory."""
+    path = os.path.join(Config.STATE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,177 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from config import Config
+from endpoint_state import state_path
+from embed_retrieve.vector_store import INDEX_DIR
+from save_real_data import record_key, record_keys
+from value_pool import get_value_pool
+
+ENABLED = os.getenv("PREDIQL_KB", "1").lower() not in ("0", "false", "off", "no")
+PAYLOADS_FILE = "payloads.ndjson"
+REAL_DATA_FILE = "real_data.ndjson"
+INDEX_SUBDIR = "index"
+META_FILE = "meta.json"
+
+
+def kb_key(url, schema_hash):
+    return hashlib.sha256(f"{url}\n{schema_hash}".encode("utf-8")).hexdigest()[:24]
+
+
+class KnowledgeBase:
+    """
+    What earlier runs learned about one endpoint, under STATE_DIR/kb/<key>/
+    where the key covers the URL and the schema hash (a changed schema starts
+    a new knowledge base):
+
+    - payloads.ndjson: successful queries with their responses, one per (node, query)
+    - real_data.ndjson: the flattened real-data records
+    - index/: the embedded store and FAISS indexes built from those records
+
+    restore() seeds a fresh run from it; the record_* / sync_* methods append
+    what the run adds, so it is updated incrementally rather than rewritten.
+    """
+
+    def __init__(self, url, schema_hash):
+        self.url = url
+        self.schema_hash = schema_hash
+        self.dir = os.path.dirname(state_path("kb", kb_key(url, schema_hash), META_FILE))
+        self._lock = threading.Lock()
+        self._seen = set()  # (node, query) already stored
+        self._payloads = []  # stored successful payloads, oldest first
+        self._real_data_offset = 0  # bytes of the run's real-data store already copied
+        self._record_keys = record_keys(self._path(REAL_DATA_FILE))  # records already stored
+        for payload in self._read_payloads():
+            self._seen.add((payload["node"], payload["query"]))
+            self._payloads.append(payload)
+
+    def _path(self, *parts):
+        return os.path.join(self.dir, *parts)
+
+    def _read_payloads(self):
+        path = self._path(PAYLOADS_FILE)
+        if not os.path.exists(path):
+            return []
+        payloads = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    payloads.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # torn last line from an interrupted run
+        return payloads
+
+    # ---- warm start ----
+
+    def restore(self):
+        """Seed the run: real-data store, embedded index and value pool. Returns what was restored."""
+        restored = {"payloads": len(self._payloads), "records": 0, "index": False}
+        kb_real_data = self._path(REAL_DATA_FILE)
+        if os.path.exists(kb_real_data):
+            os.makedirs(Config.OUTPUT_DIR, exist_ok=True)
+            shutil.copyfile(kb_real_data, Config.REAL_DATA_FILE)
+            self._real_data_offset = os.path.getsize(Config.REAL_DATA_FILE)
+            restored["records"] = len(self._record_keys)
+        kb_index = self._path(INDEX_SUBDIR)
+        if os.path.isdir(kb_index):
+            shutil.copytree(kb_index, INDEX_DIR, dirs_exist_ok=True)
+            restored["index"] = True
+        pool = get_value_pool()
+        for payload in self._payloads:
+            pool.add_payload(payload["node"], payload)
+        self._write_meta()
+        return restored
+
+    def successes(self, node):
+        """Successful payloads of earlier runs for `node`, oldest first."""
+        with self._lock:
+            return [p for p in self._payloads if p["node"] == node]
+
+    # ---- incremental updates ----
+
+    def record_payload(self, node, payload):
+        """Keep a successful payload (called as responses arrive); duplicates of a stored query are ignored."""
+        query = payload.get("query") or payload.get("mutation")
+        if not payload.get("success") or not query:
+            return False
+        entry = {
+            "node": node,
+            "query": query,
+            "success": True,
+            "response_status": payload.get("response_status"),
+            "response_body": payload.get("response_body"),
+            "arm": payload.get("arm"),
+            "ts": datetime.datetime.utcnow().isoformat() + "Z",
+        }
+        with self._lock:
+            if (node, query) in self._seen:
+                return False
+            self._seen.add((node, query))
+            self._payloads.append(entry)
+            with open(self._path(PAYLOADS_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        return True
+
+    def sync_real_data(self):
+        """Append the records the run extracted since the last sync, skipping ones already stored. Returns how many were copied."""
+        if not os.path.exists(Config.REAL_DATA_FILE):
+            return 0
+        copied = 0
+        with self._lock, open(Config.REAL_DATA_FILE, "rb") as src, open(self._path(REAL_DATA_FILE), "ab") as dst:
+            src.seek(self._real_data_offset)
+            for line in src:
+                if not line.endswith(b"\n"):
+                    break
+                self._real_data_offset += len(line)
+                try:
+                    key = record_key(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+                if key in self._record_keys:
+                    continue
+                self._record_keys.add(key)
+                dst.write(line)
+                copied += 1
+        return copied
+
+    def sync_index(self):
+        """Replace the stored index with the run's current one (it covers every stored record)."""
+        if not os.path.isdir(INDEX_DIR):
+            return
+        target = self._path(INDEX_SUBDIR)
+        tmp = f"{target}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.copytree(INDEX_DIR, tmp)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {
+            "url": self.url,
+            "schema_hash": self.schema_hash,
+            "payloads": len(self._payloads),
+            "updated_at": datetime.datetime.utcnow().isoformat() + "Z",
+        }
+        with open(self._path(META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+
+_KB = None
+
+
+def open_knowledge_base(url, schema_hash):
+    """Open (and make current) the knowledge base for this endpoint; None when disabled or the schema is unknown."""
+    global _KB
+    if not ENABLED or not schema_hash:
+        return None
+    _KB = KnowledgeBase(url, schema_hash)
+    return _KB
+
+
+def get_knowledge_base():
+    return _KB
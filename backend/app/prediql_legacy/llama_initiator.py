@@ -1,6 +1,11 @@
+import json
 import logging
 import os
-import requests
+import threading
+import time
+
+from config import Config
+from llm_client import get_client, run_sync
 
 logging.basicConfig(
     level=logging.INFO,
@@ -8,52 +13,45 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_CALL_LOG_LOCK = threading.Lock()
 
-def get_llm_model(prompt: str) -> str:
-    provider = os.getenv("PREDIQL_LLM_PROVIDER", "openai_compatible")
-    api_key = os.getenv("PREDIQL_API_KEY", "")
-    model = os.getenv("PREDIQL_LLM_MODEL", "gpt-4o-mini")
 
-    if provider == "gemini":
-        return _call_gemini(prompt, api_key, model)
-    return _call_openai_compatible(prompt, api_key, model)
+def get_llm_model(prompt: str, prefix: str = None) -> str:
+    """
+    Blocking wrapper kept for existing callers; safe to call from several threads at once.
+    `prefix` is the stable part of the prompt (sent first so providers can cache it).
+    """
+    return run_sync(get_llm_model_async(prompt, prefix))
 
 
-def _call_openai_compatible(prompt: str, api_key: str, model: str) -> str:
-    base_url = os.getenv("PREDIQL_OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
-    url = f"{base_url}/chat/completions"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    payload = {
-        "model": model,
-        "messages": [{"role": "user", "content": prompt}],
-        "stream": False,
-        "temperature": 0.2,
-    }
-    try:
-        resp = requests.post(url, json=payload, headers=headers, timeout=120)
-        resp.raise_for_status()
-        data = resp.json()
-        choices = data.get("choices") or []
-        if choices:
-            return choices[0].get("message", {}).get("content", "")
-    except Exception as exc:
-        logger.error("OpenAI-compatible call failed: %s", exc)
-    return ""
-
-
-def _call_gemini(prompt: str, api_key: str, model: str) -> str:
-    base_url = os.getenv("PREDIQL_GEMINI_BASE_URL", "https://generativelanguage.googleapis.com").rstrip("/")
-    url = f"{base_url}/v1beta/models/{model}:generateContent?key={api_key}"
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
+async def get_llm_model_async(prompt: str, prefix: str = None) -> str:
+    """Coroutine form; await it on the shared client loop (llm_client.run_sync) or from the same loop."""
+    return await get_client().complete(prompt, prefix)
+
+
+def get_llm_models(prompts) -> list:
+    """Send a batch of prompts concurrently over the shared connection pool."""
+    return run_sync(get_client().complete_many(list(prompts)))
+
+
+def get_llm_model_with_usage(prompt: str, context=None, prefix: str = None, on_text=None) -> dict:
+    """
+    Like get_llm_model but returns the client's usage dict (text, prompt/completion tokens,
+    latency, cached) and appends it, tagged with `context` (node, arm, ...), to llm_calls.ndjson.
+    Passing `on_text` streams the completion (see AsyncLLMClient.complete_with_usage).
+    """
+    usage = run_sync(get_client().complete_with_usage(prompt, prefix, on_text))
+    record_llm_call(usage, context)
+    return usage
+
+
+def record_llm_call(usage, context=None):
+    record = {"ts": time.time(), **(context or {})}
+    record.update({k: v for k, v in usage.items() if k != "text"})
     try:
-        resp = requests.post(url, json=payload, timeout=120)
-        resp.raise_for_status()
-        data = resp.json()
-        candidates = data.get("candidates") or []
-        if candidates:
-            parts = candidates[0].get("content", {}).get("parts") or []
-            if parts:
-                return parts[0].get("text", "")
-    except Exception as exc:
-        logger.error("Gemini call failed: %s", exc)
-    return ""
+        with _CALL_LOG_LOCK:
+            os.makedirs(Config.OUTPUT_DIR, exist_ok=True)
+            with open(Config.LLM_CALLS_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        logger.warning("cannot record LLM call: %s", e)
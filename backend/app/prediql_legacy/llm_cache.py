@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from endpoint_state import state_path
+
+ENABLED = os.getenv("PREDIQL_LLM_CACHE", "1").lower() not in ("0", "false", "off", "no")
+TTL_SECONDS = float(os.getenv("PREDIQL_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("PREDIQL_LLM_CACHE_MAX_ENTRIES", "20000"))
+
+
+def cache_key(provider, model, temperature, prompt):
+    raw = json.dumps([provider, model, temperature, prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Disk-backed LLM response cache (sqlite under Config.STATE_DIR).
+
+    Entries are keyed by (provider, model, temperature, prompt hash) plus a
+    sample index: the n-th identical prompt within one process replays the
+    n-th cached response, so a re-run reproduces the same sequence of answers
+    while repeated prompts inside a run still get fresh samples once the
+    cached ones are used up. Entries older than `ttl` are ignored and the
+    least recently used rows are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, path=None, ttl=TTL_SECONDS, max_entries=MAX_ENTRIES):
+        self.path = path or state_path("llm_cache.sqlite")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._seen = defaultdict(int)  # key -> identical prompts served in this process
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT NOT NULL, idx INTEGER NOT NULL, response TEXT NOT NULL,"
+            " created REAL NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (key, idx))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Return (response, sample_idx) for the next sample of `key`; response is None on a miss."""
+        with self._lock:
+            idx = self._seen[key]
+            self._seen[key] += 1
+            now = time.time()
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND idx = ? AND created >= ?",
+                (key, idx, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None, idx
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ? AND idx = ?", (now, key, idx))
+            self._conn.commit()
+            self.hits += 1
+            return row[0], idx
+
+    def put(self, key, idx, response):
+        """Store `response` as sample `idx` of `key` (the index returned by the missing get)."""
+        if not response:
+            return
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, idx, response, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, idx, response, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_CACHE = None
+_CACHE_FAILED = False
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache, or None when disabled for this run (PREDIQL_LLM_CACHE=0)."""
+    global _CACHE, _CACHE_FAILED
+    if not ENABLED or _CACHE_FAILED:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None and not _CACHE_FAILED:
+            try:
+                _CACHE = LLMCache()
+            except (sqlite3.Error, OSError) as e:
+                print(f"⚠️ LLM cache unavailable: {e}")
+                _CACHE_FAILED = True
+        return _CACHE
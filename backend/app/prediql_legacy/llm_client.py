@@ -0,0 +1,406 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+import httpx
+
+from llm_cache import cache_key, get_cache
+from token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    Async sliding-window limiter for requests-per-minute and tokens-per-minute.
+    A limit of 0 disables that dimension.
+    """
+
+    WINDOW = 60.0
+
+    def __init__(self, rpm=0, tpm=0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._events = []  # (timestamp, tokens)
+        self._lock = asyncio.Lock()
+
+    def _prune(self, now):
+        cutoff = now - self.WINDOW
+        while self._events and self._events[0][0] <= cutoff:
+            self._events.pop(0)
+
+    async def acquire(self, tokens):
+        if not self.rpm and not self.tpm:
+            return
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                self._prune(now)
+                used_requests = len(self._events)
+                used_tokens = sum(t for _, t in self._events)
+                rpm_ok = not self.rpm or used_requests < self.rpm
+                # A single prompt larger than the TPM budget is let through on an empty window
+                tpm_ok = not self.tpm or used_tokens + tokens <= self.tpm or not self._events
+                if rpm_ok and tpm_ok:
+                    self._events.append((now, tokens))
+                    return
+                wait = self._events[0][0] + self.WINDOW - now
+            await asyncio.sleep(max(wait, 0.05))
+
+
+class AsyncLLMClient:
+    """
+    Reusable LLM client for OpenAI-compatible and Gemini providers.
+
+    One httpx.AsyncClient (persistent keep-alive connection pool) is shared by
+    every prompt; concurrent prompts are pipelined over it up to
+    `max_concurrency` in flight, subject to the provider's RPM/TPM limits.
+    Transient failures (timeouts, 429, 5xx) are retried with jittered
+    exponential backoff, honouring Retry-After when the provider sends it.
+    """
+
+    def __init__(self, provider, api_key, model, base_url=None, max_concurrency=4, rpm=0, tpm=0,
+                 max_retries=3, timeout=120.0, temperature=0.2):
+        self.provider = provider
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        if base_url:
+            self.base_url = base_url.rstrip("/")
+        elif provider == "gemini":
+            self.base_url = "https://generativelanguage.googleapis.com"
+        else:
+            self.base_url = "https://api.openai.com/v1"
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.limiter = RateLimiter(rpm=rpm, tpm=tpm)
+        self._semaphore = None
+        self._client = None
+
+    @classmethod
+    def from_env(cls):
+        provider = os.getenv("PREDIQL_LLM_PROVIDER", "openai_compatible")
+        if provider == "gemini":
+            base_url = os.getenv("PREDIQL_GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+        else:
+            base_url = os.getenv("PREDIQL_OPENAI_BASE_URL", "https://api.openai.com/v1")
+        return cls(
+            provider=provider,
+            api_key=os.getenv("PREDIQL_API_KEY", ""),
+            model=os.getenv("PREDIQL_LLM_MODEL", "gpt-4o-mini"),
+            base_url=base_url,
+            max_concurrency=int(os.getenv("PREDIQL_LLM_CONCURRENCY", "4")),
+            rpm=int(os.getenv("PREDIQL_LLM_RPM", "0")),
+            tpm=int(os.getenv("PREDIQL_LLM_TPM", "0")),
+            max_retries=int(os.getenv("PREDIQL_LLM_MAX_RETRIES", "3")),
+        )
+
+    def _ensure_client(self):
+        # Created lazily so both live on the event loop that uses them
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ---- request building / parsing ----
+
+    def _request(self, prompt, prefix=None, stream=False):
+        """
+        Build the provider request. A `prefix` (stable instructions + schema) is sent
+        first, as the system message / systemInstruction, so provider-side prompt
+        caching can match it across attempts; `prompt` carries the variable part.
+        With `stream=True` the provider answers with server-sent events.
+        """
+        if self.provider == "gemini":
+            if stream:
+                url = f"{self.base_url}/v1beta/models/{self.model}:streamGenerateContent?alt=sse&key={self.api_key}"
+            else:
+                url = f"{self.base_url}/v1beta/models/{self.model}:generateContent?key={self.api_key}"
+            payload = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+            if prefix:
+                payload["systemInstruction"] = {"parts": [{"text": prefix}]}
+            return url, payload, {"Content-Type": "application/json"}
+        url = f"{self.base_url}/chat/completions"
+        messages = [{"role": "system", "content": prefix}] if prefix else []
+        messages.append({"role": "user", "content": prompt})
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "temperature": self.temperature,
+        }
+        if stream and "api.openai.com" in self.base_url:
+            # Final SSE chunk then carries `usage`; not every compatible server accepts this
+            payload["stream_options"] = {"include_usage": True}
+        if prefix and "api.openai.com" in self.base_url:
+            # Routing hint so requests sharing a prefix land on the same cache; other
+            # OpenAI-compatible servers may reject unknown fields, so only send it to OpenAI.
+            payload["prompt_cache_key"] = "prediql-" + hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:32]
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        return url, payload, headers
+
+    def _extract_text(self, data):
+        if self.provider == "gemini":
+            candidates = data.get("candidates") or []
+            if candidates:
+                parts = candidates[0].get("content", {}).get("parts") or []
+                if parts:
+                    return parts[0].get("text", "")
+            return ""
+        choices = data.get("choices") or []
+        if choices:
+            return choices[0].get("message", {}).get("content", "") or ""
+        return ""
+
+    def _extract_delta(self, chunk):
+        """Text carried by one streamed chunk."""
+        if self.provider == "gemini":
+            return self._extract_text(chunk)
+        choices = chunk.get("choices") or []
+        if choices:
+            return (choices[0].get("delta") or {}).get("content") or ""
+        return ""
+
+    def _is_final(self, chunk):
+        """True for the chunk that carries the finish reason, i.e. the provider ended the completion."""
+        if self.provider == "gemini":
+            candidates = chunk.get("candidates") or []
+            return bool(candidates and candidates[0].get("finishReason"))
+        choices = chunk.get("choices") or []
+        return bool(choices and choices[0].get("finish_reason"))
+
+    def _extract_usage(self, data):
+        """(prompt_tokens, completion_tokens, cached_prompt_tokens) reported by the provider, or None."""
+        if self.provider == "gemini":
+            meta = data.get("usageMetadata") or {}
+            if "promptTokenCount" not in meta:
+                return None
+            return (meta.get("promptTokenCount", 0), meta.get("candidatesTokenCount", 0),
+                    meta.get("cachedContentTokenCount", 0))
+        usage = data.get("usage") or {}
+        if "prompt_tokens" not in usage:
+            return None
+        details = usage.get("prompt_tokens_details") or {}
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), details.get("cached_tokens", 0) or 0
+
+    # ---- calls ----
+
+    async def _post_with_retries(self, url, payload, headers):
+        client = self._ensure_client()
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = await client.post(url, json=payload, headers=headers)
+                if resp.status_code in RETRY_STATUS and attempt < self.max_retries:
+                    await asyncio.sleep(self._backoff(attempt, resp.headers.get("retry-after")))
+                    continue
+                resp.raise_for_status()
+                return resp.json()
+            except (httpx.TransportError, httpx.TimeoutException) as exc:
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning("LLM transport error (%s), retry %d/%d", exc, attempt + 1, self.max_retries)
+                await asyncio.sleep(self._backoff(attempt))
+        return {}
+
+    async def _stream_with_retries(self, url, payload, headers, on_text):
+        """
+        Consume an SSE completion, calling on_text(delta) as text arrives.
+        Returns (text, usage_chunk, complete). Only failures before the first token are retried;
+        after that the partial text is kept, since callers may already have acted on it, and
+        complete is False unless the stream ended with a finish reason or [DONE].
+        """
+        client = self._ensure_client()
+        parts, usage_chunk, complete = [], {}, False
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with client.stream("POST", url, json=payload, headers=headers) as resp:
+                    if resp.status_code in RETRY_STATUS and attempt < self.max_retries:
+                        await resp.aread()
+                        await asyncio.sleep(self._backoff(attempt, resp.headers.get("retry-after")))
+                        continue
+                    resp.raise_for_status()
+                    async for line in resp.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            complete = True
+                            continue
+                        if not data:
+                            continue
+                        try:
+                            chunk = json.loads(data)
+                        except json.JSONDecodeError:
+                            continue
+                        if self._is_final(chunk):
+                            complete = True
+                        if chunk.get("usage") or chunk.get("usageMetadata"):
+                            usage_chunk = chunk
+                        delta = self._extract_delta(chunk)
+                        if delta:
+                            parts.append(delta)
+                            try:
+                                on_text(delta)
+                            except Exception as exc:
+                                logger.warning("stream callback failed: %s", exc)
+                return "".join(parts), usage_chunk, complete
+            except (httpx.TransportError, httpx.TimeoutException) as exc:
+                if parts:
+                    logger.warning("LLM stream interrupted (%s); keeping partial completion", exc)
+                    return "".join(parts), usage_chunk, False
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning("LLM transport error (%s), retry %d/%d", exc, attempt + 1, self.max_retries)
+                await asyncio.sleep(self._backoff(attempt))
+        return "".join(parts), usage_chunk, False
+
+    @staticmethod
+    def _backoff(attempt, retry_after=None):
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        # Full jitter around an exponential base so concurrent retries spread out
+        return min(30.0, 1.0 * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+    async def complete(self, prompt, prefix=None):
+        """Return the completion text for `prompt`, or "" on failure."""
+        return (await self.complete_with_usage(prompt, prefix))["text"]
+
+    async def complete_with_usage(self, prompt, prefix=None, on_text=None):
+        """
+        Completion plus accounting for one call: {text, prompt_tokens, completion_tokens,
+        total_tokens, cached_prompt_tokens, latency_ms, first_token_ms, cached, usage_source}.
+        Token counts come from the provider's `usage` when present, else the local tokenizer.
+        Cache hits report the tokens the call would have cost but are flagged `cached`;
+        `cached_prompt_tokens` is the part of the prompt served from the provider's prefix cache.
+        A call that failed (no response after retries) reports zero tokens and usage_source "failed".
+        With `on_text`, the completion is streamed and on_text(delta) is called on the client
+        loop as text arrives (a cache hit is delivered as a single delta); keep it non-blocking.
+        Cache lookups and local token counting run in worker threads so they do not stall the
+        other calls sharing the loop.
+        """
+        self._ensure_client()
+        started = time.perf_counter()
+        cache = await asyncio.to_thread(get_cache)
+        text, data, cached = "", None, False
+        complete = True  # False when a stream was cut off; such text is used but never cached
+        failed = False
+        local_prompt_tokens = None
+        first_token = None
+
+        def emit(delta):
+            nonlocal first_token
+            if first_token is None:
+                first_token = time.perf_counter()
+            on_text(delta)
+
+        if cache is not None:
+            key = cache_key(self.provider, self.model, self.temperature, f"{prefix or ''}\x00{prompt}")
+            hit, sample_idx = await asyncio.to_thread(cache.get, key)
+            if hit is not None:
+                text, cached = hit, True
+                if on_text:
+                    emit(hit)
+        if not cached:
+            url, payload, headers = self._request(prompt, prefix, stream=on_text is not None)
+            local_prompt_tokens = await asyncio.to_thread(count_tokens, (prefix or "") + prompt, self.model)
+            async with self._semaphore:
+                await self.limiter.acquire(local_prompt_tokens)
+                try:
+                    if on_text:
+                        text, data, complete = await self._stream_with_retries(url, payload, headers, emit)
+                    else:
+                        data = await self._post_with_retries(url, payload, headers) or {}
+                        text = self._extract_text(data)
+                except Exception as exc:
+                    logger.error("%s call failed: %s", self.provider, exc)
+                    data, failed = {}, True
+            if cache is not None and complete and not failed:
+                await asyncio.to_thread(cache.put, key, sample_idx, text)
+            elif cache is not None and not failed:
+                logger.warning("%s stream ended without a finish; not caching the partial completion", self.provider)
+
+        usage = self._extract_usage(data) if data else None
+        if usage is not None:
+            prompt_tokens, completion_tokens, cached_prompt_tokens = usage
+            usage_source = "provider"
+        elif failed:
+            # Nothing came back, so nothing is charged against the token budget
+            prompt_tokens = completion_tokens = cached_prompt_tokens = 0
+            usage_source = "failed"
+        else:
+            if local_prompt_tokens is None:
+                local_prompt_tokens = await asyncio.to_thread(count_tokens, (prefix or "") + prompt, self.model)
+            prompt_tokens = local_prompt_tokens
+            completion_tokens = await asyncio.to_thread(count_tokens, text, self.model)
+            cached_prompt_tokens = 0
+            usage_source = "local"
+        return {
+            "text": text,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "cached_prompt_tokens": cached_prompt_tokens,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "first_token_ms": round((first_token - started) * 1000, 1) if first_token else None,
+            "cached": cached,
+            "usage_source": usage_source,
+        }
+
+    async def complete_many(self, prompts):
+        """Run several prompts concurrently over the shared pool; results keep input order."""
+        return await asyncio.gather(*(self.complete(p) for p in prompts))
+
+
+class _LoopThread:
+    """Background event loop so synchronous pipeline code can share one async client and pool."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-client-loop", daemon=True)
+        self.thread.start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+
+_LOOP = None
+_CLIENT = None
+_INIT_LOCK = threading.Lock()
+
+
+def get_client():
+    """Process-wide client configured from PREDIQL_* env vars, bound to the background loop."""
+    global _LOOP, _CLIENT
+    with _INIT_LOCK:
+        if _CLIENT is None:
+            _LOOP = _LoopThread()
+            _CLIENT = AsyncLLMClient.from_env()
+        return _CLIENT
+
+
+def run_sync(coro):
+    """Run a coroutine on the shared client loop from any (non-async) thread."""
+    get_client()
+    return _LOOP.run(coro)
@@ -0,0 +1,166 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import requests
+
+from endpoint_state import INTROSPECTION_FILE, state_path
+from load_introspection.introspection_query import introspection_query
+from load_introspection.schema_artifact import SCHEMA_ARTIFACT
+
+# A refetch is forced after this many seconds even if the fingerprint still matches
+MAX_AGE = int(os.getenv("PREDIQL_INTROSPECTION_MAX_AGE", "86400"))
+ENABLED = os.getenv("PREDIQL_INTROSPECTION_CACHE", "1").lower() not in ("0", "false", "off", "no")
+HEADERS = {"Content-Type": "application/json"}
+META_FILE = "meta.json"
+# Compiled artifacts derived from the introspection result, at the paths the pipeline reads them from
+COMPILED_ARTIFACTS = (SCHEMA_ARTIFACT,)
+QUERY_INFO_ARTIFACT = "generated_query_info.json"
+ARTIFACTS = COMPILED_ARTIFACTS + (QUERY_INFO_ARTIFACT,)
+
+# Types, fields, arguments and enum values by name only: a few KB instead of the
+# full introspection with 8 levels of TypeRef nesting, and enough to notice added
+# or removed operations, fields and arguments
+FINGERPRINT_QUERY = """query PrediqlSchemaFingerprint {
+  __schema {
+    queryType { name }
+    mutationType { name }
+    types {
+      kind
+      name
+      fields(includeDeprecated: true) { name args { name } }
+      inputFields { name }
+      enumValues(includeDeprecated: true) { name }
+    }
+  }
+}"""
+
+
+def _canonical_hash(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class IntrospectionCache:
+    """
+    Per-endpoint cache of the introspection result and the artifacts compiled
+    from it, under STATE_DIR/introspection/<sha256(url)>/.
+
+    refresh() decides whether the cached schema is still current: first with
+    the cheap fingerprint query, and when the endpoint rejects that, with a
+    conditional full request (If-None-Match on the stored ETag). A fresh cache
+    restores introspection_result.json; compiled artifacts are restored
+    separately with restore_artifacts(), so an unchanged schema skips
+    fetching and compiling entirely.
+    """
+
+    def __init__(self, url, headers=None):
+        self.url = url
+        self.headers = headers or HEADERS
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:24]
+        self.dir = os.path.dirname(state_path("introspection", key, META_FILE))
+        self.meta = self._load_meta()
+        self.fingerprint = None
+
+    def _path(self, name):
+        return os.path.join(self.dir, name.replace("/", "__"))
+
+    def _load_meta(self):
+        try:
+            with open(self._path(META_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_meta(self):
+        with open(self._path(META_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, indent=2)
+
+    def _post(self, query, extra_headers=None):
+        return requests.post(self.url, json={"query": query}, headers={**self.headers, **(extra_headers or {})},
+                             timeout=60)
+
+    def _fetch_fingerprint(self):
+        try:
+            response = self._post(FINGERPRINT_QUERY)
+            response.raise_for_status()
+            schema = response.json()["data"]["__schema"]
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            print(f"ℹ️ schema fingerprint query failed ({e}); falling back to a full introspection")
+            return None
+        return _canonical_hash(schema)
+
+    def _touch(self):
+        self.meta["fetched_at"] = time.time()
+        self.meta["fetched_at_iso"] = datetime.datetime.utcnow().isoformat() + "Z"
+        self._save_meta()
+
+    def _cached_result_usable(self):
+        if not os.path.exists(self._path(INTROSPECTION_FILE)):
+            return False
+        return time.time() - self.meta.get("fetched_at", 0) <= MAX_AGE
+
+    def refresh(self):
+        """
+        Make INTROSPECTION_FILE current. Returns "hit" when the cached schema is
+        unchanged (and restored), "fetched" when a new introspection was downloaded.
+        Raises requests.RequestException if the full introspection fails.
+        """
+        usable = ENABLED and self._cached_result_usable()
+        # Without the cache there is nothing to compare the fingerprint with
+        self.fingerprint = self._fetch_fingerprint() if ENABLED else None
+        if usable and self.fingerprint and self.fingerprint == self.meta.get("fingerprint"):
+            shutil.copyfile(self._path(INTROSPECTION_FILE), INTROSPECTION_FILE)
+            print(f"✅ Schema of {self.url} unchanged (fingerprint {self.fingerprint[:12]}); using cached introspection")
+            return "hit"
+
+        conditional = {"If-None-Match": self.meta["etag"]} if usable and not self.fingerprint and self.meta.get("etag") else None
+        print(f"✅ Sending introspection query to {self.url} ...")
+        response = self._post(introspection_query, conditional)
+        if response.status_code == 304:
+            shutil.copyfile(self._path(INTROSPECTION_FILE), INTROSPECTION_FILE)
+            print("✅ Introspection not modified (ETag); using cached introspection")
+            # The server confirmed the cached result, so it is fresh again for MAX_AGE
+            self._touch()
+            return "hit"
+        response.raise_for_status()
+        result_json = response.json()
+        with open(INTROSPECTION_FILE, "w", encoding="utf-8") as f:
+            json.dump(result_json, f, indent=2, ensure_ascii=False)
+        print(f"✅ Introspection result saved to {INTROSPECTION_FILE}")
+        if ENABLED:
+            shutil.copyfile(INTROSPECTION_FILE, self._path(INTROSPECTION_FILE))
+            self.meta = {
+                "url": self.url,
+                "fingerprint": self.fingerprint,
+                "etag": response.headers.get("ETag"),
+                "fetched_at": time.time(),
+                "fetched_at_iso": datetime.datetime.utcnow().isoformat() + "Z",
+                "artifacts": [],
+            }
+            self._save_meta()
+        return "fetched"
+
+    def restore_artifacts(self, names=ARTIFACTS):
+        """Copy cached compiled artifacts back into place; False (nothing copied) unless all are cached."""
+        if not ENABLED or not all(name in self.meta.get("artifacts", []) for name in names):
+            return False
+        if not all(os.path.exists(self._path(name)) for name in names):
+            return False
+        for name in names:
+            shutil.copyfile(self._path(name), name)
+        print(f"✅ Restored {len(names)} compiled schema artifacts from cache")
+        return True
+
+    def save_artifacts(self, names=ARTIFACTS):
+        """Cache compiled artifacts built from the current introspection result."""
+        if not ENABLED or not self.meta:
+            return
+        for name in names:
+            if os.path.exists(name):
+                shutil.copyfile(name, self._path(name))
+                if name not in self.meta["artifacts"]:
+                    self.meta["artifacts"].append(name)
+        self._save_meta()
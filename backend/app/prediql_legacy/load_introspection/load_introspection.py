@@ -1,5 +1,6 @@
 import json
-import yaml
+
+from schema_artifact import write_schema_artifact
 
 
 def flatten_type(type_obj):
@@ -120,23 +121,10 @@ def get_lists():
     # 4️⃣ Extract all objects/input objects
     object_list = parse_object_types(all_types)
 
-    # 5️⃣ Save to YAML
-    with open("load_introspection/query_parameter_list.yml", "w", encoding="utf-8") as f:
-        yaml.dump(query_parameters, f, sort_keys=False, allow_unicode=True)
-    print("✅ Saved query_parameter_list.yml")
-
-    if mutation_parameters:
-        with open("load_introspection/mutation_parameter_list.yml", "w", encoding="utf-8") as f:
-            yaml.dump(mutation_parameters, f, sort_keys=False, allow_unicode=True)
-        print("✅ Saved mutation_parameter_list.yml")
-    else:
-        with open("load_introspection/mutation_parameter_list.yml", "w", encoding="utf-8") as f:
-            f.write("# No mutations defined in schema\n{}\n")
-        print("ℹ️ No mutations found. Wrote empty mutation_parameter_list.yml")
-
-    with open("load_introspection/object_list.yml", "w", encoding="utf-8") as f:
-        yaml.dump(object_list, f, sort_keys=False, allow_unicode=True)
-    print("✅ Saved object_list.yml")
+    # 5️⃣ Save the compiled schema artifact (and the YAML files when PREDIQL_SCHEMA_YAML is set)
+    write_schema_artifact(query_parameters, mutation_parameters, object_list)
+    if not mutation_parameters:
+        print("ℹ️ No mutations found in schema")
     return query_name, mutation_name, object_list
 
 
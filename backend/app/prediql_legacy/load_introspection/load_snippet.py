@@ -1,7 +1,7 @@
-import yaml
-
 import json
 
+from load_introspection.schema_artifact import load_schema
+
 
 def unwrap_type(type_str):
     """Remove GraphQL wrappers to get base type name."""
@@ -63,15 +63,11 @@ def get_node_info(node_name):
     Given a node name, find it in either query or mutation parameter list,
     and return its inputs, output type, and all relevant objects.
     """
-    # Load all parameter lists
-    with open("load_introspection/query_parameter_list.yml") as f:
-        query_params = yaml.safe_load(f) or {}
-
-    with open("load_introspection/mutation_parameter_list.yml") as f:
-        mutation_params = yaml.safe_load(f) or {}
-
-    with open("load_introspection/object_list.yml") as f:
-        objects = yaml.safe_load(f) or {}
+    # Load all parameter lists (parsed once per process)
+    schema = load_schema()
+    query_params = schema["query"]
+    mutation_params = schema["mutation"]
+    objects = schema["objects"]
 
     # Determine source (query or mutation)
     if node_name in query_params:
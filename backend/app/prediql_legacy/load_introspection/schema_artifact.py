@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib json module reads the same file, just slower
+    orjson = None
+
+SCHEMA_VERSION = 1
+SCHEMA_ARTIFACT = "load_introspection/schema.json"
+# The YAML files the pipeline used to exchange; still written on request for inspection or external tools
+YAML_FILES = {
+    "query": "load_introspection/query_parameter_list.yml",
+    "mutation": "load_introspection/mutation_parameter_list.yml",
+    "objects": "load_introspection/object_list.yml",
+}
+EXPORT_YAML = os.getenv("PREDIQL_SCHEMA_YAML", "0").lower() in ("1", "true", "on", "yes")
+
+
+def load_json(path):
+    """json.load of a file, through orjson when it is installed."""
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _dump_json(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def write_schema_artifact(query_parameters, mutation_parameters, object_list, path=SCHEMA_ARTIFACT,
+                          export_yaml=EXPORT_YAML):
+    """
+    Save the compiled operations and object types as one versioned JSON file
+    (written atomically). With export_yaml the three YAML files are written as well.
+    """
+    artifact = {
+        "version": SCHEMA_VERSION,
+        "query": query_parameters or {},
+        "mutation": mutation_parameters or {},
+        "objects": object_list or {},
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_dump_json(artifact))
+    os.replace(tmp, path)
+    print(f"✅ Saved {path}")
+    if export_yaml:
+        export_yaml_files(artifact)
+    return artifact
+
+
+def export_yaml_files(artifact):
+    import yaml
+
+    for key, path in YAML_FILES.items():
+        with open(path, "w", encoding="utf-8") as f:
+            yaml.dump(artifact[key], f, sort_keys=False, allow_unicode=True)
+        print(f"✅ Saved {path}")
+
+
+_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def load_schema(path=SCHEMA_ARTIFACT):
+    """
+    The compiled schema: {"version", "query", "mutation", "objects"}. Parsed once
+    per process and re-read only when the file changes; treat it as read-only.
+    """
+    if not os.path.exists(path):
+        # The committed load_introspection/*.yml files are samples from another endpoint; never fall back to them
+        raise FileNotFoundError(f"Schema artifact not found: {path}; run load_introspection/load_introspection.py")
+    mtime = os.path.getmtime(path)
+    with _CACHE_LOCK:
+        cached = _CACHE.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    artifact = load_json(path)
+    if artifact.get("version") != SCHEMA_VERSION:
+        raise ValueError(f"{path} has schema artifact version {artifact.get('version')}, "
+                         f"expected {SCHEMA_VERSION}; recompile with load_introspection.py")
+    with _CACHE_LOCK:
+        _CACHE[path] = (mtime, artifact)
+    return artifact
+
+
+def query_parameters(path=SCHEMA_ARTIFACT):
+    return load_schema(path)["query"]
+
+
+def mutation_parameters(path=SCHEMA_ARTIFACT):
+    return load_schema(path)["mutation"]
+
+
+def object_list(path=SCHEMA_ARTIFACT):
+    return load_schema(path)["objects"]
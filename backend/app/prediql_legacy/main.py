@@ -9,7 +9,7 @@ import requests
 from config import Config
 # from fuzzing import GraphQLFuzzer
 
-from sendpayload import send_payload
+from sendpayload import send_payload, PayloadDispatcher
 from initial_llama3 import ensure_ollama_running
 
 from target_endpoints import  getnodefromcompiledfile
@@ -26,8 +26,10 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 import random
 from load_introspection.load_snippet import get_node_info
+from load_introspection.introspection_cache import COMPILED_ARTIFACTS, QUERY_INFO_ARTIFACT, IntrospectionCache
+from requests import RequestException
 
-from embed_retrieve.retrieve_from_index import search
+from embed_retrieve.retrieve_from_index import search, RETRIEVER
 from embed_retrieve.embed_and_index import embed_real_data
 
 
@@ -46,6 +48,9 @@ def main():
     parser.add_argument("--url", type= str, help="GraphQL endpoint url")
     parser.add_argument("--requests", type= int, help="Number of requests per node per round")
     parser.add_argument("--rounds", type= int, help="Total number of rounds")
+    parser.add_argument("--target-coverage", type= float, default=None, help="Stop once overall successful field coverage (%%) reaches this value")
+    parser.add_argument("--budget-requests", type= int, default=None, help="Hard limit on requests sent to the endpoint for the whole run")
+    parser.add_argument("--budget-tokens", type= int, default=None, help="Hard limit on LLM tokens for the whole run")
 
     # parser.add_argument("requests", type=int, help="Maximum number of requests to send to test the endpoint")
 
@@ -54,18 +59,27 @@ def main():
     url = args.url
     requests = args.requests
     rounds = args.rounds
+    target_coverage = args.target_coverage
+    budget_requests = args.budget_requests
+    budget_tokens = args.budget_tokens
     # requests = args.requests
     # nodes = ["episodesByIds", "charactersByIds", "locationsByIds"]
     
     # output_folder = Config.OUTPUT_DIR
     # Config.OUTPUT_DIR += f"_{url}"
     output_folder = Config.OUTPUT_DIR
+    # Introspection and compiled artifacts are cached per endpoint; an unchanged schema skips both steps
+    introspection = IntrospectionCache(url)
     try:
-        subprocess.run(['python', 'load_introspection/save_instrospection.py', '--url', url], check=True)
-        subprocess.run(['python', 'load_introspection/load_introspection.py'], check=True)
+        schema_cached = introspection.refresh() == "hit" and introspection.restore_artifacts(COMPILED_ARTIFACTS)
+        if not schema_cached:
+            subprocess.run(['python', 'load_introspection/load_introspection.py'], check=True)
+    except RequestException as e:
+        print(f"❌ Introspection request failed: {e}")
+        sys.exit(1)
     except subprocess.CalledProcessError as e:
         print(f"❌ Subprocess failed with exit code {e.returncode}")
-        sys.exit()
+        sys.exit(1)
         # Optionally re-raise or exit
 
 
@@ -105,12 +119,15 @@ def main():
     # texts, records = load_texts()
     from save_query_info import save_query_info
     
-    save_query_info()
+    if not (schema_cached and introspection.restore_artifacts([QUERY_INFO_ARTIFACT])):
+        save_query_info()
+        introspection.save_artifacts()
 
 
     ensure_ollama_running("llama3")
     stats_allrounds = {}
-    run_all_nodes(url, nodes['Node'], requests, rounds, stats_allrounds)
+    run_all_nodes(url, nodes['Node'], requests, rounds, stats_allrounds, target_coverage,
+                  budget_requests=budget_requests, budget_tokens=budget_tokens)
     # log_to_table(stats_allrounds, "prediql-output/stats_table_allrounds.txt")
     # log_to_table(stats_allrounds, Config.OUTPUT_DIR + "/stats_table_allrounds.txt")
     subprocess.run(['python', 'reorganize_json_records.py'])
@@ -118,29 +135,88 @@ def main():
 
 
 
-def run_all_nodes(url, nodes, max_requests, rounds, stats_allrounds):
+def run_all_nodes(url, nodes, max_requests, rounds, stats_allrounds, target_coverage=None,
+                  budget_requests=None, budget_tokens=None):
+    coverage = CoverageEngine.from_files()
+    for node in nodes:
+        coverage.universe(node)
+    scheduler = BudgetScheduler(coverage, max_requests=budget_requests, max_tokens=budget_tokens,
+                                target_coverage=target_coverage)
+    endpoint_schema = schema_hash()
+    warm_start_bandit(endpoint_schema)
+    kb = open_knowledge_base(url, endpoint_schema)
+    if kb is not None:
+        print(f"🧠 Knowledge base warm start: {kb.restore()}")
     for i in range(1, rounds+1):
         all_stats = {}
-        for node in nodes:
-            result = process_node(url, node, max_requests * i)
-        # for node in tqdm(nodes, desc="Processing nodes"):
-        #     try:
-        #         result = process_node(url, node, max_requests)
-            all_stats.update(result)
-        #     except Exception as e:
-        #         print(f"❌ Error processing node: {e}")
-        #     time.sleep(random.uniform(1.5, 3.0))  # stagger requests
+        allocation = scheduler.allocate(nodes, max_requests)
+        print(f"📊 Round {i} allocation: {allocation}")
+        # Nodes run concurrently so their LLM calls overlap on the shared client pool;
+        # coverage, scheduler and bandit state are lock-protected.
+        with ThreadPoolExecutor(max_workers=NODE_WORKERS) as executor:
+            futures = {}
+            for node in nodes:
+                if not allocation.get(node):
+                    continue
+                sent_so_far = coverage.node_report(node)["requests"]
+                futures[executor.submit(process_node, url, node, sent_so_far + allocation[node], coverage, scheduler)] = node
+            for future in as_completed(futures):
+                try:
+                    all_stats.update(future.result())
+                except Exception as e:
+                    print(f"❌ Error processing node {futures[future]}: {e}")
         # log_to_table(all_stats, f"prediql-output/stats_table_round_{i}.txt")
-        log_to_table(all_stats, Config.OUTPUT_DIR + f"/stats_table_round_{i}.txt")
+        log_to_table(all_stats, os.path.join(Config.OUTPUT_DIR, f"stats_table_round_{i}.txt"))
         try:
             data_length = flatten_real_data()
-            if data_length > 0:
+            # BM25 reads the real-data store directly; only dense/hybrid retrieval need embeddings
+            if data_length > 0 and RETRIEVER != "bm25":
                 embed_real_data()
+                if kb is not None:
+                    kb.sync_index()
         except json.JSONDecodeError:
                 print(f"⚠️ cannot process embedding")
+        if kb is not None:
+            kb.sync_real_data()
+        get_synthesizer(reload=True)  # pick up values harvested this round
+        save_value_pool()
         print(all_stats)
         write_to_all_rounds(stats_allrounds, all_stats)
-        log_to_table(stats_allrounds, Config.OUTPUT_DIR + "/stats_table_allrounds.txt")
+        save_bandit_state(endpoint_schema, coverage)
+        log_to_table(stats_allrounds, os.path.join(Config.OUTPUT_DIR, "stats_table_allrounds.txt"))
+        cache = get_cache()
+        if cache is not None:
+            print(f"💾 LLM cache after round {i}: {cache.stats()}")
+        if scheduler.target_reached():
+            print(f"🎯 Target coverage {target_coverage:.1f}% reached after round {i}; stopping early.")
+            break
+        if scheduler.exhausted():
+            print(f"💸 Run budget exhausted after round {i}: {scheduler.summary()['requests_used']} requests, "
+                  f"{scheduler.summary()['tokens_used']:.0f} tokens; stopping early.")
+            break
+
+
+def save_value_pool():
+    pool = get_value_pool()
+    try:
+        pool.save()
+    except OSError as e:
+        print(f"⚠️ value pool write error: {e}")
+        return
+    print(f"🗂️ value pool: {pool.stats()}")
+
+
+def publish_coverage(coverage):
+    """Write the live coverage snapshot polled by the run status API."""
+    try:
+        os.makedirs(Config.OUTPUT_DIR, exist_ok=True)
+        coverage.save_snapshot(Config.COVERAGE_LIVE_FILE)
+    except OSError as e:
+        print(f"⚠️ coverage snapshot error: {e}")
+        return
+    overall = coverage.overall()
+    print(f"📈 coverage: fields {overall['success_field_cov']:.1f}% | edges {overall['success_edge_cov']:.1f}% "
+          f"| nodes {overall['nodes_covered']}/{overall['nodes_total']}")
         
 
 def write_to_all_rounds(overall_stats, round_stats):
@@ -150,12 +226,18 @@ def write_to_all_rounds(overall_stats, round_stats):
             overall_stats[node_name] = {
                 "requests": 0,
                 "token": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "llm_seconds": 0.0,
                 "succeed": False
             }
 
         # Add up requests and tokens
         overall_stats[node_name]["requests"] = round_data.get("requests", 0)
         overall_stats[node_name]["token"] += round_data.get("token", 0.0)
+        overall_stats[node_name]["prompt_tokens"] += round_data.get("prompt_tokens", 0)
+        overall_stats[node_name]["completion_tokens"] += round_data.get("completion_tokens", 0)
+        overall_stats[node_name]["llm_seconds"] += round_data.get("llm_seconds", 0.0)
 
         # Logical OR for Succeed
         overall_stats[node_name]["succeed"] = (
@@ -168,25 +250,64 @@ from collections import defaultdict
 import random
 import math
 import numpy as np
-from delta_coverage import compute_delta_coverage
-BETA = defaultdict(lambda: {"alpha": 1.0, "beta": 1.0})  # key: (node, arm_name)
+from coverage_engine import CoverageEngine
+from budget_scheduler import BudgetScheduler
+from bandit_store import load_priors, save_posteriors
+from endpoint_state import schema_hash
+from llm_cache import get_cache
+from thompson_bandit import ThompsonBandit
+from query_synthesizer import get_synthesizer, synthesize_attempt
+from value_pool import get_value_pool
+from knowledge_base import get_knowledge_base, open_knowledge_base
 GAMMA = 1.0   # set <1.0 for discounting, e.g., 0.98
+NODE_WORKERS = max(1, int(os.getenv("PREDIQL_NODE_WORKERS", "4")))  # nodes processed concurrently per round
+VARIANTS_PER_CALL = max(1, int(os.getenv("PREDIQL_VARIANTS_PER_CALL", "3")))  # queries requested per LLM call
+DISPATCH_WORKERS = max(1, int(os.getenv("PREDIQL_DISPATCH_WORKERS", "4")))  # concurrent sends of one call's variants
+STREAM_LLM = os.getenv("PREDIQL_LLM_STREAM", "1").lower() not in ("0", "false", "off", "no")  # dispatch queries mid-completion
+
+#arm manipulation
+ARMS = [
+{"name":"schema_min_known",   "include_schema":True,  "arg_mode":"known",   "depth":1, "top_k":3},
+{"name":"schema_min_real",    "include_schema":True,  "arg_mode":"real",    "depth":1, "top_k":3},
+{"name":"schema_mod_known",   "include_schema":True,  "arg_mode":"known",   "depth":2, "top_k":5},
+{"name":"noschema_min_known", "include_schema":False, "arg_mode":"known",   "depth":1, "top_k":3},
+{"name":"noschema_min_real",  "include_schema":False, "arg_mode":"real",    "depth":1, "top_k":0},
+{"name":"schema_min_nulls",   "include_schema":True,  "arg_mode":"nulls",   "depth":1, "top_k":3},
+{"name":"schema_deep_known",  "include_schema": True,  "arg_mode":"known",   "depth":3, "top_k":5},
+{"name":"schema_deep_real",   "include_schema": True,  "arg_mode":"real",    "depth":3, "top_k":5},
+# zero-token arm: deterministic query built from the compiled schema and harvested values, no LLM call
+{"name":"synth_schema_known", "include_schema":True,  "arg_mode":"known",   "depth":2, "top_k":0, "synthetic":True},
+]
+BANDIT = ThompsonBandit([arm["name"] for arm in ARMS], gamma=GAMMA)  # node x arm alpha/beta matrix
+WARM_STARTED = False
 
 def pick_arm_thompson(node, arms):
-    samples = []
-    for arm in arms:
-        key = (node, arm["name"])
-        a, b = BETA[key]["alpha"], BETA[key]["beta"]
-        theta = np.random.beta(a, b)
-        samples.append((theta, arm))
-    samples.sort(reverse=True, key=lambda x: x[0])
-    return samples[0][1]
-
-def update_bandit(node, arm_name, reward, gamma=GAMMA):
-    key = (node, arm_name)
-    # optional discounting for non-stationarity
-    BETA[key]["alpha"] = gamma * BETA[key]["alpha"] + reward
-    BETA[key]["beta"]  = gamma * BETA[key]["beta"]  + (1 - reward)
+    return arms[BANDIT.pick(node)]
+
+def update_bandit_many(node, arm_name, rewards):
+    """Credit each variant generated by one call of `arm_name` separately."""
+    BANDIT.update_many(node, [arm_name] * len(rewards), rewards)
+
+def warm_start_bandit(endpoint_schema):
+    """Seed the bandit with decayed posteriors persisted by earlier runs against the same schema."""
+    global WARM_STARTED
+    WARM_STARTED = BANDIT.load_priors(load_priors(endpoint_schema)) > 0
+
+def save_bandit_state(endpoint_schema, coverage):
+    """Persist posteriors for the next run and write per-arm statistics for the results API."""
+    save_posteriors(endpoint_schema, BANDIT.posteriors())
+    nodes = {
+        node: {
+            "requests_to_first_success": coverage.node_report(node)["requests_to_first_success"],
+            "arms": BANDIT.arm_stats(node),
+        }
+        for node in list(BANDIT.node_index)
+    }
+    try:
+        with open(Config.BANDIT_STATS_FILE, "w", encoding="utf-8") as f:
+            json.dump({"schema_hash": endpoint_schema, "warm_started": WARM_STARTED, "nodes": nodes}, f, indent=2)
+    except OSError as e:
+        print(f"⚠️ bandit stats write error: {e}")
 
 
 
@@ -196,14 +317,18 @@ def update_bandit(node, arm_name, reward, gamma=GAMMA):
 
 
 
-def process_node(url, node, max_request):
+def process_node(url, node, max_request, coverage, scheduler):
 
     input, output, relevant_object, source, node_type = get_node_info(node)
     stats = {}
     stats[node] = {}
     totaltoken = 0
+    prompt_tokens = 0
+    completion_tokens = 0
+    llm_seconds = 0.0
     # max_requests = max_request
-    requests = 0
+    # max_request is cumulative (sent in earlier rounds + this round's allocation), so count from what was sent
+    requests = coverage.node_report(node)["requests"]
     jsonfile_path = os.path.join(os.getcwd(), Config.OUTPUT_DIR, node, "llama_queries.json")
 
     # top_matches = retrieve_similar(node, model, index, texts)
@@ -227,16 +352,6 @@ def process_node(url, node, max_request):
     ARM_STATS = defaultdict(lambda: {"succ": 0, "tot": 0})   # key: (node, arm_name)
     FAIL_STREAK = defaultdict(int)   
     covered = False
-    ARMS = [
-    {"name":"schema_min_known",   "include_schema":True,  "arg_mode":"known",   "depth":1, "top_k":3},
-    {"name":"schema_min_real",    "include_schema":True,  "arg_mode":"real",    "depth":1, "top_k":3},
-    {"name":"schema_mod_known",   "include_schema":True,  "arg_mode":"known",   "depth":2, "top_k":5},
-    {"name":"noschema_min_known", "include_schema":False, "arg_mode":"known",   "depth":1, "top_k":3},
-    {"name":"noschema_min_real",  "include_schema":False, "arg_mode":"real",    "depth":1, "top_k":0},
-    {"name":"schema_min_nulls",   "include_schema":True,  "arg_mode":"nulls",   "depth":1, "top_k":3},
-    {"name":"schema_deep_known",  "include_schema": True,  "arg_mode":"known",   "depth":3, "top_k":5},
-    {"name":"schema_deep_real",   "include_schema": True,  "arg_mode":"real",    "depth":3, "top_k":5},
-    ]
 
     max_k_needed = max([arm["top_k"] for arm in ARMS] + [5])
 
@@ -266,6 +381,7 @@ def process_node(url, node, max_request):
 
 
     https200 = False
+    ok_200 = False
     # while https200 == False and requests < max_requests:
 
     # while requests < max_request:
@@ -321,7 +437,9 @@ def process_node(url, node, max_request):
     #         else:
     #             FAIL_STREAK[node] += 1
     #     break
-    while (not covered) and (requests < max_request):
+    attempts = 0
+    while (requests < max_request) and not scheduler.should_stop(node, attempts):
+        attempts += 1
         arm = pick_arm_thompson(node, ARMS)
 
         # escalation tweak still allowed
@@ -330,38 +448,103 @@ def process_node(url, node, max_request):
             k = 5
         top_matches = build_top_matches(k)
         schema_to_use = relevant_object if arm["include_schema"] else None
-
-        second_res, token = prompt_llm_with_context(
-            top_matches=top_matches,
-            endpoint=node,
-            schema=schema_to_use,
-            input=input_args,
-            output=output,
-            source=source,
-            MAX_REQUESTS=max_request,
-            node_type=node_type,
-            include_schema=arm["include_schema"],
-            arg_mode=arm["arg_mode"],
-            depth=arm["depth"],
-            n_variants=1
-        )
-        totaltoken += token
-        save_json_to_file(second_res, node)
-        ok_200, requests = send_payload(url, jsonfile_path, arm['name'])
-
-        # Compute reward
-        delta_cov = compute_delta_coverage(node)  # you implement; returns 0/1 first, later [0,1]
-        reward = 1.0 if (ok_200 and delta_cov > 0) else 0.0
-
-        update_bandit(node, arm['name'], reward)
-        if reward > 0:
+        # Several variants per LLM call amortize prompt tokens and latency; never overshoot the allocation
+        n_variants = max(1, min(VARIANTS_PER_CALL, max_request - requests))
+
+        # Streaming: each query is sent as soon as its block is complete, overlapping generation
+        dispatcher = PayloadDispatcher(url, arm['name'], DISPATCH_WORKERS, limit=n_variants) if STREAM_LLM else None
+        held = []  # tokens the scheduler reserved for this attempt's LLM call
+
+        def reserve_tokens(estimate):
+            amount = scheduler.reserve(node, estimate)
+            if amount is None:
+                return False
+            held.append(amount)
+            return True
+
+        if arm.get("synthetic"):
+            # Variant index continues from the node's total sent count, so rounds do not repeat each other
+            second_res, usage = synthesize_attempt(node, n_variants, arm["depth"], coverage.node_report(node)["requests"])
+        else:
+            second_res, usage = prompt_llm_with_context(
+                top_matches=top_matches,
+                endpoint=node,
+                schema=schema_to_use,
+                input=input_args,
+                output=output,
+                source=source,
+                MAX_REQUESTS=max_request,
+                node_type=node_type,
+                include_schema=arm["include_schema"],
+                arg_mode=arm["arg_mode"],
+                depth=arm["depth"],
+                n_variants=n_variants,
+                arm_name=arm["name"],
+                on_query=dispatcher.submit if dispatcher else None,
+                reserve_tokens=reserve_tokens
+            )
+            if usage is None:
+                # Token budget cannot cover the call; the node is done for this round
+                if dispatcher:
+                    dispatcher.wait()
+                break
+        second_res["query"] = second_res["query"][:n_variants]
+        totaltoken += usage["total_tokens"]
+        prompt_tokens += usage["prompt_tokens"]
+        completion_tokens += usage["completion_tokens"]
+        llm_seconds += usage["latency_ms"] / 1000
+        # Cache hits cost nothing against the token budget
+        token = 0 if usage["cached"] else usage["total_tokens"]
+        sent_before = coverage.node_report(node)["requests"]
+        gains = []
+
+        def on_record(payload):
+            gains.append(coverage.record_payload(node, payload))
+            get_value_pool().add_payload(node, payload)
+            kb = get_knowledge_base()
+            if kb is not None:
+                kb.record_payload(node, payload)
+
+        if dispatcher:
+            for query in second_res["query"]:
+                dispatcher.submit(query)  # anything the stream extractor did not already send
+            sent_payloads = dispatcher.wait()
+            save_sent_payloads(sent_payloads, node)
+            for i, payload in enumerate(sent_payloads, 1):
+                try:
+                    on_record(payload)
+                except Exception as e:
+                    print(f"⚠️ on_record callback failed for payload {i}: {e}")
+            ok_200 = any(payload.get("success") for payload in sent_payloads)
+        else:
+            save_json_to_file(second_res, node)
+            ok_200, _ = send_payload(
+                url, jsonfile_path,
+                arm_name=arm['name'],
+                on_record=on_record,
+                max_workers=DISPATCH_WORKERS,
+            )
+        publish_coverage(coverage)
+        # The node's running total, whatever this attempt sent (send_payload reports 0 when nothing went out)
+        requests = coverage.node_report(node)["requests"]
+        gain = sum(gains)
+        scheduler.charge(node, requests=requests - sent_before, tokens=token, gain=gain, reserved=sum(held))
+
+        # Reward per variant = that payload reached schema fields no earlier successful response covered;
+        # a call that produced nothing sendable counts as one failure
+        rewards = [1.0 if g > 0 else 0.0 for g in gains] or [0.0]
+
+        update_bandit_many(node, arm['name'], rewards)
+        if gain > 0:
             FAIL_STREAK[node] = 0
-            covered = True
         else:
             FAIL_STREAK[node] += 1
 
     stats[node]["requests"] = requests
     stats[node]['token'] = totaltoken
+    stats[node]['prompt_tokens'] = prompt_tokens
+    stats[node]['completion_tokens'] = completion_tokens
+    stats[node]['llm_seconds'] = llm_seconds
     stats[node]['succeed'] = ok_200
     print(stats)
     print(f"[{node}] Attempt {requests+1}/{max_request}")
@@ -377,7 +560,14 @@ def embedding_responses_from_graphqler():
 def save_json_to_file(generated_payload, node):
     payload_list = [{"query": q} for q in generated_payload["query"]]
     payload_list += [{"mutation": m} for m in generated_payload.get("mutation", [])]
+    append_node_payloads(payload_list, node)
+    return True
+
+def save_sent_payloads(sent_payloads, node):
+    """Append payloads that already carry their responses; returns the node's total payload count."""
+    return append_node_payloads(sent_payloads, node, renumber=True)
 
+def append_node_payloads(payload_list, node, renumber=False):
     base_path = os.getcwd()
     filedir = os.path.join(base_path, Config.OUTPUT_DIR, node)
     
@@ -401,6 +591,9 @@ def save_json_to_file(generated_payload, node):
                 existing_data = []
     
     # Step 2: Append new payloads to existing data
+    if renumber:
+        for count, payload in enumerate(payload_list, start=len(existing_data) + 1):
+            payload["count"] = count
     existing_data.extend(payload_list)
     
     # Step 3: Overwrite the file with the consistent, combined list
@@ -408,7 +601,7 @@ def save_json_to_file(generated_payload, node):
         json.dump(existing_data, f, indent=4)
     
     print(f"✅ Saved {len(payload_list)} new queries. Total in file: {len(existing_data)}")
-    return True
+    return len(existing_data)
 
 def log_to_table(stats, output_file):
     rows = []
@@ -417,13 +610,16 @@ def log_to_table(stats, output_file):
             node,
             values['requests'],
             f"{values['token']:,}",  # formatted with commas
+            f"{values.get('prompt_tokens', 0):,}",
+            f"{values.get('completion_tokens', 0):,}",
+            f"{values.get('llm_seconds', 0.0):.1f}",
             values['succeed']
         ])
 
     # Generate table string
     table_str = tabulate(
         rows,
-        headers=["Node", "Requests", "Tokens", "Succeed"],
+        headers=["Node", "Requests", "Tokens", "Prompt", "Completion", "LLM s", "Succeed"],
         tablefmt="grid"
     )
 
@@ -5,7 +5,6 @@ import yaml
 import numpy as np
 import faiss
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
 from config import Config
 
 base_path = os.getcwd()
@@ -122,6 +121,7 @@ def into_naturallanguage(texts):
 
 def embedding(texts):
     texts = into_naturallanguage(texts)
+    from sentence_transformers import SentenceTransformer  # torch only when this legacy path is used
     model = SentenceTransformer(Config.MODEL_NAME)
 
     # Save the model name for future loading
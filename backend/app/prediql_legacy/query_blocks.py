@@ -0,0 +1,160 @@
+import re
+
+from graphql import parse
+from graphql.error import GraphQLError
+from graphql.language.ast import OperationDefinitionNode
+
+FENCE = "```"
+ACCEPTED_LABELS = {"graphql", "gql", ""}
+OPERATION_KEYWORDS = {"query", "mutation", "subscription", "fragment"}
+_LABEL = re.compile(r"[A-Za-z0-9_+-]*")
+
+
+class FencedBlockExtractor:
+    """
+    Single-pass, incremental extractor for fenced blocks in (streamed) LLM output.
+
+    feed() takes the next chunk and returns (label, body) for every block whose
+    closing fence has arrived; close() flushes a block left open by a truncated
+    completion. Labels are lower-cased ("" for an unlabeled fence). The scan
+    position only moves forward and consumed text is dropped, so total work is
+    linear in the output length.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0  # first unscanned index in _buf
+        self._label = None  # label of the open block, None while outside a block
+        self._body_start = 0
+        self.fences_seen = 0
+
+    def feed(self, chunk):
+        self._buf += chunk
+        blocks = []
+        while True:
+            if self._label is None:
+                start = self._buf.find(FENCE, self._pos)
+                if start < 0:
+                    self._pos = max(self._pos, len(self._buf) - len(FENCE) + 1)
+                    break
+                newline = self._buf.find("\n", start + len(FENCE))
+                if newline < 0:
+                    self._pos = start  # label not complete yet; wait for more text
+                    break
+                info = self._buf[start + len(FENCE):newline]
+                label = _LABEL.match(info.strip()).group(0)
+                self._label = label.lower()
+                if self._label in OPERATION_KEYWORDS:
+                    # Unlabeled fence whose body starts on the fence line: ```query { ... }
+                    self._label = ""
+                    self._body_start = start + len(FENCE)
+                elif info.strip() == label:
+                    self._body_start = newline + 1
+                else:
+                    # Inline form: ```graphql query { ... } on the fence line itself
+                    self._body_start = start + len(FENCE) + info.index(label) + len(label)
+                self._pos = self._body_start
+                self.fences_seen += 1
+            end = self._buf.find(FENCE, self._pos)
+            if end < 0:
+                self._pos = max(self._pos, len(self._buf) - len(FENCE) + 1)
+                break
+            blocks.append((self._label, self._buf[self._body_start:end]))
+            self._label = None
+            self._pos = end + len(FENCE)
+        self._compact()
+        return blocks
+
+    def close(self):
+        """Blocks still open when the completion ended (e.g. cut off at max tokens)."""
+        # A fence on the last line has no newline yet, so its label (and an inline block) is still pending
+        blocks = self.feed("\n") if not self._buf.endswith("\n") else []
+        if self._label is None:
+            return blocks
+        block = (self._label, self._buf[self._body_start:])
+        self._label = None
+        return blocks + [block]
+
+    def text(self):
+        return self._buf
+
+    def _compact(self):
+        keep_from = self._pos if self._label is None else self._body_start
+        if keep_from > 4096 and self.fences_seen:
+            self._buf = self._buf[keep_from:]
+            self._pos -= keep_from
+            self._body_start -= keep_from if self._label is not None else 0
+
+
+def validate_query(query):
+    """(True, None) if `query` parses as a GraphQL document with an operation, else (False, reason)."""
+    if not query.strip():
+        return False, "empty block"
+    try:
+        document = parse(query)
+    except GraphQLError as e:
+        return False, f"syntax error: {e.message}"
+    if not any(isinstance(d, OperationDefinitionNode) for d in document.definitions):
+        return False, "no operation definition"
+    return True, None
+
+
+class QueryBlockParser:
+    """
+    Turns LLM output into sendable queries: extracts ```graphql / ```gql / unlabeled
+    fenced blocks, applies `fix` (e.g. operation-name case repair), validates each
+    with graphql.parse and keeps the rejects with a reason instead of dropping them.
+    With a `validator` (schema_validator.SchemaValidator) blocks are also checked,
+    and possibly repaired, against the endpoint schema before they are accepted.
+    Output with no fences at all is tried as one bare query.
+    """
+
+    def __init__(self, fix=None, validator=None):
+        self.fix = fix
+        self.validator = validator
+        self.extractor = FencedBlockExtractor()
+        self.queries = []
+        self.rejected = []
+        self.repaired = []
+
+    def feed(self, chunk):
+        """Returns the queries accepted from this chunk (for early dispatch)."""
+        return self._accept(self.extractor.feed(chunk))
+
+    def close(self):
+        blocks = self.extractor.close()
+        if not self.extractor.fences_seen and self.extractor.text().strip():
+            blocks = [("", self.extractor.text())]
+        return self._accept(blocks)
+
+    def _accept(self, blocks):
+        accepted = []
+        for label, body in blocks:
+            if label not in ACCEPTED_LABELS:
+                self.rejected.append({"block": body.strip(), "reason": f"unsupported fence label '{label}'"})
+                continue
+            query = self.fix(body) if self.fix else body
+            ok, reason = validate_query(query)
+            if not ok:
+                self.rejected.append({"block": query.strip(), "reason": reason})
+                continue
+            if self.validator is not None:
+                ok, checked, errors, repairs = self.validator.check(query)
+                if not ok:
+                    self.rejected.append({"block": query.strip(), "reason": "schema: " + "; ".join(errors[:3])})
+                    continue
+                if repairs:
+                    self.repaired.append({"block": query.strip(), "repairs": repairs})
+                    query = checked
+            if query not in self.queries:
+                self.queries.append(query)
+                accepted.append(query)
+        return accepted
+
+
+def extract_queries(text, fix=None):
+    """One-shot helper: (queries, rejected) for a complete LLM output."""
+    parser = QueryBlockParser(fix)
+    parser.feed(text)
+    parser.close()
+    return parser.queries, parser.rejected
@@ -0,0 +1,276 @@
+import json
+import threading
+import time
+from collections import defaultdict
+
+from graphql.type import GraphQLEnumType
+
+from load_introspection.schema_artifact import SCHEMA_ARTIFACT, load_json, load_schema
+from save_real_data import load_real_data
+from schema_validator import get_validator
+from value_pool import get_value_pool
+
+QUERY_INFO_PATH = "generated_query_info.json"
+MAX_SELECTION_DEPTH = 4  # deepest selection tried when variants walk past the arm's depth
+
+# Literals used when no harvested value exists for an argument
+DEFAULT_LITERALS = {
+    "ID": ["1", "2", "3"],
+    "Int": [1, 2, 10],
+    "Float": [1.0, 2.5],
+    "Boolean": [True, False],
+    "String": ["test", "a"],
+}
+
+
+def unwrap_type(type_str):
+    """Remove GraphQL wrappers to get base type name."""
+    return (type_str or "").replace("!", "").replace("[", "").replace("]", "")
+
+
+def format_literal(value, type_str, enum=False):
+    """GraphQL literal for a Python value, shaped by the declared type (lists wrap the value)."""
+    base = unwrap_type(type_str)
+    if type_str.rstrip("!").startswith("["):
+        return f"[{format_literal(value, base, enum)}]"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if enum:
+        return str(value)
+    if base == "ID":
+        return json.dumps(str(value))
+    if isinstance(value, (int, float)) and base in ("Int", "Float"):
+        return str(value)
+    return json.dumps(str(value))
+
+
+def _fits(value, base):
+    """Whether a harvested value can be used for an argument of built-in scalar type `base`."""
+    if base == "Int":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if base == "Float":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if base == "Boolean":
+        return isinstance(value, bool)
+    if base == "ID":
+        return isinstance(value, (str, int)) and not isinstance(value, bool)
+    if base == "String":
+        return isinstance(value, str)
+    return not isinstance(value, bool)
+
+
+class QuerySynthesizer:
+    """
+    Deterministic, zero-token query generator.
+
+    Builds queries straight from the compiled node info (`parameters`,
+    `output_type`, `relevant_schema` in generated_query_info.json): every
+    required argument is filled with a value from the typed value pool or
+    harvested into the real-data store (matched by node type and argument name),
+    else a type-appropriate default,
+    and the selection takes every scalar field of the output type down to
+    `depth` levels. Variants rotate through the known values, add optional
+    arguments and walk the selection deeper (up to MAX_SELECTION_DEPTH) while
+    that still adds nested fields; a node with few such combinations, e.g. one
+    without arguments, gets fewer queries rather than repeats. Callers pass
+    the index of the first variant (the node's sent count), so later rounds
+    continue the rotation. With a graphql-core `schema`, enum arguments use
+    the schema's enum values.
+    """
+
+    def __init__(self, query_info, object_list=None, real_records=None, schema=None):
+        self.query_info = query_info or {}
+        self.object_list = object_list or {}
+        self.schema = schema
+        self.values = defaultdict(list)  # (node_type or None, field) -> distinct scalar values
+        self.add_records(real_records or [])
+
+    @classmethod
+    def from_files(cls, query_info_path=QUERY_INFO_PATH, schema_path=SCHEMA_ARTIFACT, schema=None):
+        query_info = load_json(query_info_path)
+        object_list = {}
+        try:
+            object_list = load_schema(schema_path)["objects"]
+        except FileNotFoundError:
+            pass
+        return cls(query_info, object_list, load_real_data(), schema)
+
+    # ---- harvested values ----
+
+    def add_records(self, records):
+        for record in records:
+            self._index(record.get("node_type"), record.get("record"))
+
+    def _index(self, node_type, obj):
+        if isinstance(obj, list):
+            for item in obj:
+                self._index(node_type, item)
+            return
+        if not isinstance(obj, dict):
+            return
+        for field, value in obj.items():
+            if isinstance(value, (dict, list)):
+                self._index(None, value)
+                continue
+            if value is None:
+                continue
+            for key in ((node_type, field), (None, field)):
+                if value not in self.values[key]:
+                    self.values[key].append(value)
+
+    def _known(self, node_type, arg_name, base):
+        # Typed values from responses of this run first, then the real-data store records
+        known = get_value_pool().for_argument(arg_name, base, node_type)
+        known += self.values.get((node_type, arg_name)) or self.values.get((None, arg_name)) or []
+        known = list(dict.fromkeys(known))
+        enum_values = self._enum_values(base)
+        if enum_values is not None:
+            return [v for v in known if v in enum_values]
+        return [v for v in known if _fits(v, base)]
+
+    def _enum_values(self, base):
+        named = self.schema.get_type(base) if self.schema is not None else None
+        return list(named.values) if isinstance(named, GraphQLEnumType) else None
+
+    def _value_for(self, node_type, arg_name, type_str, variant):
+        base = unwrap_type(type_str)
+        known = self._known(node_type, arg_name, base)
+        if known:
+            return known[variant % len(known)]
+        defaults = self._enum_values(base) or DEFAULT_LITERALS.get(base)
+        if defaults:
+            return defaults[variant % len(defaults)]
+        return None
+
+    def _input_literal(self, node_type, arg_name, type_str, variant):
+        base = unwrap_type(type_str)
+        input_type = self.object_list.get(base)
+        if input_type and input_type.get("kind") == "INPUT_OBJECT":
+            parts = []
+            for field in input_type.get("fields", []):
+                if not field["type"].endswith("!"):
+                    continue
+                literal = self._input_literal(None, field["name"], field["type"], variant)
+                if literal is None:
+                    return None
+                parts.append(f"{field['name']}: {literal}")
+            obj = "{" + ", ".join(parts) + "}"
+            return f"[{obj}]" if type_str.rstrip("!").startswith("[") else obj
+        value = self._value_for(node_type, arg_name, type_str, variant)
+        if value is None:
+            return None
+        return format_literal(value, type_str, enum=self._enum_values(base) is not None)
+
+    # ---- selection ----
+
+    def _selection(self, type_name, schema, depth, seen=()):
+        obj = schema.get(type_name) or self.object_list.get(type_name)
+        if not obj or obj.get("kind") not in (None, "OBJECT"):
+            return None
+        scalars, nested = [], []
+        for field in obj.get("fields", []):
+            child = unwrap_type(field["type"])
+            if child in schema or child in self.object_list:
+                if depth > 1 and child not in seen:
+                    sub = self._selection(child, schema, depth - 1, seen + (type_name,))
+                    if sub:
+                        nested.append(f"{field['name']} {sub}")
+            else:
+                scalars.append(field["name"])
+        parts = scalars + nested
+        if not parts:
+            return None
+        return "{ " + " ".join(parts) + " }"
+
+    def _selections(self, type_name, schema, depth):
+        """Distinct selection sets from `depth` down to MAX_SELECTION_DEPTH, stopping once nesting adds nothing."""
+        shapes = []
+        for level in range(max(1, depth), max(depth, MAX_SELECTION_DEPTH) + 1):
+            selection = self._selection(type_name, schema, level)
+            if selection is None or selection in shapes:
+                break
+            shapes.append(selection)
+        return shapes or ["{ __typename }"]
+
+    # ---- generation ----
+
+    def synthesize(self, node, n=1, depth=1, first_variant=0):
+        """Up to `n` distinct queries (or mutations) for `node`; [] when required arguments cannot be filled."""
+        info = self.query_info.get(node)
+        if not info:
+            return []
+        output_type = unwrap_type(info.get("output_type"))
+        node_type = info.get("node_type") or output_type
+        schema = info.get("relevant_schema") or {}
+        params = info.get("parameters") or {}
+        keyword = "mutation" if info.get("source") == "mutation" else "query"
+
+        selections = [""]  # scalar output: nothing to select
+        if output_type in schema or output_type in self.object_list:
+            selections = self._selections(output_type, schema, depth)
+
+        queries = []
+        for k in range(n * 2):  # some variants may collapse into duplicates
+            if len(queries) >= n:
+                break
+            variant = first_variant + k
+            selection = selections[variant % len(selections)]
+            args = []
+            for arg_name, type_str in params.items():
+                required = type_str.endswith("!")
+                # Odd variants also try optional arguments that have harvested values
+                if not required and not (variant % 2 and self._known(node_type, arg_name, unwrap_type(type_str))):
+                    continue
+                literal = self._input_literal(node_type, arg_name, type_str, variant)
+                if literal is None:
+                    if required:
+                        return queries
+                    continue
+                args.append(f"{arg_name}: {literal}")
+            arg_str = f"({', '.join(args)})" if args else ""
+            query = f"{keyword} {{ {node}{arg_str} {selection} }}".replace("  ", " ")
+            validator = get_validator()
+            if validator is not None:
+                ok, query, errors, _ = validator.check(query)
+                if not ok:
+                    print(f"⚠️ synthesized query for {node} rejected: {errors[:1]}")
+                    continue
+            if query not in queries:
+                queries.append(query)
+        return queries
+
+
+_SYNTH = None
+_SYNTH_LOCK = threading.Lock()
+
+
+def get_synthesizer(reload=False):
+    """Process-wide synthesizer; reload=True re-reads the real-data store after a round has harvested new values."""
+    global _SYNTH
+    with _SYNTH_LOCK:
+        if _SYNTH is None or reload:
+            validator = get_validator()
+            try:
+                _SYNTH = QuerySynthesizer.from_files(schema=validator.schema if validator else None)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ query synthesizer unavailable: {e}")
+                _SYNTH = QuerySynthesizer({})
+        return _SYNTH
+
+
+def synthesize_attempt(node, n_variants=1, depth=1, first_variant=0):
+    """Drop-in for prompt_llm_with_context on the synthetic arm: (query_json, usage) with zero tokens."""
+    start = time.perf_counter()
+    queries = get_synthesizer().synthesize(node, n=n_variants, depth=depth, first_variant=first_variant)
+    print(f"🧩 synthesized {len(queries)} query(ies) for {node} without the LLM")
+    usage = {
+        "text": "",
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "cached_prompt_tokens": 0,
+        "latency_ms": (time.perf_counter() - start) * 1000,
+        "cached": False,
+        "usage_source": "synthetic",
+    }
+    return {"query": queries, "rejected": []}, usage
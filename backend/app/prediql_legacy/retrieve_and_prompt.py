@@ -1,18 +1,27 @@
 import faiss
 import numpy as np
 import json
-from sentence_transformers import SentenceTransformer
 from config import Config
 # import openai  # or use local LLM interface like ollama
 import os
-from initial_llama3 import ensure_ollama_running
-from llama_initiator import  get_llm_model
-from ollama_replacement import generate_candidates_from_api
+from initial_llama3 import ensure_ollama_running
+from llama_initiator import  get_llm_model, get_llm_model_with_usage
+from ollama_replacement import generate_candidates_from_api
 from parse_endpoint_results import getnodefromcompiledfile
 from fix_endpoint_case import fix_endpoint_case
+from context_builder import build_previous_pairs
+from query_blocks import QueryBlockParser
+from schema_validator import get_validator
+from value_pool import get_value_pool
+from knowledge_base import get_knowledge_base
+from load_introspection.schema_artifact import load_schema
+from token_counter import count_tokens
+
+KB_SEED_PAIRS = 3  # successes from earlier runs shown alongside this run's attempts
+# Completion tokens assumed per requested variant when reserving a call's cost against the token budget
+COMPLETION_TOKENS_PER_VARIANT = int(os.getenv("PREDIQL_COMPLETION_TOKENS_PER_VARIANT", "256"))
 
 
-import yaml
 # def get_compiled_queries()):
 #     compiled_results = self.qler_handler.get_compiled_results()
 #     compiled_queries = compiled_results["queries"]
@@ -23,42 +32,35 @@ sets = []
 
 def find_node_definition(node_name):
     """
-    Search YAML files for a node definition matching node_name.
+    Search the compiled query and mutation lists for a node definition matching node_name.
     Matches either:
       - the top-level key
       - the internal 'name' field in the value
     Returns the node definition (dict) if found, or None if not found.
     """
-    queries_path = os.path.join("load_introspection",  "query_parameter_list.yml")
-    mutations_path = os.path.join("load_introspection", "mutation_parameter_list.yml")
-    file_paths = [queries_path, mutations_path]
-    for path in file_paths:
-        if not os.path.exists(path):
-            print(f"Schema_File not found: {path}")
+    try:
+        schema = load_schema()
+    except (OSError, ValueError) as e:
+        print(f"Schema artifact not loaded: {e}")
+        return None
+
+    for source in ("query", "mutation"):
+        data = schema[source]
+        if not data:
             continue
 
-        with open(path, 'r') as f:
-            try:
-                data = yaml.safe_load(f)
-            except yaml.YAMLError as e:
-                print(f"⚠️ Error parsing YAML in {path}: {e}")
-                continue
+        if node_name in data:
+            print(f"✅ Exact match on key in {source} list: {node_name}")
+            return data[node_name]
 
-            if not data:
-                continue
-
-            for key, value in data.items():
-                if key == node_name:
-                    print(f"✅ Exact match on key in {path}: {key}")
+        # Check for internal 'name' field match
+        for key, value in data.items():
+            if isinstance(value, dict):
+                internal_name = value.get("name")
+                if internal_name == node_name:
+                    print(f"✅ Match on internal 'name' field in {source} list: {internal_name}")
                     return value
 
-                # Check for internal 'name' field match
-                if isinstance(value, dict):
-                    internal_name = value.get("name")
-                    if internal_name == node_name:
-                        print(f"✅ Match on internal 'name' field in {path}: {internal_name}")
-                        return value
-
     print(f"❌ Node '{node_name}' not found in any provided files.")
     return None
 
@@ -109,6 +111,7 @@ def load_index_and_model():
     index = faiss.read_index(Config.INDEX_FILE)
     with open(Config.MODEL_NAME_FILE, "r") as f:
         model_name = f.read().strip()
+    from sentence_transformers import SentenceTransformer  # torch only when this legacy path is used
     model = SentenceTransformer(model_name)
     return index, model
 
@@ -187,8 +190,22 @@ def retrieve_similar(node, model, index, texts, top_k=5):
 
 
 # prompt_llm_with_context(top_matches, node, relevant_object, input, output, source, max_requests, node_type)
-def prompt_llm_with_context(top_matches, endpoint, schema, input, output, source, MAX_REQUESTS, node_type, include_schema=True, arg_mode="known", depth=1, n_variants=1):
-    previous_response_pairs = extract_request_response_pairs(os.path.join(os.getcwd(), Config.OUTPUT_DIR,endpoint, "llama_queries.json"))
+def prompt_llm_with_context(top_matches, endpoint, schema, input, output, source, MAX_REQUESTS, node_type, include_schema=True, arg_mode="known", depth=1, n_variants=1, arm_name=None, on_query=None, reserve_tokens=None):
+    """
+    Returns (query_json, usage) where usage is the LLM call's token/latency record.
+    With `on_query`, the completion is streamed and on_query(query) is called for each
+    ```graphql block as soon as its closing fence arrives (on the LLM client thread).
+    With `reserve_tokens`, the call's estimated cost is passed to it first; if it returns
+    False the call is skipped and usage is None.
+    """
+    # Bounded selection of prior attempts instead of every pair, so prompt size stays flat as attempts grow
+    # A few successes from earlier runs against this endpoint (knowledge base) seed the context
+    kb = get_knowledge_base()
+    seed_entries = kb.successes(endpoint)[-KB_SEED_PAIRS:] if kb else None
+    previous_response_pairs = build_previous_pairs(os.path.join(os.getcwd(), Config.OUTPUT_DIR,endpoint, "llama_queries.json"),
+                                                   seed_entries=seed_entries)
+    # Real argument values by type from earlier successful responses, e.g. IDs of existing objects
+    argument_values = get_value_pool().hints(endpoint) or "none yet"
     query_json = {"query": []}
     # context_block = "\n---\n".join(context_snippets)
 #     prompt2 = f"""You are an expert in GraphQL API testing.  
@@ -211,6 +228,9 @@ def prompt_llm_with_context(top_matches, endpoint, schema, input, output, source
 # previouse response pairs: {previous_response_pairs}
 # you shall use real fileds or data given: {top_matches}
 # Based on this, you must create testing queries to explore the vulnerabilities of this node of the endpoint:***{endpoint}***"""
+    # ---- Stable prefix: instructions, output format, operation and (optionally) schema.
+    # It is byte-identical across attempts on a node, so provider prompt caching can reuse it;
+    # anything that changes per attempt or per arm belongs in the suffix below.
     header = f"""
     You are an expert in GraphQL API security testing.
 
@@ -220,7 +240,7 @@ def prompt_llm_with_context(top_matches, endpoint, schema, input, output, source
     1) Queries must be syntactically valid GraphQL.
     2) No placeholders like <id>, "ID!", "value". Use realistic literals or known real values.
     3) You may attempt injected strings, nulls, overlong strings, and type mismatches where appropriate.
-    4) You may output {n_variants} query(ies).
+    4) Output as many queries as requested at the end of the prompt.
     5) Do not use the words "edges" or "node".
     6) GraphQL is case-sensitive. Match the exact operation name: {endpoint}.
     """
@@ -257,17 +277,23 @@ def prompt_llm_with_context(top_matches, endpoint, schema, input, output, source
     # ---- Depth constraint
     depth_block = f"Selection depth target: {depth}. Keep nested selections no deeper than {depth} levels."
 
-    # ---- Context
-    context = f"""
-    Context:
+    operation_block = f"""
+    Operation under test:
     - operation: {endpoint}
     - input (declared): {input}
     - node type: {source}
+    """
+
+    # ---- Variable suffix: per-arm strategy and per-attempt context
+    context = f"""
+    Context:
     - known real values: {top_matches}
+    - real argument values: {argument_values}
     - previous response pairs: {previous_response_pairs}
 
     {arg_block}
     {depth_block}
+    Now generate {n_variants} distinct query(ies) for: {endpoint}. Vary arguments and selected fields between them.
     """
     
     format_block = f"""
@@ -404,45 +430,53 @@ def prompt_llm_with_context(top_matches, endpoint, schema, input, output, source
     # Now generate 3–5 diverse GraphQL queries for: ***{endpoint}***
     # """
 
-    prompt_arms = header + schema_block + fallback_block + context + format_block
+    prompt_prefix = header + format_block + operation_block + schema_block
+    prompt_suffix = fallback_block + context
+
+
+
+    parser = QueryBlockParser(fix=lambda block: fix_endpoint_case(block, endpoint), validator=get_validator())
+    on_text = None
+    if on_query is not None:
+        def on_text(delta):
+            for query_str in parser.feed(delta):
+                on_query(query_str)
+
+    if reserve_tokens is not None:
+        estimate = count_tokens(prompt_prefix + prompt_suffix) + COMPLETION_TOKENS_PER_VARIANT * n_variants
+        if not reserve_tokens(estimate):
+            print(f"💸 Token budget cannot cover another call for {endpoint} (~{estimate} tokens); skipping it")
+            return query_json, None
+
+    usage = get_llm_model_with_usage(prompt_suffix, context={"node": endpoint, "arm": arm_name},
+                                     prefix=prompt_prefix, on_text=on_text)
+    print(f"Token usage ({usage['usage_source']}{', cached' if usage['cached'] else ''}): "
+          f"prompt {usage['prompt_tokens']} (prefix-cached {usage['cached_prompt_tokens']}) + "
+          f"completion {usage['completion_tokens']} in {usage['latency_ms']:.0f} ms")
+
+
+    llama_res = usage.pop("text")
+    if on_query is None:
+        parser.feed(llama_res)
+    parser.close()
+    query_json = {"query": parser.queries, "rejected": parser.rejected}
+    for rejected in parser.rejected:
+        print(f"⚠️ rejected block for {endpoint} ({rejected['reason']}): {rejected['block'][:120]!r}")
+    for repaired in parser.repaired:
+        print(f"🔧 repaired query for {endpoint}: {', '.join(repaired['repairs'])}")
+    usage["rejected_blocks"] = len(parser.rejected)
+    usage["repaired_blocks"] = len(parser.repaired)
+    return query_json, usage
+
+def get_LLM_firstresposne(node, objects):
+    index, model = load_index_and_model()
+    texts, records = load_texts()
+    sets = node, model, index, texts
 
+    # ensure_ollama_running("llama3")
 
 
-    approx_tokens = len(prompt_arms) / 4
-    print(f"Approximate token count: {approx_tokens:.0f}")
-
-
-    llama_res = get_llm_model(prompt_arms)
-    query_json = {"query": []}
-    flag = "```graphql"
-    parse_time = 0
-    while flag in llama_res and parse_time < 10:
-        parse_time += 1
-        try:
-            sidx = llama_res.find(flag)
-            j_start = llama_res[sidx+len(flag):]
-            j_end = j_start.find("```")
-            query_str = j_start[:j_end]
-            llama_res = j_start[j_end:]
-
-            query_str = fix_endpoint_case(query_str, endpoint)
-
-            if query_str not in query_json["query"]:
-                query_json["query"].append(query_str)
-        except Exception as e:
-    #         # logger.error(e)
-          continue
-    return query_json, approx_tokens
-
-def get_LLM_firstresposne(node, objects):
-    index, model = load_index_and_model()
-    texts, records = load_texts()
-    sets = node, model, index, texts
-
-    # ensure_ollama_running("llama3")
-
-
-    top_matches = retrieve_similar(node, model, index, texts)
+    top_matches = retrieve_similar(node, model, index, texts)
     # print("\n[INFO] Top Relevant Entries:\n")
     # for i, t in enumerate(top_matches, 1):
         # print(f"{i}. {t}\n")
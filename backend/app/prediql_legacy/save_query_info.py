@@ -1,6 +1,7 @@
-import yaml
 import json
 
+from load_introspection.schema_artifact import load_schema
+
 def unwrap_type(type_str):
     """Remove GraphQL wrappers to get base type name."""
     return type_str.replace('!', '').replace('[', '').replace(']', '')
@@ -61,14 +62,10 @@ def save_query_info():
     - node_type
     - relevant_schema
     """
-    with open("load_introspection/query_parameter_list.yml") as f:
-        query_params = yaml.safe_load(f) or {}
-
-    with open("load_introspection/mutation_parameter_list.yml") as f:
-        mutation_params = yaml.safe_load(f) or {}
-
-    with open("load_introspection/object_list.yml") as f:
-        objects = yaml.safe_load(f) or {}
+    schema = load_schema()
+    query_params = schema["query"]
+    mutation_params = schema["mutation"]
+    objects = schema["objects"]
 
     all_query_info = {}
 
@@ -112,4 +109,6 @@ def save_query_info():
 
     print(f"✅ Saved enriched query info for {len(all_query_info)} nodes to generated_query_info.json")
 
-save_query_info()
+
+if __name__ == "__main__":
+    save_query_info()
@@ -1,11 +1,17 @@
 import os
 import json
+import hashlib
 from config import Config
 # PATHS
 # RAW_DATA_BASE = "prediql-output"
 RAW_DATA_BASE = Config.OUTPUT_DIR
 QUERY_INFO_PATH = "generated_query_info.json"
-REAL_DATA_OUTPUT_PATH = "real_data.json"
+# Append-only store of flattened records plus per-file checkpoints; both live in OUTPUT_DIR,
+# so they are reset together with the run's payload files
+REAL_DATA_OUTPUT_PATH = Config.REAL_DATA_FILE
+CHECKPOINT_PATH = Config.REAL_DATA_CHECKPOINT_FILE
+# Paginated wrappers: Relay connections (edges[].node, nodes[]) and offset pages (results[])
+LIST_KEYS = ("results", "nodes", "items")
 
 # Load QUERY_INFO
 # with open(QUERY_INFO_PATH) as f:
@@ -22,7 +28,62 @@ def flatten_record_to_text(record):
         lines.append(f"- {k}: {v}")
     return "\n".join(lines)
 
+def record_key(record):
+    """Identity of a record in the store: the hash of its text (which includes query name and node type)."""
+    return hashlib.sha1(record.get("text", "").encode("utf-8")).hexdigest()
+
+def record_keys(path=REAL_DATA_OUTPUT_PATH):
+    """Keys of every record already in an NDJSON store."""
+    return {record_key(record) for record in iter_real_data(path)}
+
+def iter_objects(top_level_data):
+    """Yield the records in one response value: Relay edges, offset/list pages, a plain list or a single object."""
+    if isinstance(top_level_data, list):
+        for item in top_level_data:
+            if isinstance(item, dict) and item:
+                yield item
+        return
+    if not isinstance(top_level_data, dict):
+        return
+    edges = top_level_data.get("edges")
+    if isinstance(edges, list) and edges:
+        for edge in edges:
+            node = edge.get("node") if isinstance(edge, dict) else None
+            if node:
+                yield node
+        return
+    for key in LIST_KEYS:
+        items = top_level_data.get(key)
+        if isinstance(items, list) and items:
+            yield from iter_objects(items)
+            return
+    yield top_level_data
+
+def _load_checkpoint():
+    if not os.path.exists(CHECKPOINT_PATH):
+        return {}
+    try:
+        with open(CHECKPOINT_PATH) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        print(f"⚠️ Invalid checkpoint {CHECKPOINT_PATH}; re-extracting all records")
+        return {}
+
+def _save_checkpoint(checkpoint):
+    tmp_path = f"{CHECKPOINT_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, CHECKPOINT_PATH)
+
 def flatten_real_data():
+    """
+    Incrementally extract records from successful responses into the NDJSON store.
+
+    Each node's payload files are append-only lists, so the checkpoint keeps, per
+    file, how many entries were already processed (plus size/mtime, so unchanged
+    files are not even parsed). Only entries past the checkpoint are flattened and
+    appended. Returns the number of new records.
+    """
     # Load QUERY_INFO dynamically to ensure it's fresh
     try:
         with open(QUERY_INFO_PATH) as f:
@@ -34,119 +95,88 @@ def flatten_real_data():
         print(f"❌ Invalid JSON format in: {QUERY_INFO_PATH}")
         return 0
 
-    all_records = []
+    os.makedirs(RAW_DATA_BASE, exist_ok=True)
+    checkpoint = _load_checkpoint()
+    if checkpoint and not os.path.exists(REAL_DATA_OUTPUT_PATH):
+        checkpoint = {}  # store was removed; rebuild it from scratch
+    new_records = 0
+    # Repeated queries (and warm-started records) return the same objects again; keep one copy of each
+    seen = record_keys(REAL_DATA_OUTPUT_PATH)
 
-    for node_name in QUERY_INFO.keys():
-        print(node_name)
-        # Determine which folder to look in
-        folder_path = os.path.join(RAW_DATA_BASE, node_name)
-        if not os.path.isdir(folder_path):
-            print(f"⚠️ Skipping {node_name}: folder not found")
-            continue
-
-        # Load all JSON files in the folder
-        for filename in os.listdir(folder_path):
-            if not filename.endswith(".json"):
-                continue
-
-            file_path = os.path.join(folder_path, filename)
-            try:
-                with open(file_path) as f:
-                    raw_list = json.load(f)
-            except Exception as e:
-                print(f"⚠️ Failed to load {file_path}: {e}")
+    with open(REAL_DATA_OUTPUT_PATH, "a") as out:
+        for node_name, info in query_info.items():
+            # Determine which folder to look in
+            folder_path = os.path.join(RAW_DATA_BASE, node_name)
+            if not os.path.isdir(folder_path):
                 continue
 
-            # Should be a list of entries (each is a single query run)
-            if not isinstance(raw_list, list):
-                print(f"⚠️ Skipping {file_path}: not a list")
-                continue
-
-            # Extract records from each query response
-            for entry in raw_list:
-                if not entry.get("success", False):
+            for filename in os.listdir(folder_path):
+                if not filename.endswith(".json"):
                     continue
 
-                response_body = entry.get("response_body", {})
-                data = response_body.get("data", {})
-                if not data or node_name not in data:
+                file_path = os.path.join(folder_path, filename)
+                stat = os.stat(file_path)
+                state = checkpoint.get(file_path, {})
+                if state.get("size") == stat.st_size and state.get("mtime") == stat.st_mtime:
+                    continue
+                try:
+                    with open(file_path) as f:
+                        raw_list = json.load(f)
+                except Exception as e:
+                    print(f"⚠️ Failed to load {file_path}: {e}")
                     continue
 
-                top_level_data = data.get(node_name)
-                if not top_level_data:
+                # Should be a list of entries (each is a single query run)
+                if not isinstance(raw_list, list):
+                    print(f"⚠️ Skipping {file_path}: not a list")
                     continue
 
-                # ✅ Handle edges (Relay-style)
-                if isinstance(top_level_data, dict):
-                    edges = top_level_data.get("edges")
-                    if edges and isinstance(edges, list):
-                        for edge in edges:
-                            node = edge.get("node")
-                            if node:
-                                single_record = {
-                                    "source": QUERY_INFO[node_name]["source"],
-                                    "query_name": node_name,
-                                    "node_type": QUERY_INFO[node_name]["node_type"],
-                                    "record": node,
-                                }
-                                single_record["text"] = flatten_record_to_text(single_record)
-                                all_records.append(single_record)
-                        continue  # done with this entry
-
-                    # ✅ Handle results (Offset-style)
-                    results = top_level_data.get("results")
-                    if results and isinstance(results, list):
-                        for item in results:
-                            single_record = {
-                                "source": QUERY_INFO[node_name]["source"],
-                                "query_name": node_name,
-                                "node_type": QUERY_INFO[node_name]["node_type"],
-                                "record": item,
-                            }
-                            single_record["text"] = flatten_record_to_text(single_record)
-                            all_records.append(single_record)
-                        continue  # done with this entry
-
-                    # ✅ Handle top-level list directly
-                    if isinstance(top_level_data, list):
-                        for item in top_level_data:
-                            single_record = {
-                                "source": QUERY_INFO[node_name]["source"],
-                                "query_name": node_name,
-                                "node_type": QUERY_INFO[node_name]["node_type"],
-                                "record": item,
-                            }
-                            single_record["text"] = flatten_record_to_text(single_record)
-                            all_records.append(single_record)
+                start = state.get("entries", 0)
+                if start > len(raw_list):
+                    start = 0  # file was rewritten shorter; cannot trust the offset
+                for entry in raw_list[start:]:
+                    if not isinstance(entry, dict) or not entry.get("success", False):
+                        continue
+                    response_body = entry.get("response_body") or {}
+                    data = response_body.get("data") if isinstance(response_body, dict) else None
+                    if not isinstance(data, dict) or not data.get(node_name):
                         continue
 
-                    # ✅ Handle single object
-                    if isinstance(top_level_data, dict):
+                    for obj in iter_objects(data[node_name]):
                         single_record = {
-                            "source": QUERY_INFO[node_name]["source"],
+                            "source": info.get("source"),
                             "query_name": node_name,
-                            "node_type": QUERY_INFO[node_name]["node_type"],
-                            "record": top_level_data,
+                            "node_type": info.get("node_type"),
+                            "record": obj,
                         }
                         single_record["text"] = flatten_record_to_text(single_record)
-                        all_records.append(single_record)
-                elif isinstance(top_level_data, list):
-                    # Top-level list (array of records)
-                    for item in top_level_data:
-                        single_record = {
-                            "source": QUERY_INFO[node_name]["source"],
-                            "query_name": node_name,
-                            "node_type": QUERY_INFO[node_name]["node_type"],
-                            "record": item,
-                        }
-                        single_record["text"] = flatten_record_to_text(single_record)
-                        all_records.append(single_record)
-                    continue
-                    
-    
-
-    # ✅ Save to real_data.json
-    with open(REAL_DATA_OUTPUT_PATH, "w") as f:
-        json.dump(all_records, f, indent=2)
-    print(f"✅ Saved {len(all_records)} records to {REAL_DATA_OUTPUT_PATH}")
-    return len(all_records)
+                        key = record_key(single_record)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        out.write(json.dumps(single_record) + "\n")
+                        new_records += 1
+
+                checkpoint[file_path] = {"entries": len(raw_list), "size": stat.st_size, "mtime": stat.st_mtime}
+
+    _save_checkpoint(checkpoint)
+    print(f"✅ Appended {new_records} new records to {REAL_DATA_OUTPUT_PATH}")
+    return new_records
+
+def iter_real_data(path=REAL_DATA_OUTPUT_PATH):
+    """Stream records from the NDJSON store, skipping a torn last line."""
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+def load_real_data(path=REAL_DATA_OUTPUT_PATH):
+    """All extracted records, oldest first."""
+    return list(iter_real_data(path))
@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+
+from graphql import build_client_schema, parse, print_ast, validate
+from graphql.error import GraphQLError
+from graphql.language.ast import (
+    FieldNode,
+    InlineFragmentNode,
+    NameNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+)
+from graphql.type import get_named_type, is_leaf_type
+from graphql.validation import ValuesOfCorrectTypeRule, specified_rules
+
+from endpoint_state import INTROSPECTION_FILE
+
+# off: send as generated | repair: fix field/argument case and prune unknown fields, then validate |
+# strict: validate only, reject anything invalid
+MODE = os.getenv("PREDIQL_VALIDATE", "repair").lower()
+# Wrong-typed and null argument literals are deliberate fuzzing payloads (the prompt asks for them),
+# so only the document's structure is validated: fields, argument names, required arguments, selections
+STRUCTURE_RULES = tuple(rule for rule in specified_rules if rule is not ValuesOfCorrectTypeRule)
+
+
+def _replace(node, **changes):
+    """Copy of an AST node with some attributes changed (graphql-core nodes may be frozen)."""
+    values = {key: getattr(node, key) for key in node.keys}
+    values.update(changes)
+    return node.__class__(**values)
+
+
+def _by_name(names, wanted):
+    """Exact match, else a unique case-insensitive match, else None."""
+    if wanted in names:
+        return wanted
+    folded = [n for n in names if n.lower() == wanted.lower()]
+    return folded[0] if len(folded) == 1 else None
+
+
+class SchemaValidator:
+    """
+    Pre-flight check of generated queries against the introspected schema.
+
+    check() runs graphql-core's `validate` locally, so queries with unknown
+    fields, wrong argument names or missing required arguments are caught
+    without a round-trip to the target. Argument values are not type-checked,
+    so injected strings, nulls and type mismatches still reach the endpoint.
+    In repair mode the AST is first
+    rewritten: field and argument names are case-corrected, unknown fields
+    and arguments are pruned, sub-selections on scalars are dropped and an
+    object field with no selection gets `__typename`.
+    """
+
+    def __init__(self, schema, mode=MODE):
+        self.schema = schema
+        self.mode = mode
+
+    @classmethod
+    def from_introspection(cls, path=INTROSPECTION_FILE, mode=MODE):
+        with open(path, encoding="utf-8") as f:
+            introspection = json.load(f)
+        return cls(build_client_schema(introspection.get("data", introspection)), mode)
+
+    def check(self, query):
+        """
+        Returns (ok, query, errors, repairs): the query to send (possibly repaired),
+        validation error messages and a list of repairs applied.
+        """
+        if self.mode == "off":
+            return True, query, [], []
+        try:
+            document = parse(query)
+        except GraphQLError as e:
+            return False, query, [e.message], []
+        errors = [e.message for e in validate(self.schema, document, STRUCTURE_RULES)]
+        if not errors or self.mode != "repair":
+            return not errors, query, errors, []
+
+        repairs = []
+        document = _replace(document, definitions=tuple(
+            self._repair_operation(d, repairs) if isinstance(d, OperationDefinitionNode) else d
+            for d in document.definitions
+        ))
+        if not repairs:
+            return False, query, errors, []
+        repaired = print_ast(document)
+        errors = [e.message for e in validate(self.schema, document, STRUCTURE_RULES)]
+        return not errors, repaired, errors, repairs
+
+    # ---- repair ----
+
+    def _repair_operation(self, operation, repairs):
+        root = self.schema.get_root_type(operation.operation)
+        if root is None or operation.selection_set is None:
+            return operation
+        selection_set = self._repair_selection_set(operation.selection_set, root, repairs)
+        return _replace(operation, selection_set=selection_set or operation.selection_set)
+
+    def _repair_selection_set(self, selection_set, parent_type, repairs):
+        """Repaired selection set, or None if nothing valid is left in it."""
+        fields = getattr(parent_type, "fields", None) or {}
+        selections = []
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                repaired = self._repair_field(selection, parent_type, fields, repairs)
+                if repaired is not None:
+                    selections.append(repaired)
+            elif isinstance(selection, InlineFragmentNode) and selection.type_condition is not None:
+                fragment_type = self.schema.get_type(selection.type_condition.name.value)
+                if fragment_type is None:
+                    repairs.append(f"pruned fragment on unknown type {selection.type_condition.name.value}")
+                    continue
+                inner = self._repair_selection_set(selection.selection_set, fragment_type, repairs)
+                if inner is not None:
+                    selections.append(_replace(selection, selection_set=inner))
+            else:
+                selections.append(selection)
+        if not selections:
+            return None
+        return _replace(selection_set, selections=tuple(selections))
+
+    def _repair_field(self, field, parent_type, fields, repairs):
+        name = field.name.value
+        if name.startswith("__"):
+            return field
+        if not fields:
+            # Unions: only __typename and fragments are selectable directly
+            repairs.append(f"pruned {name} on {parent_type.name}")
+            return None
+        actual = _by_name(fields, name)
+        if actual is None:
+            repairs.append(f"pruned unknown field {parent_type.name}.{name}")
+            return None
+        if actual != name:
+            repairs.append(f"renamed {name} -> {actual}")
+            field = _replace(field, name=NameNode(value=actual))
+        definition = fields[actual]
+
+        arguments = []
+        for argument in field.arguments or ():
+            arg_name = _by_name(definition.args, argument.name.value)
+            if arg_name is None:
+                repairs.append(f"pruned unknown argument {actual}({argument.name.value})")
+                continue
+            if arg_name != argument.name.value:
+                repairs.append(f"renamed argument {argument.name.value} -> {arg_name}")
+                argument = _replace(argument, name=NameNode(value=arg_name))
+            arguments.append(argument)
+        field = _replace(field, arguments=tuple(arguments))
+
+        field_type = get_named_type(definition.type)
+        if is_leaf_type(field_type):
+            if field.selection_set is not None:
+                repairs.append(f"dropped sub-selection on scalar {actual}")
+                field = _replace(field, selection_set=None)
+            return field
+        if field.selection_set is None:
+            repairs.append(f"selected __typename on {actual}")
+            return _replace(field, selection_set=_typename_selection())
+        inner = self._repair_selection_set(field.selection_set, field_type, repairs)
+        return _replace(field, selection_set=inner or _typename_selection())
+
+
+def _typename_selection():
+    return SelectionSetNode(selections=(FieldNode(name=NameNode(value="__typename"), arguments=(), directives=()),))
+
+
+_VALIDATOR = None
+_VALIDATOR_LOADED = False
+_VALIDATOR_LOCK = threading.Lock()
+
+
+def get_validator():
+    """Process-wide validator for the current endpoint, or None if disabled or no introspection is available."""
+    global _VALIDATOR, _VALIDATOR_LOADED
+    if MODE == "off":
+        return None
+    with _VALIDATOR_LOCK:
+        if not _VALIDATOR_LOADED:
+            _VALIDATOR_LOADED = True
+            try:
+                _VALIDATOR = SchemaValidator.from_introspection()
+            except (OSError, ValueError, TypeError, KeyError, GraphQLError) as e:
+                print(f"⚠️ schema validation disabled, cannot build schema from {INTROSPECTION_FILE}: {e}")
+        return _VALIDATOR
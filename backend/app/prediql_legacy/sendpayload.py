@@ -8,10 +8,11 @@ from graphql.language.ast import FieldNode, OperationDefinitionNode
 
 
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def send_payload(GRAPHQL_URL, jsonfile_path, output_jsonfile_path=None):
-    HEADERS = {"Content-Type": "application/json"}
-    DEFAULT_FALLBACK_QUERY = """
+HEADERS = {"Content-Type": "application/json"}
+DEFAULT_FALLBACK_QUERY = """
     query {
       episodesByIds(ids: [1]) {
         id
@@ -20,6 +21,14 @@ def send_payload(GRAPHQL_URL, jsonfile_path, output_jsonfile_path=None):
     }
     """
 
+
+def send_payload(GRAPHQL_URL, jsonfile_path, output_jsonfile_path=None, arm_name=None, on_record=None, max_workers=1):
+    """
+    Send every payload in `jsonfile_path` that has no response yet and annotate it in place.
+    `on_record(payload)` is called as soon as each response has been recorded, so callers
+    (e.g. live coverage) can react per response instead of re-reading the file.
+    With max_workers > 1 the unsent payloads are dispatched concurrently.
+    """
     if not os.path.exists(jsonfile_path) or os.path.getsize(jsonfile_path) == 0:
         print(f"❌ File not found or empty: {jsonfile_path}")
         return False, 0
@@ -31,109 +40,43 @@ def send_payload(GRAPHQL_URL, jsonfile_path, output_jsonfile_path=None):
         print(f"❌ Error reading JSON: {e}")
         return False, 0
 
-    updated_payloads = []
     https200 = False
     requests_count = 0
 
+    pending = []
     for i, payload in enumerate(payloads, start=1):
         # ✅ Skip if already has response
         if "response_status" in payload and "response_body" in payload:
-            updated_payloads.append(payload)
             continue
-
-        try:
-            # Pick payload type
-            if "query" in payload:
-                request_payload = {"query": payload["query"]}
-            elif "mutation" in payload:
-                request_payload = {"query": payload["mutation"]}
-            else:
-                print(f"⚠️ Skipping payload {i}: No 'query' or 'mutation' found.")
-                updated_payloads.append(payload)
-                continue
-
-            # Send request
-            start_time = time.time()
-            response = requests.post(GRAPHQL_URL, headers=HEADERS, json=request_payload, timeout=10)
-            request_time = time.time() - start_time
-            query_text = payload.get("query") or payload.get("mutation")
-
-            # Extract fields
-            if query_text:
-                fields, edges, operation = extract_fields_edges_nodes(query_text)
-                payload.update({
-                    "fields": fields,
-                    "edges": edges,
-                    "operation_name": operation
-                })
-
-            payload.update({
-                "response_status": response.status_code,
-                "request_time_seconds": round(request_time, 3),
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "count": i
-            })
-
-            try:
-                payload["response_body"] = response.json()
-            except ValueError:
-                payload["response_body"] = {"error": "Invalid JSON", "raw": response.text}
-
-            if response.status_code in [429, 503]:
-                time.sleep(10)
-            else:
-                time.sleep(random.uniform(1.5, 3.0))
-
-            success = is_successful_graphql_response(payload)
-            payload["success"] = success
-
-            if success:
-                print(f"✅ Valid 200 response with data for payload {i}")
-                https200 = True
-            requests_count = i
-
-        except requests.exceptions.RequestException as e:
-            payload.update({
-                "response_status": None,
-                "request_time_seconds": round(time.time() - start_time, 3),
-                "response_body": {"error": str(e)},
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "count": i
-            })
-
-        # 🔁 Retry if response body is empty
-        is_empty = (
-            payload.get("response_body") in [None, {}, []]
-        )
-        if is_empty:
-            print(f"⚠️ Empty response for payload {i}, retrying with fallback query.")
-            retry_payload = {"query": DEFAULT_FALLBACK_QUERY}
+        pending.append(i)
+
+    def finish(i, payload, attempted):
+        nonlocal https200, requests_count
+        if not attempted:
+            return
+        if payload.get("response_status") is not None:
+            requests_count = max(requests_count, i)
+            https200 = https200 or bool(payload.get("success"))
+        if on_record:
             try:
-                retry_start = time.time()
-                retry_response = requests.post(GRAPHQL_URL, headers=HEADERS, json=retry_payload, timeout=10)
-                retry_time = time.time() - retry_start
-                payload.update({
-                    "retry_query": DEFAULT_FALLBACK_QUERY,
-                    "retry_status": retry_response.status_code,
-                    "retry_time_seconds": round(retry_time, 3)
-                })
-                try:
-                    payload["retry_response_body"] = retry_response.json()
-                except ValueError:
-                    payload["retry_response_body"] = {
-                        "error": "Invalid JSON",
-                        "raw": retry_response.text
-                    }
-            except requests.exceptions.RequestException as e:
-                payload.update({
-                    "retry_query": DEFAULT_FALLBACK_QUERY,
-                    "retry_status": None,
-                    "retry_time_seconds": 0,
-                    "retry_response_body": {"error": str(e)}
-                })
-
-        # ✅ Append exactly once
-        updated_payloads.append(payload)
+                on_record(payload)
+            except Exception as e:
+                print(f"⚠️ on_record callback failed for payload {i}: {e}")
+
+    if max_workers > 1 and len(pending) > 1:
+        # Variants from one LLM call are independent, so send them concurrently;
+        # on_record still runs on this thread, one response at a time.
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+            futures = {executor.submit(_send_one, GRAPHQL_URL, payloads[i - 1], i, arm_name): i for i in pending}
+            for future in as_completed(futures):
+                i = futures[future]
+                finish(i, *future.result())
+    else:
+        for i in pending:
+            finish(i, *_send_one(GRAPHQL_URL, payloads[i - 1], i, arm_name))
+
+    # ✅ Keep file order regardless of completion order
+    updated_payloads = list(payloads)
 
     # ✅ Deduplicate before writing
     def to_key(d): return json.dumps(d, sort_keys=True)
@@ -155,6 +98,137 @@ def send_payload(GRAPHQL_URL, jsonfile_path, output_jsonfile_path=None):
     print(f"✅ Finished. {len(unique_payloads)} unique payloads written to {output_jsonfile_path}")
     return https200, requests_count
 
+
+class PayloadDispatcher:
+    """
+    Sends queries to the endpoint as soon as they are produced, e.g. while the
+    LLM response that contains them is still streaming. submit() never blocks;
+    wait() returns the annotated payloads in submission order.
+    Duplicate queries and anything beyond `limit` are ignored.
+    """
+
+    def __init__(self, GRAPHQL_URL, arm_name=None, max_workers=4, limit=None):
+        self.url = GRAPHQL_URL
+        self.arm_name = arm_name
+        self.limit = limit
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        self._futures = []
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def submit(self, query):
+        with self._lock:
+            if query in self._seen or (self.limit is not None and len(self._futures) >= self.limit):
+                return False
+            self._seen.add(query)
+            i = len(self._futures) + 1
+            self._futures.append(self._executor.submit(_send_one, self.url, {"query": query}, i, self.arm_name))
+        print(f"🚀 dispatched payload {i} early")
+        return True
+
+    def wait(self):
+        with self._lock:
+            futures = list(self._futures)
+        payloads = [future.result()[0] for future in futures]
+        self._executor.shutdown(wait=True)
+        return payloads
+
+
+def _send_one(GRAPHQL_URL, payload, i, arm_name=None):
+    """Send one payload and annotate it in place. Returns (payload, attempted)."""
+    try:
+        # Pick payload type
+        if "query" in payload:
+            request_payload = {"query": payload["query"]}
+        elif "mutation" in payload:
+            request_payload = {"query": payload["mutation"]}
+        else:
+            print(f"⚠️ Skipping payload {i}: No 'query' or 'mutation' found.")
+            return payload, False
+
+        # Send request
+        start_time = time.time()
+        response = requests.post(GRAPHQL_URL, headers=HEADERS, json=request_payload, timeout=10)
+        request_time = time.time() - start_time
+        query_text = payload.get("query") or payload.get("mutation")
+
+        # Extract fields
+        if query_text:
+            fields, edges, operation = extract_fields_edges_nodes(query_text)
+            payload.update({
+                "fields": fields,
+                "edges": edges,
+                "operation_name": operation
+            })
+
+        if arm_name:
+            payload["arm"] = arm_name
+        payload.update({
+            "response_status": response.status_code,
+            "request_time_seconds": round(request_time, 3),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "count": i
+        })
+
+        try:
+            payload["response_body"] = response.json()
+        except ValueError:
+            payload["response_body"] = {"error": "Invalid JSON", "raw": response.text}
+
+        if response.status_code in [429, 503]:
+            time.sleep(10)
+        else:
+            time.sleep(random.uniform(1.5, 3.0))
+
+        success = is_successful_graphql_response(payload)
+        payload["success"] = success
+
+        if success:
+            print(f"✅ Valid 200 response with data for payload {i}")
+
+    except requests.exceptions.RequestException as e:
+        payload.update({
+            "response_status": None,
+            "request_time_seconds": round(time.time() - start_time, 3),
+            "response_body": {"error": str(e)},
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "count": i
+        })
+
+    # 🔁 Retry if response body is empty
+    is_empty = (
+        payload.get("response_body") in [None, {}, []]
+    )
+    if is_empty:
+        print(f"⚠️ Empty response for payload {i}, retrying with fallback query.")
+        retry_payload = {"query": DEFAULT_FALLBACK_QUERY}
+        try:
+            retry_start = time.time()
+            retry_response = requests.post(GRAPHQL_URL, headers=HEADERS, json=retry_payload, timeout=10)
+            retry_time = time.time() - retry_start
+            payload.update({
+                "retry_query": DEFAULT_FALLBACK_QUERY,
+                "retry_status": retry_response.status_code,
+                "retry_time_seconds": round(retry_time, 3)
+            })
+            try:
+                payload["retry_response_body"] = retry_response.json()
+            except ValueError:
+                payload["retry_response_body"] = {
+                    "error": "Invalid JSON",
+                    "raw": retry_response.text
+                }
+        except requests.exceptions.RequestException as e:
+            payload.update({
+                "retry_query": DEFAULT_FALLBACK_QUERY,
+                "retry_status": None,
+                "retry_time_seconds": 0,
+                "retry_response_body": {"error": str(e)}
+            })
+
+    return payload, True
+
+
 def extract_fields_edges_nodes(query_string):
     try:
         ast = parse(query_string)
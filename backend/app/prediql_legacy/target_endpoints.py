@@ -7,6 +7,7 @@ import pandas as pd
 from config import Config
 import json
 import ast
+from load_introspection.schema_artifact import load_schema
 
 def extract_response_json_blocks(text):
     """
@@ -111,19 +112,13 @@ def getnodefromcompiledfile():
     # Re-import required modules after code execution environment reset
 
 
-    # Re-define file paths
-    queries_path = "load_introspection/query_parameter_list.yml"
-    mutations_path = "load_introspection/mutation_parameter_list.yml"
-
     # queries_path = Config.QUERY_FILE
     # mutations_path = Config.MUTATION_FILE
 
-    # Load the YAML data
-    with open(queries_path, 'r', encoding='utf-8') as f:
-        queries_data = yaml.safe_load(f)
-
-    with open(mutations_path, 'r', encoding='utf-8') as f:
-        mutations_data = yaml.safe_load(f)
+    # Load the compiled schema artifact
+    schema = load_schema()
+    queries_data = schema["query"]
+    mutations_data = schema["mutation"]
 
     # Extract node names
     query_nodes = list(queries_data.keys()) if isinstance(queries_data, dict) else []
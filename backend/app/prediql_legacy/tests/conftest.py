@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# prediql_legacy modules import each other as top-level siblings and config.py creates the
+# run directory at import time, so point run and state dirs at a scratch location first
+LEGACY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SCRATCH = tempfile.mkdtemp(prefix="prediql-tests-")
+os.environ.setdefault("PREDIQL_RUN_ROOT", os.path.join(_SCRATCH, "runs"))
+os.environ.setdefault("PREDIQL_STATE_DIR", os.path.join(_SCRATCH, "state"))
+if LEGACY_DIR not in sys.path:
+    sys.path.insert(0, LEGACY_DIR)
+
+
+@pytest.fixture
+def in_tmp_cwd(tmp_path, monkeypatch):
+    """Run in an empty working directory (the pipeline's artifact paths are cwd-relative)."""
+    (tmp_path / "load_introspection").mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,33 @@
+import json
+
+from embed_retrieve.bm25 import BM25Index, StoreBM25, tokenize
+
+
+def test_tokenize_keeps_identifiers_and_their_camel_case_parts():
+    assert tokenize("charactersByIds(ids: [1])") == ["charactersbyids", "characters", "by", "ids", "ids", "1"]
+    assert tokenize("user_name") == ["user_name", "user", "name"]
+    assert tokenize("__typename") == ["__typename", "typename"]
+
+
+def test_search_ranks_matching_records_and_filters_by_node_type():
+    index = BM25Index()
+    index.add({"text": "Query: characters Fields: name Rick", "node_type": "Character"})
+    index.add({"text": "Query: episodes Fields: name Pilot", "node_type": "Episode"})
+    index.add({"text": "Query: locations Fields: name Earth", "node_type": "Location"})
+    best = index.search("charactersByIds Rick", top_k=2)
+    assert best[0][1]["node_type"] == "Character"
+    assert len(best) == 1  # only documents sharing a term are scored
+    assert index.search("name", top_k=5, filter_node_type="Episode")[0][1]["node_type"] == "Episode"
+
+
+def test_store_index_reads_only_complete_appended_lines(tmp_path):
+    path = tmp_path / "real_data.ndjson"
+    path.write_text(json.dumps({"text": "alpha"}) + "\n")
+    store = StoreBM25(str(path))
+    assert len(store.refresh()) == 1
+    with open(path, "a") as f:
+        f.write(json.dumps({"text": "beta"}) + "\n" + '{"text": "gam')
+    assert len(store.refresh()) == 2
+    with open(path, "a") as f:
+        f.write('ma"}\n')
+    assert [r["text"] for r in store.refresh().records] == ["alpha", "beta", "gamma"]
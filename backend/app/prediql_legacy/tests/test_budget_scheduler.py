@@ -0,0 +1,103 @@
+from budget_scheduler import BudgetScheduler
+
+
+class FakeCoverage:
+    def __init__(self, complete=(), overall=0.0):
+        self.complete = set(complete)
+        self.overall_cov = overall
+
+    def is_complete(self, node):
+        return node in self.complete
+
+    def overall(self):
+        return {"success_field_cov": self.overall_cov}
+
+
+def test_allocation_follows_marginal_gain_and_skips_complete_nodes():
+    scheduler = BudgetScheduler(FakeCoverage(complete={"done"}), stuck_after=10)
+    for _ in range(3):
+        scheduler.charge("good", requests=1, gain=1)
+        scheduler.charge("poor", requests=1, gain=0)
+    allocation = scheduler.allocate(["good", "poor", "done"], per_node=3)
+    assert allocation == {"good": 5, "poor": 1}
+
+
+def test_allocation_never_exceeds_the_remaining_request_budget():
+    scheduler = BudgetScheduler(FakeCoverage(), max_requests=5)
+    scheduler.charge("a", requests=3)
+    allocation = scheduler.allocate(["a", "b", "c"], per_node=3)
+    assert sum(allocation.values()) <= 2
+    scheduler.charge("b", requests=2)
+    assert scheduler.exhausted()
+    assert scheduler.allocate(["a", "b", "c"], per_node=3) == {}
+
+
+def test_token_budget_is_split_per_node_and_stops_a_node_at_its_share():
+    scheduler = BudgetScheduler(FakeCoverage(), max_tokens=1000)
+    allocation = scheduler.allocate(["a", "b"], per_node=2)
+    assert allocation == {"a": 2, "b": 2}
+    assert scheduler.token_share == {"a": 500.0, "b": 500.0}
+    scheduler.charge("a", tokens=300)
+    # Another call of average cost (300) would take "a" past its 500-token share
+    assert scheduler.should_stop("a", attempts_this_round=1)
+    assert not scheduler.should_stop("b")
+    scheduler.charge("b", tokens=100)
+    assert not scheduler.should_stop("b", attempts_this_round=1)
+
+
+def test_reservations_keep_concurrent_first_calls_within_the_budget():
+    scheduler = BudgetScheduler(FakeCoverage(), max_tokens=1000)
+    # No call has been charged yet, so the average call cost is still 0
+    assert scheduler.reserve("a", 600) == 600
+    assert scheduler.reserve("b", 600) is None  # both calls together would overrun the run budget
+    scheduler.charge("a", tokens=300, reserved=600)
+    assert scheduler.tokens_used == 300 and scheduler.tokens_reserved == 0
+    assert scheduler.reserve("b", 600) == 600
+    assert BudgetScheduler(FakeCoverage()).reserve("a", 10 ** 6) == 0.0
+
+
+def test_reservations_count_against_the_node_share():
+    scheduler = BudgetScheduler(FakeCoverage(), max_tokens=1000)
+    scheduler.allocate(["a", "b"], per_node=2)
+    assert scheduler.reserve("a", 400) == 400
+    assert scheduler.reserve("a", 200) is None
+    assert scheduler.reserve("b", 200) == 200
+
+
+def test_token_shares_are_recomputed_from_what_is_left_each_round():
+    scheduler = BudgetScheduler(FakeCoverage(), max_tokens=1000)
+    scheduler.allocate(["a"], per_node=1)
+    scheduler.charge("a", tokens=600, gain=1)
+    scheduler.allocate(["a"], per_node=1)
+    assert scheduler.token_share == {"a": 400.0}
+    assert scheduler.round_tokens["a"] == 0
+
+
+def test_stuck_nodes_are_capped_and_probed_with_growing_gaps():
+    scheduler = BudgetScheduler(FakeCoverage(), stuck_after=2, stuck_cap=1)
+    scheduler.charge("stuck")
+    scheduler.charge("stuck")
+    assert scheduler.is_stuck("stuck")
+    probed = [scheduler.allocate(["stuck", "busy"], per_node=3).get("stuck") for _ in range(8)]
+    assert probed == [1, 1, None, 1, None, None, None, 1]
+
+
+def test_a_gain_ends_the_backoff():
+    scheduler = BudgetScheduler(FakeCoverage(), stuck_after=1)
+    scheduler.charge("n")
+    scheduler.allocate(["n"], per_node=2)
+    scheduler.allocate(["n"], per_node=2)
+    scheduler.charge("n", gain=3)
+    assert not scheduler.is_stuck("n")
+    assert scheduler.allocate(["n"], per_node=2) == {"n": 2}
+
+
+def test_should_stop_on_target_coverage_and_repeated_stall():
+    coverage = FakeCoverage()
+    scheduler = BudgetScheduler(coverage, stuck_after=1, target_coverage=80.0)
+    assert not scheduler.should_stop("n")
+    scheduler.charge("n")
+    assert not scheduler.should_stop("n", attempts_this_round=0)  # a stuck node still gets its probe
+    assert scheduler.should_stop("n", attempts_this_round=1)
+    coverage.overall_cov = 85.0
+    assert scheduler.should_stop("other")
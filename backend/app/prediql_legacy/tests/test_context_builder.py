@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+import context_builder
+from context_builder import build_previous_pairs, compact_body, error_signature, select_pairs
+
+
+def ok(query):
+    return {"query": query, "response_status": 200, "response_body": {"data": {"x": 1}}}
+
+
+def failed(query, message):
+    return {"query": query, "response_status": 200, "response_body": {"errors": [{"message": message}]}}
+
+
+@pytest.fixture
+def one_token_per_pair(monkeypatch):
+    # Budgets below then count pairs rather than tokenizer output
+    monkeypatch.setattr(context_builder, "count_tokens", lambda text: 1)
+
+
+def test_compact_body_keeps_the_shape_and_drops_bulk():
+    body = {"data": {"users": [{"id": i} for i in range(5)], "bio": "x" * 200}}
+    compact = compact_body(body)
+    assert compact["data"]["users"] == [{"id": 0}, {"id": 1}, "… +3 more"]
+    assert compact["data"]["bio"] == "x" * 160 + "… (+40 chars)"
+    assert compact_body({"a": {"b": {"c": {"d": {"e": 1}}}}}) == {"a": {"b": {"c": {"d": "{…}"}}}}
+
+
+def test_error_signature_masks_literals_so_repeats_collapse():
+    first = error_signature({"errors": [{"message": 'User "42" not found at 3'}]})
+    assert first == error_signature({"errors": [{"message": "User 'abc' not found at 7"}]})
+    assert error_signature({"error": "Bad Request"}) == "error: Bad Request"
+    assert error_signature({"data": {}}) is None
+    assert error_signature("plain text") is None
+
+
+def test_latest_success_and_one_example_per_error_come_first(one_token_per_pair):
+    entries = [
+        ok("q0"),
+        failed("q1", 'Unknown id "1"'),
+        failed("q2", 'Unknown id "2"'),
+        failed("q3", "Syntax error"),
+        ok("q4"),
+    ]
+    picked = select_pairs(entries, budget_tokens=3)
+    assert [text.splitlines()[1] for text in picked] == ["query: q2", "query: q3", "query: q4"]
+    assert "(same error seen 2x)" in picked[0]
+    assert len(select_pairs(entries, budget_tokens=10)) == 4  # q1 is only counted in q2's repeats
+
+
+def test_build_previous_pairs_puts_seeds_first_and_notes_omissions(tmp_path, one_token_per_pair):
+    path = tmp_path / "llama_queries.json"
+    assert build_previous_pairs(str(path)) == "none yet"
+    path.write_text(json.dumps([ok("run1"), ok("run2"), {"query": "unsent"}]))
+    text = build_previous_pairs(str(path), budget_tokens=2, seed_entries=[ok("seed")])
+    assert "query: seed" not in text and "query: run1" in text and "query: run2" in text
+    assert text.endswith("(1 older or repeated attempts omitted)")
+    text = build_previous_pairs(str(path), seed_entries=[ok("seed")])
+    assert text.index("query: seed") < text.index("query: run1")
@@ -0,0 +1,53 @@
+from coverage_engine import CoverageEngine, get_total_fields_edges_for_node
+
+QUERY_INFO = {
+    "user": {"output_type": "User"},
+    "ping": {"output_type": "Boolean"},
+}
+OBJECTS = {
+    "User": {"fields": [
+        {"name": "id", "type": "ID"},
+        {"name": "name", "type": "String"},
+        {"name": "friends", "type": "[User]"},
+    ]},
+}
+
+
+def test_universe_walks_object_fields_once_per_type():
+    fields, edges = get_total_fields_edges_for_node("user", QUERY_INFO, OBJECTS)
+    assert fields == {"id", "name", "friends"}
+    assert edges == {"user.id", "user.name", "user.friends"}  # recursion into User stops at the cycle
+
+
+def test_gain_counts_only_newly_covered_bits_of_successful_responses():
+    engine = CoverageEngine(QUERY_INFO, OBJECTS)
+    assert engine.record("user", ["id"], ["user.id"], success=False) == 0
+    assert engine.record("user", ["id", "name"], ["user.id", "user.name"], success=True) == 4
+    assert engine.record("user", ["id"], ["user.id"], success=True) == 0
+    assert engine.record("user", ["unknown"], [], success=True) == 0  # outside the schema universe
+
+    report = engine.node_report("user")
+    assert report["requests"] == 4 and report["successes"] == 3
+    assert report["requests_to_first_success"] == 2
+    assert report["success_fields"] == 2 and report["attempted_fields"] == 2
+    assert not engine.is_complete("user")
+    engine.record("user", ["friends"], ["user.friends"], success=True)
+    assert engine.is_complete("user")
+
+
+def test_scalar_output_nodes_count_their_first_success():
+    engine = CoverageEngine(QUERY_INFO, OBJECTS)
+    assert not engine.is_complete("ping")
+    assert engine.record_payload("ping", {"success": True}) == 1
+    assert engine.record_payload("ping", {"success": True}) == 0
+    assert engine.is_complete("ping")
+
+
+def test_overall_is_the_union_of_node_bitsets():
+    engine = CoverageEngine(QUERY_INFO, OBJECTS)
+    engine.record_payload("user", {"fields": ["id"], "edges": ["user.id"], "success": True})
+    engine.node_report("ping")
+    overall = engine.overall()
+    assert overall["nodes_total"] == 2 and overall["nodes_covered"] == 1
+    assert overall["total_fields"] == 3
+    assert round(overall["success_field_cov"], 1) == 33.3
@@ -0,0 +1,42 @@
+import shutil
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+
+from embed_retrieve import embed_and_index  # noqa: E402
+from embed_retrieve.vector_store import INDEX_DIR, SUBINDEX_DIR, load_manifest  # noqa: E402
+
+RECORDS = [{"text": f"record {i}", "node_type": "User" if i % 2 else "Post"} for i in range(6)]
+
+
+class FakeEmbedder:
+    name = "fake"
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts, show_progress_bar=False):
+        self.encoded += len(texts)
+        return np.array([[float(len(t)), float(i), 1.0, 0.0] for i, t in enumerate(texts)], dtype="float32")
+
+
+@pytest.fixture
+def embedder(in_tmp_cwd, monkeypatch):
+    fake = FakeEmbedder()
+    monkeypatch.setattr(embed_and_index, "load_real_data", lambda: RECORDS)
+    monkeypatch.setattr(embed_and_index, "get_embedder", lambda: fake)
+    return fake
+
+
+def test_missing_subindexes_are_rebuilt_without_re_encoding(embedder, in_tmp_cwd):
+    embed_and_index.embed_real_data()
+    assert embedder.encoded == len(RECORDS)
+    assert load_manifest(INDEX_DIR) == {"User": 3, "Post": 3}
+
+    shutil.rmtree(in_tmp_cwd / INDEX_DIR / SUBINDEX_DIR)
+    assert load_manifest(INDEX_DIR) is None
+    embed_and_index.embed_real_data()
+    assert embedder.encoded == len(RECORDS)
+    assert load_manifest(INDEX_DIR) == {"User": 3, "Post": 3}
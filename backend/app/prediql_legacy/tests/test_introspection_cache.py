@@ -0,0 +1,100 @@
+import json
+import time
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from config import Config  # noqa: E402
+from endpoint_state import INTROSPECTION_FILE  # noqa: E402
+from load_introspection import introspection_cache  # noqa: E402
+from load_introspection.introspection_cache import FINGERPRINT_QUERY, IntrospectionCache  # noqa: E402
+
+RESULT = {"data": {"__schema": {"types": []}}}
+
+
+class FakeResponse:
+    def __init__(self, status, body=None, etag=None):
+        self.status_code = status
+        self._body = body
+        self.headers = {"ETag": etag} if etag else {}
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code))
+
+
+class FakeEndpoint:
+    """Answers the fingerprint query (or rejects it) and the full introspection, honouring If-None-Match."""
+
+    def __init__(self, fingerprint_ok=True, etag='"v1"'):
+        self.fingerprint_ok = fingerprint_ok
+        self.etag = etag
+        self.types = [{"name": "Query"}]
+        self.calls = []
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        if json["query"] == FINGERPRINT_QUERY:
+            self.calls.append("fingerprint")
+            if not self.fingerprint_ok:
+                return FakeResponse(400)
+            return FakeResponse(200, {"data": {"__schema": {"types": self.types}}})
+        self.calls.append("full")
+        if headers.get("If-None-Match") == self.etag:
+            return FakeResponse(304)
+        return FakeResponse(200, RESULT, etag=self.etag)
+
+
+@pytest.fixture
+def endpoint(in_tmp_cwd, monkeypatch):
+    fake = FakeEndpoint()
+    monkeypatch.setattr(introspection_cache.requests, "post", fake.post)
+    monkeypatch.setattr(introspection_cache, "ENABLED", True)
+    monkeypatch.setattr(Config, "STATE_DIR", in_tmp_cwd / "state")
+    return fake
+
+
+def test_unchanged_fingerprint_skips_the_full_introspection(endpoint):
+    assert IntrospectionCache("http://api.test/graphql").refresh() == "fetched"
+    assert IntrospectionCache("http://api.test/graphql").refresh() == "hit"
+    assert endpoint.calls == ["fingerprint", "full", "fingerprint"]
+    with open(INTROSPECTION_FILE, encoding="utf-8") as f:
+        assert json.load(f) == RESULT
+
+
+def test_changed_fingerprint_refetches(endpoint):
+    IntrospectionCache("http://api.test/graphql").refresh()
+    endpoint.types = [{"name": "Query"}, {"name": "NewType"}]
+    assert IntrospectionCache("http://api.test/graphql").refresh() == "fetched"
+
+
+def test_disabled_cache_goes_straight_to_the_full_introspection(endpoint, monkeypatch):
+    monkeypatch.setattr(introspection_cache, "ENABLED", False)
+    assert IntrospectionCache("http://api.test/graphql").refresh() == "fetched"
+    assert endpoint.calls == ["full"]
+
+
+def test_etag_fallback_and_304_refreshes_the_entry(endpoint):
+    endpoint.fingerprint_ok = False
+    IntrospectionCache("http://api.test/graphql").refresh()
+    cache = IntrospectionCache("http://api.test/graphql")
+    before = cache.meta["fetched_at"]
+    time.sleep(0.01)
+    assert cache.refresh() == "hit"
+    assert IntrospectionCache("http://api.test/graphql").meta["fetched_at"] > before
+
+
+def test_compiled_artifacts_are_restored_only_when_all_are_cached(endpoint, in_tmp_cwd):
+    cache = IntrospectionCache("http://api.test/graphql")
+    cache.refresh()
+    assert not cache.restore_artifacts()
+    for name in introspection_cache.ARTIFACTS:
+        (in_tmp_cwd / name).write_text("{}")
+    cache.save_artifacts()
+    for name in introspection_cache.ARTIFACTS:
+        (in_tmp_cwd / name).unlink()
+    assert IntrospectionCache("http://api.test/graphql").restore_artifacts()
+    assert all((in_tmp_cwd / name).exists() for name in introspection_cache.ARTIFACTS)
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+pytest.importorskip("faiss")
+
+import knowledge_base  # noqa: E402
+from config import Config  # noqa: E402
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "OUTPUT_DIR", tmp_path / "out")
+    monkeypatch.setattr(Config, "REAL_DATA_FILE", tmp_path / "out" / "real_data.ndjson")
+    monkeypatch.setattr(Config, "STATE_DIR", tmp_path / "state")
+    (tmp_path / "out").mkdir()
+    return knowledge_base.KnowledgeBase("http://api.test/graphql", "schema-hash")
+
+
+def append_records(*texts):
+    with open(Config.REAL_DATA_FILE, "a", encoding="utf-8") as f:
+        for text in texts:
+            f.write(json.dumps({"text": text}) + "\n")
+
+
+def test_payloads_are_stored_once_with_their_arm(kb):
+    payload = {"query": "{ a }", "success": True, "response_status": 200, "arm": "schema_args_d1"}
+    assert kb.record_payload("a", payload)
+    assert not kb.record_payload("a", dict(payload))
+    assert not kb.record_payload("a", {"query": "{ b }", "success": False})
+    reopened = knowledge_base.KnowledgeBase(kb.url, kb.schema_hash)
+    assert [p["arm"] for p in reopened.successes("a")] == ["schema_args_d1"]
+
+
+def test_sync_appends_only_records_the_knowledge_base_does_not_have(kb):
+    append_records("r1", "r2", "r1")
+    assert kb.sync_real_data() == 2
+    append_records("r2", "r3")
+    assert kb.sync_real_data() == 1
+
+    # Next run: warm start, then the run re-extracts a stored record
+    warm = knowledge_base.KnowledgeBase(kb.url, kb.schema_hash)
+    assert warm.restore()["records"] == 3
+    append_records("r1", "r4")
+    assert warm.sync_real_data() == 1
+    with open(warm._path(knowledge_base.REAL_DATA_FILE), encoding="utf-8") as f:
+        assert [json.loads(line)["text"] for line in f] == ["r1", "r2", "r3", "r4"]
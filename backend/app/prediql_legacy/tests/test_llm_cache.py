@@ -0,0 +1,57 @@
+import time
+
+from llm_cache import LLMCache, cache_key
+
+
+def make_cache(tmp_path, **kwargs):
+    return LLMCache(path=str(tmp_path / "llm_cache.sqlite"), **kwargs)
+
+
+def test_key_covers_provider_model_temperature_and_prompt():
+    base = cache_key("openai", "m", 0.2, "p")
+    assert base == cache_key("openai", "m", 0.2, "p")
+    assert len({base, cache_key("gemini", "m", 0.2, "p"), cache_key("openai", "m2", 0.2, "p"),
+                cache_key("openai", "m", 0.7, "p"), cache_key("openai", "m", 0.2, "q")}) == 5
+
+
+def test_identical_prompts_replay_samples_in_order_across_processes(tmp_path):
+    first = make_cache(tmp_path)
+    for expected_idx, response in enumerate(("a", "b")):
+        hit, idx = first.get("k")
+        assert hit is None and idx == expected_idx
+        first.put("k", idx, response)
+
+    rerun = make_cache(tmp_path)  # a new process starts again at sample 0
+    assert rerun.get("k") == ("a", 0)
+    assert rerun.get("k") == ("b", 1)
+    assert rerun.get("k") == (None, 2)  # cached samples used up: a fresh call
+    assert rerun.stats() == {"hits": 2, "misses": 1}
+
+
+def test_empty_responses_are_not_cached(tmp_path):
+    cache = make_cache(tmp_path)
+    _, idx = cache.get("k")
+    cache.put("k", idx, "")
+    assert make_cache(tmp_path).get("k") == (None, 0)
+
+
+def test_expired_entries_are_ignored(tmp_path):
+    cache = make_cache(tmp_path, ttl=0.05)
+    cache.put("k", 0, "old")
+    time.sleep(0.1)
+    assert make_cache(tmp_path, ttl=0.05).get("k") == (None, 0)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put("a", 0, "1")
+    time.sleep(0.01)
+    cache.put("b", 0, "2")
+    time.sleep(0.01)
+    assert cache.get("a") == ("1", 0)  # touch "a" so "b" is now the oldest
+    time.sleep(0.01)
+    cache.put("c", 0, "3")
+    replay = make_cache(tmp_path, max_entries=2)
+    assert replay.get("a")[0] == "1"
+    assert replay.get("b")[0] is None
+    assert replay.get("c")[0] == "3"
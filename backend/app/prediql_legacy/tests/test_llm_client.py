@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+import llm_client  # noqa: E402
+from llm_cache import LLMCache  # noqa: E402
+
+
+def sse(*chunks, done=True):
+    lines = [f"data: {json.dumps(chunk)}\n\n" for chunk in chunks]
+    if done:
+        lines.append("data: [DONE]\n\n")
+    return "".join(lines).encode("utf-8")
+
+
+def delta(text, finish=None):
+    return {"choices": [{"delta": {"content": text}, "finish_reason": finish}]}
+
+
+class CutOffStream(httpx.AsyncByteStream):
+    """Yields some SSE bytes, then fails like a dropped connection."""
+
+    def __init__(self, body):
+        self.body = body
+
+    async def __aiter__(self):
+        yield self.body
+        raise httpx.ReadError("connection reset")
+
+
+def run(client, prompt, cache, monkeypatch, on_text=None):
+    monkeypatch.setattr(llm_client, "get_cache", lambda: cache)
+
+    async def call():
+        try:
+            return await client.complete_with_usage(prompt, on_text=on_text)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(call())
+
+
+def make_client(handler):
+    client = llm_client.AsyncLLMClient("openai_compatible", "key", "m", base_url="http://llm.test/v1", max_retries=0)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client._semaphore = asyncio.Semaphore(1)
+    return client
+
+
+def test_complete_stream_is_cached_and_replayed(tmp_path, monkeypatch):
+    cache = LLMCache(path=str(tmp_path / "c.sqlite"))
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, content=sse(delta("```graphql\n"), delta("{ a }\n```", finish="stop")))
+
+    deltas = []
+    first = run(make_client(handler), "p", cache, monkeypatch, on_text=deltas.append)
+    assert first["text"] == "```graphql\n{ a }\n```" and not first["cached"]
+    assert "".join(deltas) == first["text"]
+
+    replay = run(make_client(handler), "p", LLMCache(path=str(tmp_path / "c.sqlite")), monkeypatch,
+                 on_text=lambda _: None)
+    assert replay["cached"] and replay["text"] == first["text"]
+    assert len(calls) == 1
+
+
+def test_cut_off_stream_is_used_but_not_cached(tmp_path, monkeypatch):
+    cache = LLMCache(path=str(tmp_path / "c.sqlite"))
+
+    def handler(request):
+        return httpx.Response(200, stream=CutOffStream(sse(delta("```graphql\n{ a"), done=False)))
+
+    result = run(make_client(handler), "p", cache, monkeypatch, on_text=lambda _: None)
+    assert result["text"] == "```graphql\n{ a"
+    assert LLMCache(path=str(tmp_path / "c.sqlite")).get(next(iter(cache._seen)))[0] is None
+
+
+def test_stream_without_finish_marker_is_not_cached(tmp_path, monkeypatch):
+    cache = LLMCache(path=str(tmp_path / "c.sqlite"))
+
+    def handler(request):
+        return httpx.Response(200, content=sse(delta("{ a"), done=False))
+
+    result = run(make_client(handler), "p", cache, monkeypatch, on_text=lambda _: None)
+    assert result["text"] == "{ a"
+    assert LLMCache(path=str(tmp_path / "c.sqlite")).get(next(iter(cache._seen)))[0] is None
+
+
+def test_failed_call_reports_zero_tokens_and_is_not_cached(tmp_path, monkeypatch):
+    cache = LLMCache(path=str(tmp_path / "c.sqlite"))
+
+    def handler(request):
+        return httpx.Response(400, json={"error": "bad request"})
+
+    result = run(make_client(handler), "a long prompt " * 50, cache, monkeypatch)
+    assert result["text"] == "" and result["usage_source"] == "failed"
+    assert result["total_tokens"] == 0
+    assert LLMCache(path=str(tmp_path / "c.sqlite")).get(next(iter(cache._seen)))[0] is None
+
+
+def test_uncached_call_without_provider_usage_is_counted_locally(tmp_path, monkeypatch):
+    def handler(request):
+        return httpx.Response(200, json={"choices": [{"message": {"content": "{ a }"}}]})
+
+    result = run(make_client(handler), "p", LLMCache(path=str(tmp_path / "c.sqlite")), monkeypatch)
+    assert result["text"] == "{ a }" and result["usage_source"] == "local"
+    assert result["prompt_tokens"] > 0 and result["completion_tokens"] > 0
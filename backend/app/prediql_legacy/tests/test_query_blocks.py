@@ -0,0 +1,58 @@
+from query_blocks import FencedBlockExtractor, QueryBlockParser, extract_queries
+
+OUTPUT = """Here are the queries:
+```graphql
+query { user(id: 1) { name } }
+```
+Some prose.
+```gql
+{ users { id } }
+```
+```python
+print("not graphql")
+```
+```graphql
+query { broken(
+```
+"""
+
+
+def test_extract_queries_keeps_valid_blocks_and_reasons_for_rejects():
+    queries, rejected = extract_queries(OUTPUT)
+    assert [q.strip() for q in queries] == ["query { user(id: 1) { name } }", "{ users { id } }"]
+    reasons = [r["reason"] for r in rejected]
+    assert "unsupported fence label 'python'" in reasons
+    assert any(reason.startswith("syntax error") for reason in reasons)
+
+
+def test_streamed_chunks_give_the_same_blocks_as_one_shot():
+    extractor = FencedBlockExtractor()
+    blocks = []
+    for i in range(0, len(OUTPUT), 7):
+        blocks.extend(extractor.feed(OUTPUT[i:i + 7]))
+    blocks.extend(extractor.close())
+    whole = FencedBlockExtractor()
+    assert blocks == whole.feed(OUTPUT) + whole.close()
+
+
+def test_parser_accepts_queries_as_soon_as_their_fence_closes():
+    parser = QueryBlockParser()
+    assert parser.feed("```graphql\nquery { a }\n") == []
+    assert [q.strip() for q in parser.feed("```\n```graphql\nquery { b }")] == ["query { a }"]
+    assert [q.strip() for q in parser.close()] == ["query { b }"]  # cut off before its closing fence
+
+
+def test_inline_and_keyword_fences():
+    queries, _ = extract_queries("```graphql query { a }```\n```query { b }```")
+    assert [q.strip() for q in queries] == ["query { a }", "query { b }"]
+
+
+def test_unfenced_output_is_tried_as_one_query_and_duplicates_are_dropped():
+    assert [q.strip() for q in extract_queries("query { a }")[0]] == ["query { a }"]
+    queries, _ = extract_queries("```graphql\nquery { a }\n```\n```graphql\nquery { a }\n```")
+    assert len(queries) == 1
+
+
+def test_fix_is_applied_before_validation():
+    queries, _ = extract_queries("```graphql\nquery { User { id } }\n```", fix=lambda q: q.replace("User", "user"))
+    assert queries[0].strip() == "query { user { id } }"
@@ -0,0 +1,66 @@
+import pytest
+
+import query_synthesizer
+import value_pool
+from query_synthesizer import QuerySynthesizer
+
+QUERY_INFO = {
+    "character": {
+        "source": "query",
+        "parameters": {"id": "ID!"},
+        "output_type": "Character",
+        "node_type": "Character",
+        "relevant_schema": {"Character": {"kind": "OBJECT", "fields": [
+            {"name": "id", "type": "ID"},
+            {"name": "name", "type": "String"},
+        ]}},
+    },
+}
+RECORDS = [{"node_type": "Character", "record": {"id": str(i), "name": f"c{i}"}} for i in range(1, 7)]
+
+
+@pytest.fixture
+def synthesizer(monkeypatch):
+    # No introspection (schema validation off) and an empty value pool: only the real-data records are known
+    monkeypatch.setattr(query_synthesizer, "get_validator", lambda: None)
+    monkeypatch.setattr(value_pool, "_POOL", value_pool.ValuePool({}))
+    return QuerySynthesizer(QUERY_INFO, real_records=RECORDS)
+
+
+def test_queries_use_harvested_values_and_select_scalar_fields(synthesizer):
+    queries = synthesizer.synthesize("character", n=2)
+    assert queries == ['query { character(id: "1") { id name } }', 'query { character(id: "2") { id name } }']
+
+
+def test_later_rounds_continue_the_rotation(synthesizer):
+    first = synthesizer.synthesize("character", n=2, first_variant=0)
+    second = synthesizer.synthesize("character", n=2, first_variant=2)
+    assert not set(first) & set(second)
+
+
+def test_nodes_without_arguments_vary_the_selection_depth_instead_of_repeating(monkeypatch):
+    monkeypatch.setattr(query_synthesizer, "get_validator", lambda: None)
+    info = {
+        "source": "query",
+        "parameters": {},
+        "output_type": "Episode",
+        "relevant_schema": {
+            "Episode": {"kind": "OBJECT", "fields": [
+                {"name": "name", "type": "String"},
+                {"name": "characters", "type": "[Character]"},
+            ]},
+            "Character": QUERY_INFO["character"]["relevant_schema"]["Character"],
+        },
+    }
+    synthesizer = QuerySynthesizer({"episodes": info})
+    assert synthesizer.synthesize("episodes", n=3, depth=1) == [
+        "query { episodes { name } }",
+        "query { episodes { name characters { id name } } }",
+    ]
+    assert synthesizer.synthesize("episodes", n=3, depth=2) == ["query { episodes { name characters { id name } } }"]
+
+
+def test_unknown_nodes_and_unfillable_required_arguments_give_nothing(synthesizer):
+    assert synthesizer.synthesize("missing") == []
+    info = dict(QUERY_INFO["character"], parameters={"filter": "SomeScalar!"})
+    assert QuerySynthesizer({"character": info}).synthesize("character") == []
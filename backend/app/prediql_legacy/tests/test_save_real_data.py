@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import save_real_data
+from save_real_data import flatten_real_data, iter_objects, iter_real_data, record_key
+
+
+def test_iter_objects_unwraps_connections_pages_lists_and_objects():
+    assert list(iter_objects({"edges": [{"node": {"id": 1}}, {"node": {"id": 2}}]})) == [{"id": 1}, {"id": 2}]
+    assert list(iter_objects({"results": [{"id": 3}], "info": {"count": 1}})) == [{"id": 3}]
+    assert list(iter_objects([{"id": 4}, {}, "x"])) == [{"id": 4}]
+    assert list(iter_objects({"id": 5})) == [{"id": 5}]
+    assert list(iter_objects(None)) == []
+
+
+@pytest.fixture
+def run_dirs(tmp_path, monkeypatch):
+    output = tmp_path / "out"
+    (output / "user").mkdir(parents=True)
+    monkeypatch.setattr(save_real_data, "RAW_DATA_BASE", str(output))
+    monkeypatch.setattr(save_real_data, "REAL_DATA_OUTPUT_PATH", str(output / "real_data.ndjson"))
+    monkeypatch.setattr(save_real_data, "CHECKPOINT_PATH", str(output / "checkpoint.json"))
+    monkeypatch.setattr(save_real_data, "QUERY_INFO_PATH", str(tmp_path / "query_info.json"))
+    (tmp_path / "query_info.json").write_text(json.dumps({"user": {"source": "query", "node_type": "User"}}))
+    return output
+
+
+def write_payloads(output, users):
+    entries = [{"success": False, "response_body": {"data": {"user": {"id": "ignored"}}}}]
+    entries.extend({"success": True, "response_body": {"data": {"user": user}}} for user in users)
+    (output / "user" / "llama_queries.json").write_text(json.dumps(entries))
+
+
+def stored(output):
+    return list(iter_real_data(str(output / "real_data.ndjson")))
+
+
+def test_flatten_appends_only_new_entries_and_skips_duplicate_records(run_dirs):
+    write_payloads(run_dirs, [{"id": "1"}, {"id": "2"}, {"id": "1"}])
+    assert flatten_real_data() == 2
+    assert flatten_real_data() == 0  # unchanged file is not parsed again
+
+    # A later round re-fetches user 2 and finds user 3
+    write_payloads(run_dirs, [{"id": "1"}, {"id": "2"}, {"id": "1"}, {"id": "2"}, {"id": "3"}])
+    assert flatten_real_data() == 1
+    records = stored(run_dirs)
+    assert [r["record"]["id"] for r in records] == ["1", "2", "3"]
+    assert records[0]["node_type"] == "User" and "Query: user" in records[0]["text"]
+    assert len({record_key(r) for r in records}) == 3
+
+
+def test_records_already_in_a_warm_started_store_are_not_appended_again(run_dirs):
+    write_payloads(run_dirs, [{"id": "1"}])
+    flatten_real_data()
+    (run_dirs / "checkpoint.json").unlink()  # fresh run, store restored from the knowledge base
+    assert flatten_real_data() == 0
+    assert len(stored(run_dirs)) == 1
+
+
+def test_iter_real_data_skips_a_torn_last_line(tmp_path):
+    path = tmp_path / "store.ndjson"
+    path.write_text(json.dumps({"text": "a"}) + "\n" + '{"text": "b')
+    assert [r["text"] for r in iter_real_data(str(path))] == ["a"]
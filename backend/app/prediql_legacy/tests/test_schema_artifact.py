@@ -0,0 +1,51 @@
+import json
+import os
+import time
+
+import pytest
+
+from load_introspection import schema_artifact
+from load_introspection.schema_artifact import load_schema, write_schema_artifact
+
+QUERY = {"user": {"inputs": {"id": "ID!"}, "output": "User"}}
+OBJECTS = {"User": {"kind": "OBJECT", "fields": [{"name": "id", "type": "ID"}]}}
+
+
+def test_round_trip_and_accessors(tmp_path):
+    path = str(tmp_path / "schema.json")
+    write_schema_artifact(QUERY, {}, OBJECTS, path=path, export_yaml=False)
+    schema = load_schema(path)
+    assert schema == {"version": schema_artifact.SCHEMA_VERSION, "query": QUERY, "mutation": {}, "objects": OBJECTS}
+    assert schema_artifact.query_parameters(path) == QUERY
+    assert schema_artifact.object_list(path) == OBJECTS
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_parsed_once_and_reloaded_when_the_file_changes(tmp_path):
+    path = str(tmp_path / "schema.json")
+    write_schema_artifact(QUERY, {}, OBJECTS, path=path, export_yaml=False)
+    assert load_schema(path) is load_schema(path)
+    time.sleep(0.01)
+    write_schema_artifact({}, QUERY, OBJECTS, path=path, export_yaml=False)
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    assert load_schema(path)["mutation"] == QUERY
+
+
+def test_missing_artifact_never_falls_back_to_yaml_samples(in_tmp_cwd):
+    (in_tmp_cwd / "load_introspection" / "query_parameter_list.yml").write_text("stale: {}\n")
+    with pytest.raises(FileNotFoundError):
+        load_schema()
+
+
+def test_other_versions_are_rejected(tmp_path):
+    path = tmp_path / "schema.json"
+    path.write_text(json.dumps({"version": 999, "query": {}, "mutation": {}, "objects": {}}))
+    with pytest.raises(ValueError):
+        load_schema(str(path))
+
+
+def test_yaml_export_is_optional(in_tmp_cwd):
+    pytest.importorskip("yaml")
+    write_schema_artifact(QUERY, {}, OBJECTS, export_yaml=True)
+    assert (in_tmp_cwd / "load_introspection" / "object_list.yml").exists()
+    assert load_schema()["query"] == QUERY
@@ -0,0 +1,74 @@
+from graphql import build_schema
+
+from query_blocks import QueryBlockParser
+from schema_validator import SchemaValidator
+
+SCHEMA = build_schema("""
+type Query {
+  user(id: ID!): User
+  users(limit: Int): [User]
+}
+type User {
+  id: ID
+  name: String
+  friends: [User]
+}
+""")
+
+
+def check(query, mode="repair"):
+    return SchemaValidator(SCHEMA, mode).check(query)
+
+
+def test_valid_query_passes_unchanged():
+    assert check('{ user(id: "1") { name } }') == (True, '{ user(id: "1") { name } }', [], [])
+
+
+def test_argument_value_fuzzing_is_not_rejected():
+    # Nulls and type mismatches are deliberate payloads; only structure is validated
+    for query in ('{ user(id: null) { name } }', '{ users(limit: "1 OR 1=1") { id } }'):
+        for mode in ("repair", "strict"):
+            ok, _, errors, _ = check(query, mode)
+            assert ok, (mode, query, errors)
+
+
+def test_repair_fixes_case_and_prunes_unknown_fields_and_arguments():
+    ok, query, errors, repairs = check('{ User(ID: "1", bogus: 2) { Name nope } }')
+    assert ok and not errors
+    assert "user(id:" in query and "name" in query
+    assert "nope" not in query and "bogus" not in query
+    assert "renamed User -> user" in repairs
+
+
+def test_repair_fixes_selections_on_scalars_and_objects():
+    ok, query, _, repairs = check('{ user(id: "1") { name { x } friends } }')
+    assert ok
+    assert "dropped sub-selection on scalar name" in repairs
+    assert "selected __typename on friends" in repairs
+    assert "__typename" in query
+
+
+def test_structural_errors_are_rejected():
+    ok, _, errors, _ = check("{ user { name } }")
+    assert not ok and "required" in errors[0]
+    ok, _, errors, _ = check("{ user(id: 1) { name ")
+    assert not ok and errors
+
+
+def test_strict_mode_validates_without_repairing():
+    ok, query, errors, repairs = check('{ User(id: "1") { name } }', mode="strict")
+    assert not ok and errors and not repairs
+    assert query == '{ User(id: "1") { name } }'
+
+
+def test_off_mode_accepts_anything():
+    assert check("not graphql", mode="off")[0]
+
+
+def test_parser_rejects_schema_invalid_blocks_and_records_repairs():
+    parser = QueryBlockParser(validator=SchemaValidator(SCHEMA, "repair"))
+    parser.feed('```graphql\n{ user { name } }\n```\n```graphql\n{ user(id: "1") { Name } }\n```')
+    parser.close()
+    assert len(parser.queries) == 1 and "name" in parser.queries[0]
+    assert parser.rejected[0]["reason"].startswith("schema: ")
+    assert parser.repaired[0]["repairs"] == ["renamed Name -> name"]
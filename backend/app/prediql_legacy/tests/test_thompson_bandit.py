@@ -0,0 +1,55 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from thompson_bandit import ThompsonBandit  # noqa: E402
+
+ARMS = ["a", "b", "c"]
+
+
+def make_bandit(**kwargs):
+    return ThompsonBandit(ARMS, rng=np.random.default_rng(0), **kwargs)
+
+
+def test_pick_follows_the_posterior():
+    bandit = make_bandit()
+    bandit.update_many("n", ["b"] * 50, [1.0] * 50)
+    bandit.update_many("n", ["a", "c"] * 50, [0.0] * 100)
+    assert {bandit.pick("n") for _ in range(20)} == {ARMS.index("b")}
+
+
+def test_update_many_credits_repeated_arms_of_one_batch():
+    bandit = make_bandit()
+    bandit.update_many("n", ["a", "a", 2], [1.0, 0.0, 1.0])  # arms by name or column
+    stats = bandit.arm_stats("n")
+    assert (stats["a"]["alpha"], stats["a"]["beta"], stats["a"]["pulls"]) == (2.0, 2.0, 2)
+    assert (stats["c"]["alpha"], stats["c"]["pulls"], stats["c"]["rewards"]) == (2.0, 1, 1.0)
+    assert stats["b"]["pulls"] == 0
+
+
+def test_discount_is_applied_once_per_batch_to_touched_arms():
+    bandit = make_bandit(gamma=0.5)
+    bandit.update_many("n", ["a", "a"], [1.0, 1.0])
+    stats = bandit.arm_stats("n")
+    assert (stats["a"]["alpha"], stats["a"]["beta"]) == (2.5, 0.5)
+    assert (stats["b"]["alpha"], stats["b"]["beta"]) == (1.0, 1.0)
+
+
+def test_rows_grow_past_the_initial_capacity():
+    bandit = make_bandit(capacity=2)
+    for i in range(5):
+        bandit.update(f"n{i}", "a", 1.0)
+    assert len(bandit.node_index) == 5
+    assert bandit.arm_stats("n4")["a"]["alpha"] == 2.0
+    assert bandit.arm_stats("n0")["a"]["alpha"] == 2.0  # earlier rows survive the resize
+
+
+def test_load_priors_seeds_posteriors_and_ignores_unknown_arms():
+    bandit = make_bandit()
+    priors = {("n", "a"): {"alpha": 5.0, "beta": 2.0}, ("n", "retired_arm"): {"alpha": 9.0, "beta": 9.0}}
+    assert bandit.load_priors(priors) == 1
+    stats = bandit.arm_stats("n")["a"]
+    assert (stats["alpha"], stats["beta"], stats["prior_alpha"], stats["prior_beta"]) == (5.0, 2.0, 5.0, 2.0)
+    bandit.update("n", "a", 1.0)
+    assert bandit.posteriors()[("n", "a")] == {"alpha": 6.0, "beta": 2.0}
+    assert bandit.arm_stats("n")["a"]["prior_alpha"] == 5.0
@@ -0,0 +1,65 @@
+import token_counter
+from token_counter import count_tokens
+
+
+class FakeEncoding:
+    def __init__(self, name):
+        self.name = name
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+class FakeTiktoken:
+    """Knows only the given model names; others raise like tiktoken.encoding_for_model."""
+
+    def __init__(self, models=()):
+        self.models = set(models)
+        self.lookups = []
+
+    def encoding_for_model(self, model):
+        self.lookups.append(model)
+        if model not in self.models:
+            raise KeyError(model)
+        return FakeEncoding(model)
+
+    def get_encoding(self, name):
+        return FakeEncoding(name)
+
+
+def use_tiktoken(monkeypatch, fake):
+    monkeypatch.setattr(token_counter, "tiktoken", fake)
+    monkeypatch.setattr(token_counter, "_ENCODINGS", {})
+
+
+def test_without_tiktoken_counts_a_token_per_four_characters(monkeypatch):
+    use_tiktoken(monkeypatch, None)
+    assert count_tokens("") == 0
+    assert count_tokens(None) == 0
+    assert count_tokens("abcd") == 1
+    assert count_tokens("abcde") == 2
+    assert token_counter.tokenizer_name() == "chars/4"
+
+
+def test_known_models_use_their_encoding_and_lookups_are_cached(monkeypatch):
+    fake = FakeTiktoken(models={"gpt-4o"})
+    use_tiktoken(monkeypatch, fake)
+    assert count_tokens("one two three", model="gpt-4o") == 3
+    count_tokens("four", model="gpt-4o")
+    assert fake.lookups == ["gpt-4o"]
+    assert token_counter._ENCODINGS["gpt-4o"].name == "gpt-4o"
+    assert token_counter.tokenizer_name() == "tiktoken"
+
+
+def test_unknown_models_fall_back_to_cl100k(monkeypatch):
+    use_tiktoken(monkeypatch, FakeTiktoken())
+    assert count_tokens("a b", model="llama3") == 2
+    assert token_counter._ENCODINGS["llama3"].name == "cl100k_base"
+
+
+def test_model_defaults_to_the_configured_llm(monkeypatch):
+    fake = FakeTiktoken(models={"gpt-4o-mini"})
+    use_tiktoken(monkeypatch, fake)
+    monkeypatch.setenv("PREDIQL_LLM_MODEL", "gpt-4o-mini")
+    count_tokens("x")
+    assert fake.lookups == ["gpt-4o-mini"]
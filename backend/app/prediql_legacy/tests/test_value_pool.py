@@ -0,0 +1,65 @@
+import json
+
+from value_pool import ValuePool
+
+QUERY_INFO = {
+    "user": {
+        "output_type": "User",
+        "node_type": "User",
+        "parameters": {"id": "ID!", "role": "Role"},
+        "relevant_schema": {
+            "User": {"kind": "OBJECT", "fields": [
+                {"name": "id", "type": "ID!"},
+                {"name": "name", "type": "String"},
+                {"name": "role", "type": "Role"},
+                {"name": "posts", "type": "[Post]"},
+            ]},
+            "Post": {"kind": "OBJECT", "fields": [
+                {"name": "id", "type": "ID!"},
+                {"name": "title", "type": "String"},
+            ]},
+        },
+    },
+}
+
+
+def response(user):
+    return {"success": True, "response_body": {"data": {"user": user}}}
+
+
+def test_leaves_are_stored_under_their_parent_type_and_field():
+    pool = ValuePool(QUERY_INFO)
+    user = {"id": "u1", "name": "Ann", "role": "ADMIN", "posts": [{"id": "p1", "title": "Hi"}, {"id": "p2"}]}
+    assert pool.add_payload("user", response(user)) == 6
+    assert pool.add_payload("user", response(user)) == 0
+    assert pool.add_payload("user", {"success": False, "response_body": {"data": {"user": {"id": "u9"}}}}) == 0
+    assert pool.values("User", "id") == ["u1"]
+    assert pool.values("Post", "id") == ["p1", "p2"]
+    assert pool.values("User", "unknown") == []
+
+
+def test_arguments_prefer_the_node_type_and_ids_transfer_across_types():
+    pool = ValuePool(QUERY_INFO)
+    pool.add_payload("user", response({"id": "u1", "name": "Ann", "role": "ADMIN", "posts": [{"id": "p1"}]}))
+    assert pool.for_argument("id", "ID!", node_type="User") == ["u1", "p1"]
+    assert pool.for_argument("postId", "ID") == ["p1", "u1"]  # any ID, ordered by (type, field)
+    assert pool.for_argument("role", "Role") == ["ADMIN"]
+    assert pool.for_argument("title", "String") == []  # plain strings only carry over by field name
+    assert pool.hints("user") == 'id (ID!): "u1", "p1"; role (Role): "ADMIN"'
+
+
+def test_full_keys_replace_their_oldest_value():
+    pool = ValuePool(QUERY_INFO, max_per_key=2)
+    for i in range(3):
+        pool.add_payload("user", response({"id": f"u{i}"}))
+    assert pool.values("User", "id") == ["u2", "u1"]
+    assert pool.add_payload("user", response({"id": "u0"})) == 1  # evicted values can be added again
+    assert pool.stats() == {"keys": 1, "values": 2}
+
+
+def test_save_writes_a_readable_snapshot(tmp_path):
+    pool = ValuePool(QUERY_INFO)
+    pool.add_payload("user", response({"id": "u1"}))
+    path = tmp_path / "value_pool.json"
+    pool.save(str(path))
+    assert json.loads(path.read_text()) == {"User.id": {"type": "ID", "values": ["u1"]}}
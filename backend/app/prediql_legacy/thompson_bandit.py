@@ -0,0 +1,131 @@
+import threading
+
+import numpy as np
+
+
+class ThompsonBandit:
+    """
+    Beta-Bernoulli Thompson sampling over a node x arm matrix.
+
+    `alpha` / `beta` are float arrays of shape (nodes, arms); each node gets a
+    row the first time it is seen. Sampling a node draws every arm at once with
+    one vectorized `rng.beta` call, and updates are in-place array operations,
+    so the per-attempt cost does not grow with Python-level loops over arms.
+    """
+
+    def __init__(self, arm_names, gamma=1.0, rng=None, capacity=16):
+        self.arm_names = list(arm_names)
+        self.arm_index = {name: i for i, name in enumerate(self.arm_names)}
+        self.gamma = gamma
+        self.rng = rng or np.random.default_rng()
+        self.node_index = {}
+        n_arms = len(self.arm_names)
+        self.alpha = np.ones((capacity, n_arms))
+        self.beta = np.ones((capacity, n_arms))
+        self.prior_alpha = np.ones((capacity, n_arms))
+        self.prior_beta = np.ones((capacity, n_arms))
+        self.pulls = np.zeros((capacity, n_arms), dtype=np.int64)
+        self.rewards = np.zeros((capacity, n_arms))
+        self._lock = threading.RLock()
+
+    # ---- rows ----
+
+    def _row(self, node):
+        row = self.node_index.get(node)
+        if row is not None:
+            return row
+        with self._lock:
+            row = self.node_index.get(node)
+            if row is None:
+                row = len(self.node_index)
+                if row >= self.alpha.shape[0]:
+                    self._grow(max(16, self.alpha.shape[0] * 2))
+                self.node_index[node] = row
+            return row
+
+    def _grow(self, capacity):
+        def grown(arr, fill):
+            out = np.full((capacity, arr.shape[1]), fill, dtype=arr.dtype)
+            out[: arr.shape[0]] = arr
+            return out
+
+        self.alpha = grown(self.alpha, 1.0)
+        self.beta = grown(self.beta, 1.0)
+        self.prior_alpha = grown(self.prior_alpha, 1.0)
+        self.prior_beta = grown(self.prior_beta, 1.0)
+        self.pulls = grown(self.pulls, 0)
+        self.rewards = grown(self.rewards, 0.0)
+
+    # ---- selection ----
+
+    def sample(self, node, size=None):
+        """Posterior draws for every arm of `node`: shape (arms,) or (size, arms)."""
+        row = self._row(node)
+        shape = None if size is None else (size, len(self.arm_names))
+        with self._lock:  # numpy Generators are not thread-safe
+            return self.rng.beta(self.alpha[row], self.beta[row], size=shape)
+
+    def pick(self, node):
+        """Index of the arm with the highest posterior draw."""
+        return int(np.argmax(self.sample(node)))
+
+    # ---- updates ----
+
+    def update(self, node, arm, reward):
+        self.update_many(node, [arm], [reward])
+
+    def update_many(self, node, arms, rewards):
+        """Credit several (arm, reward) outcomes of one node in one vectorized step."""
+        idx = np.asarray([self.arm_index[a] if isinstance(a, str) else a for a in arms], dtype=np.int64)
+        rewards = np.asarray(rewards, dtype=float)
+        with self._lock:
+            row = self._row(node)
+            if self.gamma != 1.0:
+                # Discount each touched arm once per batch, then add the batch's outcomes
+                touched = np.unique(idx)
+                self.alpha[row, touched] *= self.gamma
+                self.beta[row, touched] *= self.gamma
+            np.add.at(self.alpha[row], idx, rewards)
+            np.add.at(self.beta[row], idx, 1.0 - rewards)
+            np.add.at(self.pulls[row], idx, 1)
+            np.add.at(self.rewards[row], idx, rewards)
+
+    # ---- persistence ----
+
+    def load_priors(self, priors):
+        """Seed rows from { (node, arm_name): {"alpha", "beta"} }; unknown arms are ignored."""
+        loaded = 0
+        for (node, arm_name), ab in priors.items():
+            col = self.arm_index.get(arm_name)
+            if col is None:
+                continue
+            row = self._row(node)
+            self.alpha[row, col] = self.prior_alpha[row, col] = ab["alpha"]
+            self.beta[row, col] = self.prior_beta[row, col] = ab["beta"]
+            loaded += 1
+        return loaded
+
+    def posteriors(self):
+        """{ (node, arm_name): {"alpha", "beta"} } for every node seen so far."""
+        out = {}
+        for node, row in self.node_index.items():
+            for col, arm_name in enumerate(self.arm_names):
+                out[(node, arm_name)] = {"alpha": float(self.alpha[row, col]), "beta": float(self.beta[row, col])}
+        return out
+
+    def arm_stats(self, node):
+        row = self._row(node)
+        a, b = self.alpha[row], self.beta[row]
+        mean = a / (a + b)
+        return {
+            arm_name: {
+                "alpha": round(float(a[col]), 4),
+                "beta": round(float(b[col]), 4),
+                "mean": round(float(mean[col]), 4),
+                "prior_alpha": round(float(self.prior_alpha[row, col]), 4),
+                "prior_beta": round(float(self.prior_beta[row, col]), 4),
+                "pulls": int(self.pulls[row, col]),
+                "rewards": float(self.rewards[row, col]),
+            }
+            for col, arm_name in enumerate(self.arm_names)
+        }
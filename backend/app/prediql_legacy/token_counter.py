@@ -0,0 +1,45 @@
+import math
+import os
+
+try:
+    import tiktoken
+except ImportError:  # optional; fall back to the chars/4 heuristic
+    tiktoken = None
+
+_ENCODINGS = {}
+
+
+def _encoding(model):
+    key = model or ""
+    if key not in _ENCODINGS:
+        enc = None
+        if tiktoken is not None:
+            try:
+                enc = tiktoken.encoding_for_model(model) if model else None
+            except Exception:  # unknown model name, or encoding files not downloadable
+                enc = None
+            if enc is None:
+                try:
+                    enc = tiktoken.get_encoding("cl100k_base")
+                except Exception:
+                    enc = None
+        _ENCODINGS[key] = enc
+    return _ENCODINGS[key]
+
+
+def count_tokens(text, model=None):
+    """
+    Local token count used when the provider does not report `usage`.
+    Uses tiktoken when installed (exact for OpenAI models, close for others),
+    otherwise ceil(len/4).
+    """
+    if not text:
+        return 0
+    enc = _encoding(model or os.getenv("PREDIQL_LLM_MODEL"))
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def tokenizer_name():
+    return "tiktoken" if tiktoken is not None else "chars/4"
@@ -0,0 +1,206 @@
+import json
+import os
+import random
+import threading
+from collections import defaultdict
+
+from config import Config
+from load_introspection.schema_artifact import SCHEMA_ARTIFACT, load_json, load_schema
+
+QUERY_INFO_PATH = "generated_query_info.json"
+MAX_VALUES_PER_KEY = int(os.getenv("PREDIQL_VALUE_POOL_MAX", "200"))
+
+BUILTIN_SCALARS = {"ID", "String", "Int", "Float", "Boolean"}
+# Argument types whose values are meaningful across fields (an ID is an ID); plain
+# String/Int/Float/Boolean values only carry over from a field of the same name
+TRANSFERABLE = {"ID"}
+
+
+def unwrap_type(type_str):
+    """Remove GraphQL wrappers to get base type name."""
+    return (type_str or "").replace("!", "").replace("[", "").replace("]", "")
+
+
+class ValuePool:
+    """
+    Typed pool of concrete values seen in successful responses.
+
+    Leaf values are walked with the node's output type, so each one is stored
+    under (parent GraphQL type, field name) together with the field's declared
+    scalar/enum type, e.g. ("User", "id") -> ID. Keys hold up to
+    `max_per_key` distinct values in a ring (oldest replaced first); adding,
+    membership and sampling are O(1). for_argument() turns the pool into
+    candidates for an argument by name and declared type.
+    """
+
+    def __init__(self, query_info, object_list=None, max_per_key=MAX_VALUES_PER_KEY):
+        self.query_info = query_info or {}
+        self.object_list = object_list or {}
+        self.max_per_key = max_per_key
+        self._values = defaultdict(list)  # (type, field) -> values
+        self._seen = defaultdict(set)  # (type, field) -> set(values)
+        self._next = defaultdict(int)  # (type, field) -> ring slot replaced next when full
+        self._scalar = {}  # (type, field) -> declared scalar/enum type
+        self._by_field = defaultdict(set)  # field -> {(type, field)}
+        self._by_scalar = defaultdict(set)  # scalar/enum type -> {(type, field)}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_files(cls, query_info_path=QUERY_INFO_PATH, schema_path=SCHEMA_ARTIFACT):
+        query_info, object_list = {}, {}
+        if os.path.exists(query_info_path):
+            query_info = load_json(query_info_path)
+        try:
+            object_list = load_schema(schema_path)["objects"]
+        except FileNotFoundError:
+            pass
+        return cls(query_info, object_list)
+
+    # ---- ingestion ----
+
+    def add_payload(self, node, payload):
+        """Harvest a sent payload (as annotated by send_payload) if its response was successful."""
+        if not payload.get("success"):
+            return 0
+        return self.add_response(node, payload.get("response_body"))
+
+    def add_response(self, node, body):
+        """Add every leaf value under data.<field> of a response body; returns how many values were new."""
+        data = body.get("data") if isinstance(body, dict) else None
+        if not isinstance(data, dict):
+            return 0
+        info = self.query_info.get(node) or {}
+        output_type = unwrap_type(info.get("output_type"))
+        schema = info.get("relevant_schema") or {}
+        added = 0
+        with self._lock:
+            # Top-level keys are the node itself or aliases of it
+            for value in data.values():
+                added += self._walk(output_type, value, schema)
+        return added
+
+    def _fields(self, type_name, schema):
+        obj = schema.get(type_name) or self.object_list.get(type_name) or {}
+        return {field["name"]: unwrap_type(field["type"]) for field in obj.get("fields", [])}
+
+    def _walk(self, type_name, value, schema):
+        if isinstance(value, list):
+            return sum(self._walk(type_name, item, schema) for item in value)
+        if not isinstance(value, dict):
+            return 0
+        # Interfaces/unions: the concrete type is reported when __typename was selected
+        concrete = value.get("__typename")
+        if isinstance(concrete, str) and (concrete in schema or concrete in self.object_list):
+            type_name = concrete
+        fields = self._fields(type_name, schema)
+        added = 0
+        for name, child in value.items():
+            field_type = fields.get(name)
+            if field_type is None or name == "__typename":
+                continue
+            if field_type in schema or field_type in self.object_list:
+                added += self._walk(field_type, child, schema)
+            else:
+                for leaf in child if isinstance(child, list) else [child]:
+                    added += self._add(type_name, name, field_type, leaf)
+        return added
+
+    def _add(self, type_name, field, scalar, value):
+        if value is None or isinstance(value, (dict, list)):
+            return 0
+        key = (type_name, field)
+        seen = self._seen[key]
+        if value in seen:
+            return 0
+        values = self._values[key]
+        if len(values) < self.max_per_key:
+            values.append(value)
+        else:
+            slot = self._next[key]
+            seen.discard(values[slot])
+            values[slot] = value
+            self._next[key] = (slot + 1) % self.max_per_key
+        seen.add(value)
+        if key not in self._scalar:
+            self._scalar[key] = scalar
+            self._by_field[field].add(key)
+            self._by_scalar[scalar].add(key)
+        return 1
+
+    # ---- lookup ----
+
+    def values(self, type_name, field):
+        with self._lock:
+            return list(self._values.get((type_name, field), ()))
+
+    def sample(self, type_name, field, rng=random):
+        """One random value for (type, field), or None."""
+        with self._lock:
+            values = self._values.get((type_name, field))
+            return rng.choice(values) if values else None
+
+    def for_argument(self, arg_name, arg_type, node_type=None):
+        """
+        Candidate values for an argument, most specific first: the same field on
+        the node's type, the same field name on any type with the same declared
+        type, then any field of the same ID, enum or custom scalar type.
+        """
+        base = unwrap_type(arg_type)
+        with self._lock:
+            keys = []
+            if node_type and self._scalar.get((node_type, arg_name)) == base:
+                keys.append((node_type, arg_name))
+            keys += sorted(k for k in self._by_field.get(arg_name, ()) if self._scalar[k] == base and k not in keys)
+            if base in TRANSFERABLE or base not in BUILTIN_SCALARS:
+                keys += sorted(k for k in self._by_scalar.get(base, ()) if k not in keys)
+            candidates, seen = [], set()
+            for key in keys:
+                for value in self._values[key]:
+                    if value not in seen:
+                        seen.add(value)
+                        candidates.append(value)
+        return candidates
+
+    def hints(self, node, per_arg=3):
+        """Prompt-ready 'arg (Type): v1, v2' lines for the node's arguments that have candidates."""
+        info = self.query_info.get(node) or {}
+        node_type = info.get("node_type")
+        lines = []
+        for arg_name, arg_type in (info.get("parameters") or {}).items():
+            candidates = self.for_argument(arg_name, arg_type, node_type)[:per_arg]
+            if candidates:
+                shown = ", ".join(json.dumps(v, ensure_ascii=False) for v in candidates)
+                lines.append(f"{arg_name} ({arg_type}): {shown}")
+        return "; ".join(lines)
+
+    def stats(self):
+        with self._lock:
+            return {"keys": len(self._values), "values": sum(len(v) for v in self._values.values())}
+
+    def save(self, path=None):
+        """Write the pool as {"Type.field": {"type": scalar, "values": [...]}} for inspection."""
+        path = path or Config.VALUE_POOL_FILE
+        with self._lock:
+            snapshot = {
+                f"{t}.{f}": {"type": self._scalar[(t, f)], "values": list(values)}
+                for (t, f), values in sorted(self._values.items())
+            }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, indent=2, ensure_ascii=False)
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_value_pool():
+    """Process-wide pool, created on first use (after generated_query_info.json exists)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            try:
+                _POOL = ValuePool.from_files()
+            except (OSError, ValueError) as e:
+                print(f"⚠️ value pool starts without schema info: {e}")
+                _POOL = ValuePool({})
+        return _POOL
@@ -51,6 +51,13 @@ export function RunStatus({ run, onCancel }: Props) {
         <p className="mt-1 text-xs text-slate-400">
           Stage: {run.progress?.stage || 'n/a'} {run.progress?.detail ? `— ${run.progress.detail}` : ''}
         </p>
+        {run.coverage?.overall && (
+          <p className="mt-1 text-xs text-slate-400">
+            Coverage: fields {run.coverage.overall.success_field_cov.toFixed(1)}% · edges{' '}
+            {run.coverage.overall.success_edge_cov.toFixed(1)}% · nodes {run.coverage.overall.nodes_covered}/
+            {run.coverage.overall.nodes_total}
+          </p>
+        )}
         {run.error && <p className="mt-2 text-sm text-red-200">{run.error}</p>}
       </div>
 
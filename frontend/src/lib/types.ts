@@ -1,5 +1,7 @@
 export type LlmProvider = 'ollama' | 'openai_compatible' | 'gemini'
 
+export type Retriever = 'dense' | 'bm25' | 'hybrid'
+
 export type RunPayload = {
   endpointUrl: string
   llmProvider: LlmProvider
@@ -8,9 +10,27 @@ export type RunPayload = {
   graphqlHeadersJson?: string
   rounds: number
   requestsPerNode: number
+  targetCoverage?: number
+  requestBudget?: number
+  tokenBudget?: number
+  llmCache?: boolean
+  retriever?: Retriever
   notes?: string
 }
 
+export type CoverageMetrics = {
+  success_field_cov: number
+  success_edge_cov: number
+  attempted_field_cov: number
+  attempted_edge_cov: number
+  [key: string]: number | string
+}
+
+export type RunCoverage = {
+  overall: CoverageMetrics & { nodes_total: number; nodes_covered: number; node_cov: number }
+  nodes: Record<string, CoverageMetrics>
+}
+
 export type RunState = {
   runId: string
   status: 'queued' | 'running' | 'done' | 'failed' | 'cancelled'
@@ -22,6 +42,7 @@ export type RunState = {
   startedAt?: string | null
   finishedAt?: string | null
   error?: string | null
+  coverage?: RunCoverage | null
 }
 
 export type LogsResponse = {